@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized bootstrap on pre-binned data.
+
+Poisson bootstrap give each entry an independent Poisson(1) weight.
+Sum of weights of c entries in a bin is Poisson(c),
+so a replicate of binned data is draw directly from bin counts
+without touching original entries.
+Replicates are draw in batches, optionally spread across a process pool.
+
+Counts pass to bootstrap must come from disjoint populations,
+e.g. matched and unmatched tracks, or true and fake edges.
+"""
+
+from typing import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import warnings
+
+import numpy as np
+
+from ExaTrkXPlots.histogram import histogram
+
+
+def bootstrap(
+    statistic: Callable,
+    counts: Sequence[np.ndarray],
+    n_boot: int = 200,
+    batch_size: int = 50,
+    processes: int = None,
+    seed: int = None
+):
+    """
+    Compute bootstrap replicates of statistic on binned counts.
+
+    :param statistic:
+        Function take resampled counts, each with additional leading batch axis,
+        return array or tuple of arrays with same leading batch axis.
+        Must be picklable, i.e. module level function, if processes is used.
+    :param counts:
+        Bin counts of disjoint populations.
+    :param n_boot:
+        Number of replicates.
+    :param batch_size:
+        Number of replicates draw at once.
+    :param processes:
+        Number of processes. None or 1 to run in current process.
+        Processes are spawned, so calling script need a __main__ guard.
+    :param seed:
+        Random seed.
+    :return:
+        Replicates with leading axis of size n_boot, or tuple of them.
+    """
+    if n_boot < 1:
+        raise ValueError(f'Number of bootstrap replicates must be at least 1, got {n_boot}.')
+
+    counts = [np.asarray(count) for count in counts]
+
+    sizes = [batch_size] * (n_boot // batch_size)
+    if n_boot % batch_size:
+        sizes.append(n_boot % batch_size)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(statistic, counts, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+
+    if processes is not None and processes > 1:
+        # Prepare step may run on Plotter thread pool,
+        # fork from a multithreaded process can deadlock on locks held by other threads.
+        with ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            batches = list(executor.map(_replicate_batch, tasks))
+    else:
+        batches = list(map(_replicate_batch, tasks))
+
+    if isinstance(batches[0], tuple):
+        return tuple(np.concatenate(values) for values in zip(*batches))
+
+    return np.concatenate(batches)
+
+
+def _replicate_batch(task):
+    statistic, counts, size, seed = task
+
+    rng = np.random.default_rng(seed)
+    resampled = [
+        rng.poisson(count, size=(size, ) + count.shape) for count in counts
+    ]
+
+    return statistic(*resampled)
+
+
+def confidence_band(replicates: np.ndarray, confidence: float = 0.68) -> np.ndarray:
+    """
+    Central confidence interval from replicates.
+
+    :param replicates: Replicates with leading replicate axis.
+    :param confidence: Confidence level.
+    :return: Lower and upper bound stacked on first axis.
+    """
+    alpha = 0.5 * (1.0 - confidence)
+
+    with warnings.catch_warnings():
+        # Bin undefined in all replicates stay NaN.
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        return np.nanquantile(replicates, [alpha, 1.0 - alpha], axis=0)
+
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+
+    return np.divide(
+        numerator, denominator,
+        out=np.zeros_like(numerator),
+        where=denominator != 0
+    )
+
+
+def efficiency_statistic(matched, unmatched):
+    """
+    Efficiency of each bin from matched and unmatched counts.
+    """
+    return _ratio(matched, matched + unmatched)
+
+
+def bootstrap_efficiency(
+    matched: np.ndarray,
+    population: np.ndarray,
+    confidence: float = 0.68,
+    **kwargs
+) -> np.ndarray:
+    """
+    Bootstrap confidence band of binned efficiency.
+
+    :param matched: Matched counts of each bin.
+    :param population: Population counts of each bin. Matched must be subset of population.
+    :param confidence: Confidence level.
+    :param kwargs: Other arguments pass to bootstrap.
+    :return: Lower and upper bound of efficiency, stacked on first axis.
+    """
+    matched = np.asarray(matched)
+    unmatched = np.clip(np.asarray(population) - matched, 0, None)
+
+    replicates = bootstrap(efficiency_statistic, [matched, unmatched], **kwargs)
+
+    return confidence_band(replicates, confidence)
+
+
+def score_counts(truth: np.ndarray, score: np.ndarray, n_bins: int = 1000):
+    """
+    Pre-bin score of true and fake entries with uniform bins.
+    Bins cover [0, 1], extended to range of score if any score is outside,
+    e.g. raw logits, so no finite entry is dropped.
+
+    :param truth: Boolean truth array.
+    :param score: Score array.
+    :param n_bins: Number of score bins.
+    :return: True counts, fake counts, bin edges.
+    """
+    score = np.asarray(score)
+
+    lower, upper = 0.0, 1.0
+    finite = score[np.isfinite(score)]
+    if len(finite):
+        lower, upper = min(lower, float(finite.min())), max(upper, float(finite.max()))
+
+    (true_counts, fake_counts), bins = histogram(
+        score, bins=n_bins, range=(lower, upper), masks=[truth, ~truth]
+    )
+
+    return true_counts, fake_counts, bins
+
+
+def curve_statistic(true_counts, fake_counts):
+    """
+    ROC and precision-recall curves at each score bin edge, and AUC.
+
+    :return:
+        False positive rate, true positive rate (recall), precision and AUC,
+        thresholds run from highest to lowest bin edge.
+    """
+    # Count entries pass each threshold, from highest threshold.
+    true_positive = np.cumsum(true_counts[..., ::-1], axis=-1)
+    false_positive = np.cumsum(fake_counts[..., ::-1], axis=-1)
+
+    zeros = np.zeros(true_positive.shape[:-1] + (1, ))
+    true_positive = np.concatenate([zeros, true_positive], axis=-1)
+    false_positive = np.concatenate([zeros, false_positive], axis=-1)
+
+    true_positive_rate = _ratio(true_positive, true_positive[..., -1:])
+    false_positive_rate = _ratio(false_positive, false_positive[..., -1:])
+    # Precision is undefined if nothing pass threshold.
+    precision = np.where(
+        true_positive + false_positive > 0,
+        _ratio(true_positive, true_positive + false_positive),
+        np.nan
+    )
+
+    # Trapezoidal rule.
+    auc = np.sum(
+        np.diff(false_positive_rate, axis=-1)
+        * (true_positive_rate[..., 1:] + true_positive_rate[..., :-1]) * 0.5,
+        axis=-1
+    )
+
+    return false_positive_rate, true_positive_rate, precision, auc
+
+
+def precision_at_recall(
+    true_positive_rate: np.ndarray,
+    precision: np.ndarray,
+    recall_grid: np.ndarray
+) -> np.ndarray:
+    """
+    Interpolate precision of each replicate on fixed recall grid.
+    Precision is not monotonic in threshold, but recall is,
+    so replicates can be compared at same recall.
+
+    :param true_positive_rate: Recall of each replicate, non-decreasing along last axis.
+    :param precision: Precision of each replicate.
+    :param recall_grid: Recall to interpolate at.
+    :return: Precision at each recall of each replicate, NaN if replicate has no true entry.
+    """
+    result = np.full((len(true_positive_rate), len(recall_grid)), np.nan)
+
+    for replicate, (recall, replicate_precision) in enumerate(zip(true_positive_rate, precision)):
+        defined = np.isfinite(replicate_precision)
+        if recall[-1] == 0 or not defined.any():
+            continue
+
+        result[replicate] = np.interp(recall_grid, recall[defined], replicate_precision[defined])
+
+    return result
+
+
+def bootstrap_curves(
+    truth: np.ndarray,
+    score: np.ndarray,
+    n_bins: int = 1000,
+    confidence: float = 0.68,
+    n_recall: int = 200,
+    **kwargs
+):
+    """
+    Bootstrap confidence band of ROC and precision-recall curves and AUC.
+
+    :param truth: Boolean truth array.
+    :param score: Score array.
+    :param n_bins: Number of score bins.
+    :param confidence: Confidence level.
+    :param n_recall: Number of recall points of precision-recall band.
+    :param kwargs: Other arguments pass to bootstrap.
+    :return:
+        Dict of thresholds, median false positive rate and precision,
+        band of true positive rate, precision and AUC,
+        and band of precision over recall grid.
+    """
+    true_counts, fake_counts, bins = score_counts(truth, score, n_bins)
+
+    false_positive_rate, true_positive_rate, precision, auc = bootstrap(
+        curve_statistic, [true_counts, fake_counts], **kwargs
+    )
+
+    with warnings.catch_warnings():
+        # Precision undefined in all replicates stay NaN.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        band_precision = np.nanmedian(precision, axis=0)
+
+    recall_grid = np.linspace(0.0, 1.0, n_recall)
+
+    return {
+        'band_thresholds': bins[::-1],
+        'band_recall': recall_grid,
+        'precision_at_recall_band': confidence_band(
+            precision_at_recall(true_positive_rate, precision, recall_grid), confidence
+        ),
+        'band_false_positive_rate': np.median(false_positive_rate, axis=0),
+        'band_precision': band_precision,
+        'true_positive_rate_band': confidence_band(true_positive_rate, confidence),
+        'precision_band': confidence_band(precision, confidence),
+        'auc_band': confidence_band(auc, confidence)
+    }
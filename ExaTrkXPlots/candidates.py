@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Plots about track candidates in ExaTrkX routine.
+
+Track candidates are connected components of graph build from edges above score cut.
+Components are labelled with sparse graph routines, so no Python level traversal.
+
+For plot data requirement, detail list below:
+    - hits:
+        - required: hit_id, x, y, z or r, phi, z
+    - edges:
+        - required: hit_id_1, hit_id_2, score
+    - truth:
+        - required: hit_id, particle_id
+
+Candidate is matched to a particle with double majority rule:
+more than matching_fraction of candidate hits belong to the particle,
+and those hits are more than matching_fraction of particle hits.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+import matplotlib
+from matplotlib import collections as mc
+
+from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, num_rows
+from ExaTrkXPlots.histogram import draw_histogram
+from ExaTrkXPlots.hits import hit_particle_ids
+from ExaTrkXPlots.pairs import index_segments, pair_hit_index
+
+
+def track_candidates(hits, edges, score_cut: float = 0.5):
+    """
+    Label track candidate of each hit.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :param score_cut: Only edges with score above cut connect hits.
+    :return:
+        Candidate label of each hit row, and row index of both hits of selected edges.
+        Hit without selected edge is a candidate by itself.
+    """
+    n_hits = num_rows(hits)
+    index_1, index_2 = pair_hit_index(hits, edges)
+
+    selected = (column(edges, 'score') > score_cut) & (index_1 >= 0) & (index_2 >= 0)
+    index_1, index_2 = index_1[selected], index_2[selected]
+
+    adjacency = scipy.sparse.coo_matrix(
+        (np.ones(len(index_1), dtype=np.int8), (index_1, index_2)),
+        shape=(n_hits, n_hits)
+    ).tocsr()
+    _, labels = scipy.sparse.csgraph.connected_components(
+        adjacency, directed=False, return_labels=True
+    )
+
+    return labels, index_1, index_2
+
+
+def candidate_tracks(hits, edges, score_cut: float = 0.5) -> dict:
+    """
+    Tracks table of candidates, which can be matched by ExaTrkXPlots.matching.match_tracks.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :param score_cut: Only edges with score above cut connect hits.
+    :return: Dict of hit_id and track_id of each hit.
+    """
+    labels, _, _ = track_candidates(hits, edges, score_cut)
+
+    return {
+        'hit_id': column(hits, 'hit_id'),
+        'track_id': labels
+    }
+
+
+def _prepare_candidates(data, score_cut: float = 0.5, min_hits: int = 3):
+    hits = data['hits']
+
+    labels, index_1, index_2 = track_candidates(hits, data['edges'], score_cut)
+    sizes = np.bincount(labels)
+
+    # Both hits of an edge always share same label.
+    selected = sizes[labels[index_1]] >= min_hits
+    index_1, index_2 = index_1[selected], index_2[selected]
+
+    x, y = cartesian(hits)
+
+    return {
+        'segments': index_segments(x, y, index_1, index_2),
+        'labels': labels[index_1],
+        'n_candidates': np.count_nonzero(sizes >= min_hits)
+    }
+
+
+@plot('exatrkx.candidates.2d', ['hits', 'edges'], prepare=_prepare_candidates)
+def candidate_plot(ax, prepared, cmap: str = 'tab20', line_opts: dict = None):
+    """
+    Plot 2D connections of track candidates, each candidate in its own color.
+    Require hits and edges dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param score_cut: Only edges with score above cut connect hits.
+    :param min_hits: Plot candidates with at least min_hits hits only.
+    :param cmap: Categorical colormap, cycled if there are more candidates than colors.
+    :param line_opts: Options pass to LineCollection.
+    :return:
+    """
+    cmap = matplotlib.colormaps[cmap]
+
+    line_opts = {
+        'linewidths': 1.0
+    } | (line_opts or {})
+
+    ax.add_collection(mc.LineCollection(
+        prepared['segments'],
+        array=prepared['labels'] % cmap.N,
+        cmap=cmap,
+        norm=matplotlib.colors.Normalize(0, cmap.N - 1),
+        **line_opts
+    ))
+
+    ax.autoscale_view()
+    ax.set_title(f'{prepared["n_candidates"]} candidates')
+    ax.set_xlabel('x [mm]')
+    ax.set_ylabel('y [mm]')
+
+
+def _prepare_candidate_sizes(data, score_cut: float = 0.5, min_hits: int = 1):
+    labels, _, _ = track_candidates(data['hits'], data['edges'], score_cut)
+
+    sizes = np.bincount(labels)
+    counts = np.bincount(sizes)[min_hits:]
+
+    return {
+        'counts': counts,
+        'bins': np.arange(min_hits, min_hits + len(counts) + 1) - 0.5
+    }
+
+
+@plot('exatrkx.candidates.size', ['hits', 'edges'], prepare=_prepare_candidate_sizes)
+def candidate_size_hist(ax, prepared, hist_opts: dict = None):
+    """
+    Plot histogram of number of hits in each track candidate.
+    Require hits and edges dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param score_cut: Only edges with score above cut connect hits.
+    :param min_hits: Count candidates with at least min_hits hits only.
+    :param hist_opts: Options pass to ax.stairs.
+    :return:
+    """
+    hist_opts = {
+        'lw': 2,
+        'log': True
+    } | (hist_opts or {})
+
+    draw_histogram(ax, prepared['counts'], prepared['bins'], **hist_opts)
+
+    ax.set_xlabel('Number of hits')
+    ax.set_ylabel('Candidates')
+
+
+def _merge_counts(comp, code, count, n_codes):
+    """
+    Sum particle counts of same component and particle.
+    """
+    key = comp.astype(np.int64) * n_codes + code
+    key, inverse = np.unique(key, return_inverse=True)
+    count = np.bincount(inverse.reshape(-1), weights=count).astype(np.int64)
+
+    return key // n_codes, key % n_codes, count
+
+
+def score_cut_scan(
+    hits,
+    edges,
+    truth,
+    cuts: Sequence[float],
+    min_hits: int = 3,
+    matching_fraction: float = 0.5
+) -> Dict[str, np.ndarray]:
+    """
+    Track efficiency and fake rate of candidates at many score cuts in a single pass.
+
+    Edges are added in descending score, one band between neighbouring cuts at a time.
+    Each band merges only components it touches, with array operations over
+    a table of hit count of each component and particle.
+    With 50 cuts on 10^5 hits and 3x10^5 edges, scan cost about 5 reconstructions
+    (connected components and matching at one cut), not 50.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :param truth: Truth table.
+    :param cuts: Score cuts. Edges with score above cut connect hits.
+    :param min_hits:
+        Minimum number of hits of candidates and reconstructable particles.
+    :param matching_fraction:
+        Fraction of double majority matching, at least 0.5,
+        so each candidate and each particle match at most once.
+    :return:
+        Dict of arrays of each cut, sorted by cut:
+            - cuts
+            - efficiency: Matched over reconstructable particles.
+            - fake_rate: Unmatched over all candidates.
+            - n_candidates: Number of candidates.
+            - n_matched: Number of matched candidates.
+        Also n_reconstructable scalar.
+    """
+    if matching_fraction < 0.5:
+        raise ValueError(
+            f'Matching fraction must be at least 0.5 to match each particle once, '
+            f'got {matching_fraction}.'
+        )
+
+    n_hits = num_rows(hits)
+    cuts = np.sort(np.asarray(cuts, dtype=float))
+
+    # Particle code of each hit, noise hits have no particle.
+    particle_id = hit_particle_ids(hits, truth)
+    particle_ids, codes = np.unique(particle_id, return_inverse=True)
+    codes = codes.reshape(-1)
+    particle_hits = np.bincount(codes, minlength=len(particle_ids))
+    reconstructable = (particle_ids != 0) & (particle_hits >= min_hits)
+    n_codes = len(particle_ids)
+
+    index_1, index_2 = pair_hit_index(hits, edges)
+    score = column(edges, 'score')
+
+    selected = (index_1 >= 0) & (index_2 >= 0) & (score > cuts[0])
+    row, col = index_1[selected], index_2[selected]
+
+    # Highest cut each edge pass. Group edges of same band, highest band first.
+    stops = np.searchsorted(cuts, score[selected], side='left') - 1
+    order = np.argsort(len(cuts) - 1 - stops, kind='stable')
+    row, col = row[order], col[order]
+    band_ends = np.cumsum(np.bincount(stops, minlength=len(cuts))[::-1])
+
+    def matched_components(comp, code, count, size):
+        """
+        Components with a particle pass double majority.
+        """
+        passed = (
+            reconstructable[code]
+            & (count > matching_fraction * size[comp])
+            & (count > matching_fraction * particle_hits[code])
+        )
+        return np.unique(comp[passed])
+
+    # Component of each hit, labelled by one of its hits.
+    label = np.arange(n_hits)
+    size = np.ones(n_hits, dtype=np.int64)
+    matched = np.zeros(n_hits, dtype=bool)
+    matched[matched_components(label, codes, np.ones(n_hits, dtype=np.int64), size)] = True
+
+    # Hit count of each component and particle.
+    table_comp, table_code, table_count = label.copy(), codes, np.ones(n_hits, dtype=np.int64)
+
+    n_candidates = np.count_nonzero(size >= min_hits)
+    n_matched = np.count_nonzero(matched & (size >= min_hits))
+
+    result_candidates = np.zeros(len(cuts), dtype=np.int64)
+    result_matched = np.zeros(len(cuts), dtype=np.int64)
+
+    remap = np.arange(n_hits)
+    touched = np.zeros(n_hits, dtype=bool)
+
+    band_start = 0
+    for cut_index, band_end in zip(range(len(cuts) - 1, -1, -1), band_ends):
+        if band_end > band_start:
+            comp_1 = label[row[band_start:band_end]]
+            comp_2 = label[col[band_start:band_end]]
+
+            affected, inverse = np.unique(np.r_[comp_1, comp_2], return_inverse=True)
+            inverse = inverse.reshape(-1)
+            n_band = band_end - band_start
+            _, group = scipy.sparse.csgraph.connected_components(scipy.sparse.coo_matrix(
+                (np.ones(n_band, dtype=np.int8), (inverse[:n_band], inverse[n_band:])),
+                shape=(len(affected), len(affected))
+            ), directed=False)
+
+            # Remove contribution of merged components.
+            candidate = size[affected] >= min_hits
+            n_candidates -= np.count_nonzero(candidate)
+            n_matched -= np.count_nonzero(candidate & matched[affected])
+
+            # Affected components are sorted, so first of each group is its smallest label.
+            _, first = np.unique(group, return_index=True)
+            merged = affected[first]
+            remap[affected] = merged[group]
+
+            label = remap[label]
+            size[merged] = np.bincount(group, weights=size[affected]).astype(np.int64)
+
+            touched[affected] = True
+            moved = touched[table_comp]
+            merged_comp, merged_code, merged_count = _merge_counts(
+                remap[table_comp[moved]], table_code[moved], table_count[moved], n_codes
+            )
+            table_comp = np.r_[table_comp[~moved], merged_comp]
+            table_code = np.r_[table_code[~moved], merged_code]
+            table_count = np.r_[table_count[~moved], merged_count]
+
+            matched[affected] = False
+            matched[matched_components(merged_comp, merged_code, merged_count, size)] = True
+
+            candidate = size[merged] >= min_hits
+            n_candidates += np.count_nonzero(candidate)
+            n_matched += np.count_nonzero(candidate & matched[merged])
+
+            remap[affected] = affected
+            touched[affected] = False
+            band_start = band_end
+
+        result_candidates[cut_index] = n_candidates
+        result_matched[cut_index] = n_matched
+
+    n_reconstructable = int(np.count_nonzero(reconstructable))
+
+    return {
+        'cuts': cuts,
+        'efficiency': result_matched / max(n_reconstructable, 1),
+        'fake_rate': np.divide(
+            result_candidates - result_matched, result_candidates,
+            out=np.zeros(len(cuts)), where=result_candidates != 0
+        ),
+        'n_candidates': result_candidates,
+        'n_matched': result_matched,
+        'n_reconstructable': n_reconstructable
+    }
+
+
+def _prepare_score_cut_scan(
+    data,
+    cuts: Sequence[float] = None,
+    min_hits: int = 3,
+    matching_fraction: float = 0.5
+):
+    if cuts is None:
+        cuts = np.linspace(0.0, 0.98, 50)
+
+    return score_cut_scan(
+        data['hits'], data['edges'], data['truth'],
+        cuts, min_hits, matching_fraction
+    )
+
+
+@plot(
+    'exatrkx.candidates.score_cut',
+    ['hits', 'edges', 'truth'],
+    prepare=_prepare_score_cut_scan
+)
+def score_cut_plot(ax, prepared, plot_opts: dict = None):
+    """
+    Plot track efficiency and fake rate of candidates against edge score cut.
+    Require hits, edges and truth dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param cuts: Score cuts to scan. 50 cuts between 0 and 0.98 if None.
+    :param min_hits: Minimum number of hits of candidates and reconstructable particles.
+    :param matching_fraction: Fraction of double majority matching, at least 0.5.
+    :param plot_opts: Options pass to ax.plot.
+    :return:
+    """
+    plot_opts = {
+        'marker': '.',
+        'lw': 2
+    } | (plot_opts or {})
+
+    ax.plot(prepared['cuts'], prepared['efficiency'], label='Efficiency', **plot_opts)
+    ax.plot(prepared['cuts'], prepared['fake_rate'], label='Fake rate', **plot_opts)
+
+    ax.set_xlabel('Score cut')
+    ax.set_ylim(0.0, 1.05)
+    ax.grid(True)
+    ax.legend()
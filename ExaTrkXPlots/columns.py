@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Column access layer for ExaTrkX plots.
+
+Plots read columns through this module instead of assuming pandas,
+so tables below can be pass to plots without conversion:
+    - pandas DataFrame
+    - pyarrow Table or RecordBatch
+    - polars DataFrame
+    - dict of arrays
+    - NumPy structured array
+
+Columns are returned as NumPy arrays, which are views of original memory when possible:
+    - pandas: view for numeric column without missing value.
+    - pyarrow: view for single chunk primitive column without null.
+      Column with multiple chunks need to be concatenate once.
+    - polars: view for numeric column without null.
+    - dict: view if value is already a NumPy array.
+    - structured array: always a view.
+
+pyarrow and polars are optional. They are never imported by this module.
+"""
+
+from typing import Any, Callable, Iterable, List, Union
+
+import numpy as np
+
+
+def _library(obj) -> str:
+    return type(obj).__module__.split('.')[0]
+
+
+def as_array(values) -> np.ndarray:
+    """
+    Convert single column-like object to NumPy array without copy if possible.
+
+    :param values: pandas Series, pyarrow (Chunked)Array, polars Series or array-like.
+    :return: NumPy array.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+
+    library = _library(values)
+
+    if library == 'pyarrow':
+        if hasattr(values, 'num_chunks'):
+            if values.num_chunks == 1:
+                values = values.chunk(0)
+            else:
+                # Chunks need to be contiguous in NumPy.
+                return values.to_numpy()
+
+        return values.to_numpy(zero_copy_only=False)
+
+    if hasattr(values, 'to_numpy'):
+        # pandas and polars.
+        return values.to_numpy()
+
+    return np.asarray(values)
+
+
+def column_names(table) -> List[str]:
+    """
+    :param table: Supported table.
+    :return: Column names of table.
+    """
+    if isinstance(table, np.ndarray):
+        if table.dtype.names is None:
+            raise TypeError('Only structured array can be used as table.')
+        return list(table.dtype.names)
+
+    if isinstance(table, dict):
+        return list(table.keys())
+
+    if hasattr(table, 'column_names'):
+        # pyarrow.
+        return list(table.column_names)
+
+    if hasattr(table, 'columns'):
+        # pandas and polars.
+        return list(table.columns)
+
+    raise TypeError(f'Unsupported table type: {type(table).__name__}')
+
+
+def has_columns(table, names: Iterable[str]) -> bool:
+    """
+    :param table: Supported table.
+    :param names: Column names.
+    :return: Whether all columns exist in table.
+    """
+    columns = set(column_names(table))
+    return all(name in columns for name in names)
+
+
+def column(table, name: str) -> np.ndarray:
+    """
+    Read a column as NumPy array.
+
+    :param table: Supported table.
+    :param name: Column name.
+    :return: NumPy array. View of table memory if possible.
+    """
+    if isinstance(table, np.ndarray):
+        # Structured array.
+        return table[name]
+
+    library = _library(table)
+
+    if library == 'pyarrow':
+        return as_array(table.column(name))
+
+    if library == 'polars':
+        return as_array(table.get_column(name))
+
+    return as_array(table[name])
+
+
+def num_rows(table) -> int:
+    """
+    :param table: Supported table.
+    :return: Number of rows.
+    """
+    if hasattr(table, 'num_rows'):
+        return table.num_rows
+
+    if isinstance(table, dict):
+        for values in table.values():
+            return len(values)
+        return 0
+
+    return len(table)
+
+
+def row_mask(table, selection: Union[Callable, Any]) -> np.ndarray:
+    """
+    Evaluate row selection as boolean or index array.
+
+    :param table: Supported table.
+    :param selection:
+        Either callable take table and return mask, or mask itself.
+    :return: NumPy array can be use to index columns.
+    """
+    if callable(selection):
+        selection = selection(table)
+
+    return as_array(selection)
+
+
+def take_rows(table, index: np.ndarray):
+    """
+    Select rows of table, keeping its type.
+
+    :param table: Supported table.
+    :param index: Boolean mask or row index.
+    :return: Table of same type with selected rows.
+    """
+    index = np.asarray(index)
+    if index.dtype == bool:
+        index = np.flatnonzero(index)
+
+    if isinstance(table, np.ndarray):
+        return table[index]
+
+    if isinstance(table, dict):
+        return {name: as_array(values)[index] for name, values in table.items()}
+
+    library = _library(table)
+
+    if library == 'pyarrow':
+        return table.take(index)
+
+    if library == 'polars':
+        return table[index]
+
+    # pandas.
+    return table.iloc[index]
+
+
+def cartesian(hits):
+    """
+    Read x, y coordinate of hits.
+    Compute from r, phi if cartesian coordinate is not present.
+
+    :param hits: Hits table.
+    :return: x, y arrays.
+    """
+    if has_columns(hits, ['x', 'y']):
+        return column(hits, 'x'), column(hits, 'y')
+
+    if has_columns(hits, ['r', 'phi']):
+        # Cylindrical coord.
+        r = column(hits, 'r')
+        phi = column(hits, 'phi')
+
+        return r * np.cos(phi), r * np.sin(phi)
+
+    raise KeyError('No valid coordinate data found.')
+
+
+def index_lookup(ids: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """
+    Find row index of each query id, as a vectorized replacement of merge on id column.
+
+    :param ids: Unique ids of each row.
+    :param query: Ids to look up.
+    :return: Row index of each query, -1 if not found.
+        Index is int32 if ids fit, so result is no wider than compacted id columns.
+    """
+    ids = np.asarray(ids)
+    query = np.asarray(query)
+
+    index_dtype = np.int32 if len(ids) < 2**31 else np.intp
+
+    if len(ids) == 0:
+        return np.full(len(query), -1, dtype=index_dtype)
+
+    if (
+        np.issubdtype(ids.dtype, np.integer)
+        and np.issubdtype(query.dtype, np.integer)
+        and ids.min() >= 0
+        and ids.max() <= 4 * len(ids) + 1024
+    ):
+        # Dense ids, like hit_id. Direct table lookup.
+        table = np.full(int(ids.max()) + 1, -1, dtype=index_dtype)
+        table[ids] = np.arange(len(ids), dtype=index_dtype)
+
+        valid = (query >= 0) & (query < len(table))
+        if valid.all():
+            return table[query]
+
+        result = np.full(len(query), -1, dtype=index_dtype)
+        result[valid] = table[query[valid]]
+
+        return result
+
+    # Sparse ids, like particle_id. Binary search on sorted ids.
+    order = np.argsort(ids, kind='stable').astype(index_dtype)
+    sorted_ids = ids[order]
+
+    position = np.searchsorted(sorted_ids, query)
+    position[position == len(sorted_ids)] = 0
+
+    result = order[position]
+    result[sorted_ids[position] != query] = -1
+
+    return result
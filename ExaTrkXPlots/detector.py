@@ -0,0 +1,734 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Detector level plots, e.g. hit occupancy of layers and modules.
+
+For plot data requirement, detail list below:
+    - hits:
+        - required: volume_id, layer_id, module_id, z and x, y or r
+        - optional: hit_id
+    - occupancy:
+        - Occupancy accumulated over events, use instead of hits.
+    - edges:
+        - required: hit_id_1, hit_id_2
+        - optional: truth
+    - truth:
+        - required: hit_id, particle_id
+    - truth_edges:
+        - required: hit_id_1, hit_id_2
+        Built from hits and truth if absent, see ExaTrkXPlots.edge_sets.build_truth_edges.
+    - layer_pairs:
+        - LayerPairCounts accumulated over events, use instead of hits and edges.
+
+For required columns, it use for all plot require this type of dataframe.
+For optional columns, it use for special purpose and not required for all plots.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+
+Each (volume, layer, module) is encoded as a single integer,
+so counting hits of every module is one np.bincount instead of a groupby.
+Layer code is module code without module bits:
+
+    code = (volume << (LAYER_BITS + MODULE_BITS)) | (layer << MODULE_BITS) | module
+    layer_code = code >> MODULE_BITS
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+import matplotlib
+
+from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, has_columns, index_lookup, row_mask
+from ExaTrkXPlots.edge_sets import EdgeSet, pair_keys, truth_edges_of
+from ExaTrkXPlots.histogram import bin_index, histogram, draw_histogram
+from ExaTrkXPlots.pairs import pair_truth
+
+
+# Enough for TrackML detector: volume_id < 32, layer_id < 32, module_id < 4096.
+VOLUME_BITS = 5
+LAYER_BITS = 5
+MODULE_BITS = 12
+
+
+def module_code(volume, layer, module) -> np.ndarray:
+    """
+    Encode (volume, layer, module) as single integer.
+
+    :param volume: volume_id.
+    :param layer: layer_id.
+    :param module: module_id.
+    :return: Module code.
+    """
+    codes = []
+    for name, values, bits in [
+        ('volume_id', volume, VOLUME_BITS),
+        ('layer_id', layer, LAYER_BITS),
+        ('module_id', module, MODULE_BITS)
+    ]:
+        values = np.asarray(values)
+        if len(values) and (values.min() < 0 or values.max() >= 1 << bits):
+            raise ValueError(f'{name} out of range [0, {1 << bits}).')
+        codes.append(values.astype(np.int64))
+
+    volume, layer, module = codes
+
+    return (volume << (LAYER_BITS + MODULE_BITS)) | (layer << MODULE_BITS) | module
+
+
+def layer_code(volume, layer) -> np.ndarray:
+    """
+    Encode (volume, layer) as single integer.
+
+    :param volume: volume_id.
+    :param layer: layer_id.
+    :return: Layer code.
+    """
+    return module_code(volume, layer, np.zeros(np.shape(layer), dtype=np.int64)) >> MODULE_BITS
+
+
+def decode_module(code) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :param code: Module code.
+    :return: volume_id, layer_id and module_id.
+    """
+    code = np.asarray(code, dtype=np.int64)
+
+    return (
+        code >> (LAYER_BITS + MODULE_BITS),
+        (code >> MODULE_BITS) & ((1 << LAYER_BITS) - 1),
+        code & ((1 << MODULE_BITS) - 1)
+    )
+
+
+def decode_layer(code) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param code: Layer code.
+    :return: volume_id and layer_id.
+    """
+    code = np.asarray(code, dtype=np.int64)
+
+    return code >> LAYER_BITS, code & ((1 << LAYER_BITS) - 1)
+
+
+def hit_module_code(hits) -> np.ndarray:
+    """
+    :param hits: Hits table.
+    :return: Module code of each hit.
+    """
+    return module_code(
+        column(hits, 'volume_id'), column(hits, 'layer_id'), column(hits, 'module_id')
+    )
+
+
+def hit_layer_code(hits) -> np.ndarray:
+    """
+    :param hits: Hits table.
+    :return: Layer code of each hit.
+    """
+    return layer_code(column(hits, 'volume_id'), column(hits, 'layer_id'))
+
+
+def hit_r(hits) -> np.ndarray:
+    """
+    :param hits: Hits table.
+    :return: Transverse radius of each hit.
+    """
+    if has_columns(hits, ['r']):
+        return column(hits, 'r')
+
+    x, y = cartesian(hits)
+
+    # Much faster than np.hypot, and no overflow concern for detector coordinates.
+    return np.sqrt(x * x + y * y)
+
+
+class Occupancy:
+    """
+    Hit counts of each module and r-z cell, accumulated over events.
+
+    Occupancy of different events or processes can be merged,
+    e.g. sum of per-worker occupancy of a campaign.
+    """
+    def __init__(
+        self,
+        z_bins: Iterable[float] = np.linspace(-3000.0, 3000.0, 201),
+        r_bins: Iterable[float] = np.linspace(0.0, 1100.0, 111),
+        buffer_size: int = 1 << 24
+    ):
+        """
+        Define an empty occupancy.
+
+        :param z_bins: Bin edges of z in r-z occupancy map.
+        :param r_bins:
+            Bin edges of r in r-z occupancy map.
+            Set z_bins or r_bins to None to skip r-z map, which cost more than module counts.
+        :param buffer_size:
+            Number of hits to buffer before counting modules.
+            Module code space is large, so count many events at once
+            instead of allocating a full count array for each event.
+        """
+        self.buffer_size = buffer_size
+
+        self.n_events = 0
+        self.n_hits = 0
+
+        if z_bins is None or r_bins is None:
+            self.z_bins = self.r_bins = self.rz_counts = None
+        else:
+            self.z_bins = np.asarray(z_bins, dtype=float)
+            self.r_bins = np.asarray(r_bins, dtype=float)
+            self.rz_counts = np.zeros((len(self.z_bins) - 1, len(self.r_bins) - 1), dtype=np.int64)
+
+        self._module_counts = np.zeros(0, dtype=np.int64)
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, hits) -> 'Occupancy':
+        """
+        Count hits of an event.
+
+        :param hits: Hits table of one event.
+        :return: This occupancy.
+        """
+        codes = hit_module_code(hits)
+
+        self._buffer.append(codes)
+        self._buffered += len(codes)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+        if self.rz_counts is not None:
+            n_z, n_r = self.rz_counts.shape
+            z_index = bin_index(column(hits, 'z'), self.z_bins)
+            r_index = bin_index(hit_r(hits), self.r_bins)
+            inside = (z_index >= 0) & (r_index >= 0)
+            self.rz_counts += np.bincount(
+                z_index[inside] * n_r + r_index[inside], minlength=n_z * n_r
+            ).reshape(n_z, n_r)
+
+        self.n_events += 1
+        self.n_hits += len(codes)
+
+        return self
+
+    def merge(self, other: 'Occupancy') -> 'Occupancy':
+        """
+        Add counts of other occupancy to this one.
+
+        :param other: Occupancy with same r-z bins.
+        :return: This occupancy.
+        """
+        if (self.rz_counts is None) != (other.rz_counts is None) or (
+            self.rz_counts is not None and not (
+                np.array_equal(self.z_bins, other.z_bins)
+                and np.array_equal(self.r_bins, other.r_bins)
+            )
+        ):
+            raise ValueError('Cannot merge occupancy with different r-z bins.')
+
+        self._add_module_counts(other.module_counts)
+        if self.rz_counts is not None:
+            self.rz_counts += other.rz_counts
+        self.n_events += other.n_events
+        self.n_hits += other.n_hits
+
+        return self
+
+    def __iadd__(self, other: 'Occupancy') -> 'Occupancy':
+        return self.merge(other)
+
+    @property
+    def module_counts(self) -> np.ndarray:
+        """
+        :return: Hit counts indexed by module code.
+        """
+        self._flush()
+
+        return self._module_counts
+
+    def layers(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Hit counts of layers with any hit, sorted by volume_id then layer_id.
+
+        :return: volume_id, layer_id and counts.
+        """
+        module_counts = self.module_counts
+
+        counts = np.bincount(
+            np.arange(len(module_counts)) >> MODULE_BITS,
+            weights=module_counts,
+            minlength=1
+        ).astype(np.int64)
+        codes = np.flatnonzero(counts)
+
+        return (*decode_layer(codes), counts[codes])
+
+    def modules(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Hit counts of modules with any hit, sorted by module code.
+
+        :return: volume_id, layer_id, module_id and counts.
+        """
+        module_counts = self.module_counts
+        codes = np.flatnonzero(module_counts)
+
+        return (*decode_module(codes), module_counts[codes])
+
+    def _flush(self):
+        if not self._buffer:
+            return
+
+        codes = np.concatenate(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+
+        self._add_module_counts(np.bincount(codes))
+
+    def _add_module_counts(self, counts: np.ndarray):
+        if len(counts) > len(self._module_counts):
+            counts = counts.copy()
+            counts[:len(self._module_counts)] += self._module_counts
+            self._module_counts = counts
+        else:
+            self._module_counts[:len(counts)] += counts
+
+    def __getstate__(self):
+        # Most of module code space is empty, send nonzero counts only.
+        state = dict(self.__dict__)
+        module_counts = self.module_counts
+        codes = np.flatnonzero(module_counts)
+
+        state['_module_counts'] = (len(module_counts), codes, module_counts[codes])
+        state['_buffer'] = []
+        state['_buffered'] = 0
+
+        return state
+
+    def __setstate__(self, state):
+        size, codes, counts = state['_module_counts']
+
+        self.__dict__.update(state)
+        self._module_counts = np.zeros(size, dtype=np.int64)
+        self._module_counts[codes] = counts
+
+
+def occupancy(data, z_bins=None, r_bins=None) -> Occupancy:
+    """
+    Occupancy pass in data, or count it from hits of a single event.
+
+    :param data: Data with occupancy or hits.
+    :param z_bins: Bin edges of z in r-z occupancy map. Only use for hits.
+    :param r_bins: Bin edges of r in r-z occupancy map. Only use for hits.
+    :return: Occupancy.
+    """
+    if 'occupancy' in data:
+        # Precomputed over events, bins are decided when it is created.
+        return data['occupancy']
+
+    if 'hits' not in data:
+        raise RuntimeError('Data requirement for occupancy not satisfy: occupancy or hits')
+
+    bins = {}
+    if z_bins is not None:
+        bins['z_bins'] = z_bins
+    if r_bins is not None:
+        bins['r_bins'] = r_bins
+
+    return Occupancy(**bins).add(data['hits'])
+
+
+def _prepare_layer_occupancy(data):
+    result = occupancy(data)
+    volume, layer, counts = result.layers()
+
+    return {
+        'volume': volume,
+        'layer': layer,
+        'counts': counts,
+        'n_events': np.array(result.n_events)
+    }
+
+
+@plot('exatrkx.detector.layer_occupancy', None, prepare=_prepare_layer_occupancy)
+def layer_occupancy_plot(ax, prepared, per_event: bool = True, bar_opts: dict = None):
+    """
+    Plot number of hits of each layer.
+
+    :param ax: matplotlib axis object.
+    :param data: Data. Require occupancy or hits.
+    :param per_event: Average over events instead of total counts.
+    :param bar_opts: Options pass to ax.bar.
+    :return:
+    """
+    values = prepared['counts'].astype(float)
+    if per_event:
+        values /= max(int(prepared['n_events']), 1)
+
+    bar_opts = {
+        'width': 0.8
+    } | (bar_opts or {})
+
+    positions = np.arange(len(values))
+    ax.bar(positions, values, **bar_opts)
+
+    ax.set_xticks(
+        positions,
+        [f'{volume}:{layer}' for volume, layer in zip(prepared['volume'], prepared['layer'])],
+        rotation=90,
+        fontsize='x-small'
+    )
+    ax.set_xlabel('Volume:Layer')
+    ax.set_ylabel('Hits per event' if per_event else 'Hits')
+
+
+def _prepare_module_occupancy(data, bins=50, range=None):
+    result = occupancy(data)
+    volume, _, _, counts = result.modules()
+
+    values = counts / max(result.n_events, 1)
+    volumes = np.unique(volume)
+
+    counts, bins = histogram(
+        values, bins, range, masks=[volume == v for v in volumes]
+    )
+
+    return {
+        'volumes': volumes,
+        'counts': counts,
+        'bins': bins
+    }
+
+
+@plot('exatrkx.detector.module_occupancy', None, prepare=_prepare_module_occupancy)
+def module_occupancy_plot(ax, prepared, hist_opts: dict = None):
+    """
+    Plot distribution of hits per event of modules, one histogram for each volume.
+    Only modules with any hit are counted.
+
+    :param ax: matplotlib axis object.
+    :param data: Data. Require occupancy or hits.
+    :param bins: Bins of histogram.
+    :param range: Range of histogram.
+    :param hist_opts: Options pass to draw_histogram.
+    :return:
+    """
+    hist_opts = {
+        'log': True
+    } | (hist_opts or {})
+
+    for volume, counts in zip(prepared['volumes'], prepared['counts']):
+        draw_histogram(
+            ax, counts, prepared['bins'], label=f'Volume {volume}', **hist_opts
+        )
+
+    ax.set_xlabel('Hits per event')
+    ax.set_ylabel('Modules')
+    ax.legend(fontsize='x-small')
+
+
+def _prepare_rz_occupancy(data, z_bins=None, r_bins=None):
+    result = occupancy(data, z_bins, r_bins)
+    if result.rz_counts is None:
+        raise RuntimeError('Occupancy has no r-z map.')
+
+    return {
+        'rz_counts': result.rz_counts,
+        'z_bins': result.z_bins,
+        'r_bins': result.r_bins,
+        'n_events': np.array(result.n_events)
+    }
+
+
+@plot('exatrkx.detector.rz_occupancy', None, prepare=_prepare_rz_occupancy)
+def rz_occupancy_plot(ax, prepared, per_event: bool = True, log: bool = True, mesh_opts: dict = None):
+    """
+    Plot r-z map of number of hits.
+
+    :param ax: matplotlib axis object.
+    :param data: Data. Require occupancy or hits.
+    :param z_bins: Bin edges of z. Only use for hits.
+    :param r_bins: Bin edges of r. Only use for hits.
+    :param per_event: Average over events instead of total counts.
+    :param log: Use log color scale.
+    :param mesh_opts: Options pass to ax.pcolormesh.
+    :return:
+    """
+    values = prepared['rz_counts'].astype(float)
+    if per_event:
+        values /= max(int(prepared['n_events']), 1)
+
+    # Hide empty cells.
+    values = np.ma.masked_where(values == 0, values)
+
+    mesh_opts = {
+        'cmap': 'viridis',
+        'norm': matplotlib.colors.LogNorm() if log else None
+    } | (mesh_opts or {})
+    mesh = ax.pcolormesh(
+        prepared['z_bins'], prepared['r_bins'], values.T, **mesh_opts
+    )
+    ax.figure.colorbar(mesh, ax=ax, label='Hits per event' if per_event else 'Hits')
+
+    ax.set_xlabel('z [mm]')
+    ax.set_ylabel('r [mm]')
+
+
+class LayerPairCounts:
+    """
+    Number of edges of each pair of layers, accumulated over events.
+
+    Layer pair is unordered, edge is counted at (lower layer code, higher layer code).
+    Counts are square matrices over layers seen so far:
+        - edges: Edges.
+        - true: True edges.
+        - reference: Truth reference edges, e.g. consecutive hits of particles.
+        - matched: Truth reference edges also found in edges.
+
+    Edge purity is true / edges, and truth edge efficiency is matched / reference.
+    """
+    COUNTS = ('edges', 'true', 'reference', 'matched')
+
+    def __init__(self):
+        self.layers = np.zeros(0, dtype=np.int64)
+        self.counts = {
+            name: np.zeros((0, 0), dtype=np.int64) for name in self.COUNTS
+        }
+        self.n_events = 0
+
+    def add(
+        self,
+        hits,
+        edges,
+        edge_truth: np.ndarray = None,
+        truth_edges=None,
+        selection: np.ndarray = None
+    ) -> 'LayerPairCounts':
+        """
+        Count edges of an event.
+
+        :param hits: Hits table of one event.
+        :param edges: Edges table.
+        :param edge_truth: Boolean truth of each edge. True edges are not counted if None.
+        :param truth_edges: Truth reference edges. Reference is not counted if None.
+        :param selection: Optional mask or index of edges to count, e.g. score cut.
+        :return: This counts.
+        """
+        hit_id = column(hits, 'hit_id')
+        hit_layer = hit_layer_code(hits)
+
+        self._expand(np.flatnonzero(np.bincount(hit_layer)))
+        n_layers = len(self.layers)
+
+        lookup = np.full(1 << (VOLUME_BITS + LAYER_BITS), -1, dtype=np.int64)
+        lookup[self.layers] = np.arange(n_layers)
+        hit_dense_layer = lookup[hit_layer]
+
+        def pair_code(hit_id_1, hit_id_2):
+            # Dense code of layer pair of each edge, -1 if any hit is not found.
+            index_1 = index_lookup(hit_id, hit_id_1)
+            index_2 = index_lookup(hit_id, hit_id_2)
+
+            layer_1 = hit_dense_layer[index_1]
+            layer_2 = hit_dense_layer[index_2]
+
+            code = np.minimum(layer_1, layer_2) * n_layers + np.maximum(layer_1, layer_2)
+            code[(index_1 < 0) | (index_2 < 0)] = -1
+
+            return code
+
+        def count(code, mask=None):
+            found = code >= 0
+            if mask is not None:
+                found &= mask
+
+            return np.bincount(
+                code[found], minlength=n_layers * n_layers
+            ).reshape(n_layers, n_layers)
+
+        edge_id_1 = column(edges, 'hit_id_1')
+        edge_id_2 = column(edges, 'hit_id_2')
+        edge_code = pair_code(edge_id_1, edge_id_2)
+
+        mask = None
+        if selection is not None:
+            mask = np.zeros(len(edge_code), dtype=bool)
+            mask[selection] = True
+
+        self.counts['edges'] += count(edge_code, mask)
+
+        if edge_truth is not None:
+            true_mask = np.asarray(edge_truth, dtype=bool)
+            if mask is not None:
+                true_mask = true_mask & mask
+            self.counts['true'] += count(edge_code, true_mask)
+
+        if truth_edges is not None:
+            reference_id_1 = column(truth_edges, 'hit_id_1')
+            reference_id_2 = column(truth_edges, 'hit_id_2')
+            reference_code = pair_code(reference_id_1, reference_id_2)
+
+            matched = EdgeSet.from_table(edges, mask).contains(
+                pair_keys(reference_id_1, reference_id_2)
+            )
+
+            self.counts['reference'] += count(reference_code)
+            self.counts['matched'] += count(reference_code, matched)
+
+        self.n_events += 1
+
+        return self
+
+    def merge(self, other: 'LayerPairCounts') -> 'LayerPairCounts':
+        """
+        Add counts of other to this one.
+
+        :param other: Other counts.
+        :return: This counts.
+        """
+        self._expand(other.layers)
+
+        position = np.searchsorted(self.layers, other.layers)
+        for name in self.COUNTS:
+            self.counts[name][np.ix_(position, position)] += other.counts[name]
+        self.n_events += other.n_events
+
+        return self
+
+    def __iadd__(self, other: 'LayerPairCounts') -> 'LayerPairCounts':
+        return self.merge(other)
+
+    def _expand(self, layers: np.ndarray):
+        layers = np.union1d(self.layers, layers).astype(np.int64)
+        if len(layers) == len(self.layers):
+            return
+
+        position = np.searchsorted(layers, self.layers)
+        for name in self.COUNTS:
+            counts = np.zeros((len(layers), len(layers)), dtype=np.int64)
+            counts[np.ix_(position, position)] = self.counts[name]
+            self.counts[name] = counts
+        self.layers = layers
+
+
+def layer_pair_counts(data, edge_filter=None) -> LayerPairCounts:
+    """
+    LayerPairCounts pass in data, or count it from a single event.
+
+    Truth of edges is read from truth column of edges,
+    or decided by particle_id of both hits if truth table is given.
+    Truth edges are built from hits and truth table if not given,
+    see ExaTrkXPlots.edge_sets.build_truth_edges.
+
+    :param data: Data with layer_pairs, or hits and edges.
+    :param edge_filter: Count edges pass filter only. Only use for single event.
+    :return: LayerPairCounts.
+    """
+    if 'layer_pairs' in data:
+        # Precomputed over events, selection is decided when it is counted.
+        return data['layer_pairs']
+
+    for requirement in ('hits', 'edges'):
+        if requirement not in data:
+            raise RuntimeError(f'Data requirement for layer pairs not satisfy: {requirement}')
+
+    hits, edges = data['hits'], data['edges']
+
+    edge_truth = None
+    if has_columns(edges, ['truth']):
+        edge_truth = column(edges, 'truth') > 0.5
+    elif 'truth' in data:
+        edge_truth = pair_truth(edges, data['truth'])
+
+    truth_edges = None
+    if 'truth_edges' in data or 'truth' in data:
+        truth_edges = truth_edges_of(data)
+
+    return LayerPairCounts().add(
+        hits, edges,
+        edge_truth=edge_truth,
+        truth_edges=truth_edges,
+        selection=None if edge_filter is None else row_mask(edges, edge_filter)
+    )
+
+
+def _prepare_layer_pairs(data, metric: str = 'purity', edge_filter=None):
+    result = layer_pair_counts(data, edge_filter)
+
+    if metric == 'purity':
+        numerator, denominator = result.counts['true'], result.counts['edges']
+    elif metric == 'efficiency':
+        numerator, denominator = result.counts['matched'], result.counts['reference']
+    else:
+        raise ValueError(f'Unknown metric: {metric}')
+
+    # Only show layers with any count.
+    used = (denominator.sum(axis=0) + denominator.sum(axis=1)) > 0
+    volume, layer = decode_layer(result.layers[used])
+
+    return {
+        'volume': volume,
+        'layer': layer,
+        'numerator': numerator[np.ix_(used, used)],
+        'denominator': denominator[np.ix_(used, used)]
+    }
+
+
+@plot('exatrkx.detector.layer_pairs', None, prepare=_prepare_layer_pairs)
+def layer_pair_plot(
+    ax,
+    prepared,
+    metric: str = 'purity',
+    annotate: bool = True,
+    mesh_opts: dict = None,
+    text_opts: dict = None
+):
+    """
+    Plot edge purity or truth edge efficiency of each pair of layers as a matrix.
+
+    :param ax: matplotlib axis object.
+    :param data:
+        Data. Require layer_pairs, or hits and edges.
+        Purity also require truth column of edges or truth table.
+        Efficiency also require truth_edges or truth table.
+    :param metric: Either purity or efficiency.
+    :param edge_filter: Plot edges pass filter only. Only use for single event.
+    :param annotate: Annotate value in each cell.
+    :param mesh_opts: Options pass to ax.pcolormesh.
+    :param text_opts: Options pass to ax.text.
+    :return:
+    """
+    numerator, denominator = prepared['numerator'], prepared['denominator']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numerator / denominator
+
+    # Hide empty cells.
+    values = np.ma.masked_where(denominator == 0, values)
+
+    mesh_opts = {
+        'cmap': 'viridis',
+        'vmin': 0.0,
+        'vmax': 1.0
+    } | (mesh_opts or {})
+    mesh = ax.pcolormesh(values, **mesh_opts)
+    ax.figure.colorbar(mesh, ax=ax, label=metric.capitalize())
+
+    if annotate:
+        text_opts = {
+            'ha': 'center',
+            'va': 'center',
+            'fontsize': 'xx-small'
+        } | (text_opts or {})
+
+        for i, j in zip(*np.nonzero(~np.ma.getmaskarray(values))):
+            ax.text(j + 0.5, i + 0.5, f'{values[i, j]:.2f}', **text_opts)
+
+    labels = [f'{volume}:{layer}' for volume, layer in zip(prepared['volume'], prepared['layer'])]
+    positions = np.arange(len(labels)) + 0.5
+
+    ax.set_xticks(positions, labels, rotation=90, fontsize='x-small')
+    ax.set_yticks(positions, labels, fontsize='x-small')
+    ax.set_xlabel('Volume:Layer')
+    ax.set_ylabel('Volume:Layer')
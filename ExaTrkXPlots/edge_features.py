@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Geometric features of edges, computed from hits with array lookups only.
+
+Each edge points from hit_id_1 to hit_id_2, features are signed in that direction:
+    - dr: Difference of transverse radius.
+    - dz: Difference of z.
+    - dphi: Difference of azimuth, wrapped into [-pi, pi).
+    - deta: Difference of pseudorapidity.
+    - z0: z intercept at r = 0 of straight line through both hits in r-z plane.
+    - phi_slope: dphi / dr.
+    - curvature: Signed curvature of circle through origin and both hits in x-y plane,
+      a proxy of 1 / pT.
+
+Edges with any hit not found in hits get NaN.
+
+Features of an event are computed on first request and cached with its edges table,
+so plots of same event share them:
+
+    features = edge_features(hits, edges)
+    features['dphi']
+
+Add entry to EDGE_FEATURES to define more features.
+"""
+
+from typing import Callable, Dict
+import threading
+import weakref
+
+import numpy as np
+
+from ExaTrkXPlots.columns import cartesian, column, has_columns, index_lookup
+
+
+class EdgeFeatures:
+    """
+    Lazily computed geometric features of edges of an event.
+
+    index is row index in hits of hit_id_1 and hit_id_2, missing hits point to row 0.
+    missing is boolean mask of edges with missing hit, None if all hits are found.
+    """
+    def __init__(self, hits, edges):
+        """
+        :param hits: Hits table.
+        :param edges: Edges table. Only hit_id_1 and hit_id_2 are read, no reference is kept.
+        """
+        self.hits = hits
+
+        hit_id = column(hits, 'hit_id')
+        index_1 = index_lookup(hit_id, column(edges, 'hit_id_1'))
+        index_2 = index_lookup(hit_id, column(edges, 'hit_id_2'))
+
+        missing = (index_1 < 0) | (index_2 < 0)
+        if missing.any():
+            # Safe gather, features of these edges are overwritten by NaN.
+            index_1[missing] = 0
+            index_2[missing] = 0
+        else:
+            missing = None
+
+        self.index = index_1, index_2
+        self.missing = missing
+
+        self._hit_values: Dict[str, np.ndarray] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        :param name: Feature name, key of EDGE_FEATURES.
+        :return: Feature of each edge.
+        """
+        with self._lock:
+            if name not in self._values:
+                if name not in EDGE_FEATURES:
+                    raise KeyError(f'Unknown edge feature: {name}')
+
+                values = EDGE_FEATURES[name](self)
+                if self.missing is not None:
+                    values[self.missing] = np.nan
+
+                self._values[name] = values
+
+            return self._values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in EDGE_FEATURES
+
+    def hit_values(self, name: str) -> np.ndarray:
+        """
+        :param name: One of x, y, z, r, phi or eta.
+        :return: Value of each hit.
+        """
+        with self._lock:
+            if name not in self._hit_values:
+                self._hit_values[name] = self._compute_hit_values(name)
+
+            return self._hit_values[name]
+
+    def pair(self, name: str):
+        """
+        :param name: Hit value name, see hit_values.
+        :return: Value of first and second hit of each edge.
+        """
+        values = self.hit_values(name)
+        index_1, index_2 = self.index
+
+        return values[index_1], values[index_2]
+
+    def difference(self, name: str) -> np.ndarray:
+        """
+        :param name: Hit value name, see hit_values.
+        :return: Value of second hit minus first hit of each edge.
+        """
+        values_1, values_2 = self.pair(name)
+
+        # In-place to keep only one temporary per feature.
+        values_2 -= values_1
+
+        return values_2
+
+    def _compute_hit_values(self, name: str) -> np.ndarray:
+        if name in ('x', 'y'):
+            x, y = cartesian(self.hits)
+            return x if name == 'x' else y
+
+        if name == 'z':
+            return column(self.hits, 'z')
+
+        if name in ('r', 'phi') and has_columns(self.hits, [name]):
+            return column(self.hits, name)
+
+        if name == 'r':
+            x, y = self.hit_values('x'), self.hit_values('y')
+            return np.sqrt(x * x + y * y)
+
+        if name == 'phi':
+            return np.arctan2(self.hit_values('y'), self.hit_values('x'))
+
+        if name == 'eta':
+            return np.arcsinh(self.hit_values('z') / self.hit_values('r'))
+
+        raise KeyError(f'Unknown hit value: {name}')
+
+
+def _dphi(features: EdgeFeatures) -> np.ndarray:
+    dphi = features.difference('phi')
+
+    # Difference of two angles in [-pi, pi] is in [-2pi, 2pi].
+    dphi -= 2 * np.pi * (dphi >= np.pi)
+    dphi += 2 * np.pi * (dphi < -np.pi)
+
+    return dphi
+
+
+def _z0(features: EdgeFeatures) -> np.ndarray:
+    r_1, r_2 = features.pair('r')
+    z_1, z_2 = features.pair('z')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # z1 - r1 * dz / dr, in form of weighted average to avoid cancellation.
+        return (z_1 * r_2 - z_2 * r_1) / (r_2 - r_1)
+
+
+def _phi_slope(features: EdgeFeatures) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return features['dphi'] / features['dr']
+
+
+def _curvature(features: EdgeFeatures) -> np.ndarray:
+    x_1, x_2 = features.pair('x')
+    y_1, y_2 = features.pair('y')
+
+    # Circle through origin, p1 and p2: k = 2 * cross(p1, p2) / (|p1| |p2| |p2 - p1|).
+    cross = x_1 * y_2 - x_2 * y_1
+
+    x_2 -= x_1
+    y_2 -= y_1
+    chord = np.sqrt(x_2 * x_2 + y_2 * y_2)
+
+    r_1, r_2 = features.pair('r')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 2 * cross / (r_1 * r_2 * chord)
+
+
+# Feature name to function take EdgeFeatures and return new array of each edge.
+EDGE_FEATURES: Dict[str, Callable[[EdgeFeatures], np.ndarray]] = {
+    'dr': lambda features: features.difference('r'),
+    'dz': lambda features: features.difference('z'),
+    'dphi': _dphi,
+    'deta': lambda features: features.difference('eta'),
+    'z0': _z0,
+    'phi_slope': _phi_slope,
+    'curvature': _curvature
+}
+
+
+# (id of edges table, factory) to weak reference of table, hits and cached object.
+# Tables are not hashable, so WeakKeyDictionary cannot be used.
+_cache: Dict[tuple, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def cached_for_edges(hits, edges, factory: Callable):
+    """
+    Object build by factory(hits, edges), cached until edges table is freed.
+    Tables do not support weak reference, e.g. dict, are not cached.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :param factory: Callable take hits and edges.
+    :return: Cached or newly build object.
+    """
+    key = id(edges), factory
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is edges and entry[1] is hits:
+            return entry[2]
+
+    value = factory(hits, edges)
+
+    try:
+        ref = weakref.ref(edges)
+    except TypeError:
+        return value
+
+    with _cache_lock:
+        _cache[key] = ref, hits, value
+    weakref.finalize(edges, _evict, key, ref)
+
+    return value
+
+
+def edge_features(hits, edges) -> EdgeFeatures:
+    """
+    Geometric features of edges, cached until edges table is freed.
+    Tables do not support weak reference, e.g. dict, are not cached.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :return: EdgeFeatures, index by feature name.
+    """
+    return cached_for_edges(hits, edges, EdgeFeatures)
+
+
+def _evict(key: tuple, ref):
+    with _cache_lock:
+        # Entry may already be replaced by a new table with same id.
+        if key in _cache and _cache[key][0] is ref:
+            del _cache[key]
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Edge set comparison, e.g. graph against truth edges or two graph constructions.
+
+Each undirected hit pair is packed into a single 64-bit key,
+so set operations are sort and binary search on integer arrays instead of merge on columns:
+
+    key = (min(hit_id_1, hit_id_2) << 32) | max(hit_id_1, hit_id_2)
+
+Hit ids must be in [0, 2**31).
+
+For plot data requirement, detail list below:
+    - hits:
+        - required: hit_id, x, y or r
+    - edges:
+        - required: hit_id_1, hit_id_2
+    - reference_edges:
+        - required: hit_id_1, hit_id_2
+        Graph to compare edges with, e.g. previous graph construction.
+    - truth_edges:
+        - required: hit_id_1, hit_id_2
+        Built from hits and truth by connecting hits of each particle sorted on r if absent.
+    - truth:
+        - required: hit_id, particle_id
+    - particles:
+        - required: particle_id
+        - optional: pt or px, py, eta, or any column use as variable.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
+
+from typing import Tuple
+
+import numpy as np
+from matplotlib import collections as mc
+
+from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, has_columns, index_lookup, row_mask
+from ExaTrkXPlots.histogram import histogram
+from ExaTrkXPlots.hits import hit_particle_ids, particle_pt
+from ExaTrkXPlots.pairs import pair_segments, pair_truth
+
+
+def pair_keys(hit_id_1, hit_id_2) -> np.ndarray:
+    """
+    Pack undirected hit pairs into 64-bit keys.
+
+    :param hit_id_1: First hit id of each pair.
+    :param hit_id_2: Second hit id of each pair.
+    :return: Key of each pair, same for both directions.
+    """
+    hit_id_1 = np.asarray(hit_id_1, dtype=np.int64)
+    hit_id_2 = np.asarray(hit_id_2, dtype=np.int64)
+
+    low = np.minimum(hit_id_1, hit_id_2)
+    high = np.maximum(hit_id_1, hit_id_2)
+
+    if len(low) and (low.min() < 0 or high.max() >= 2**31):
+        raise ValueError('Hit id must be in [0, 2**31) to be packed in pair key.')
+
+    low <<= 32
+    low |= high
+
+    return low
+
+
+def decode_keys(keys) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param keys: Pair keys.
+    :return: Lower and higher hit id of each pair.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+def edge_keys(edges, selection=None) -> np.ndarray:
+    """
+    :param edges: Edges table.
+    :param selection: Optional row selection of edges, see ExaTrkXPlots.columns.row_mask.
+    :return: Pair key of each selected edge.
+    """
+    keys = pair_keys(column(edges, 'hit_id_1'), column(edges, 'hit_id_2'))
+
+    if selection is not None:
+        keys = keys[row_mask(edges, selection)]
+
+    return keys
+
+
+def _shared(keys_1: np.ndarray, keys_2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Membership of two sorted unique key arrays in each other.
+    Smaller array is binary searched in larger one, found positions give membership of larger.
+    Searching sorted queries walk larger array in order, so it stay in cache.
+    """
+    if len(keys_1) > len(keys_2):
+        found_2, found_1 = _shared(keys_2, keys_1)
+        return found_1, found_2
+
+    found_2 = np.zeros(len(keys_2), dtype=bool)
+    if len(keys_1) == 0 or len(keys_2) == 0:
+        return np.zeros(len(keys_1), dtype=bool), found_2
+
+    position = np.searchsorted(keys_2, keys_1)
+    np.minimum(position, len(keys_2) - 1, out=position)
+
+    found_1 = keys_2[position] == keys_1
+    found_2[position[found_1]] = True
+
+    return found_1, found_2
+
+
+class EdgeSet:
+    """
+    Set of undirected hit pairs, stored as sorted unique keys.
+    Duplicated edges and both directions of same pair are counted once.
+    """
+    def __init__(self, keys: np.ndarray, assume_sorted: bool = False):
+        """
+        :param keys: Pair keys, see pair_keys.
+        :param assume_sorted: Keys are already sorted and unique.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+
+        if not assume_sorted:
+            keys = np.sort(keys)
+            if len(keys):
+                keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+
+        self.keys = keys
+
+    @classmethod
+    def from_table(cls, edges, selection=None) -> 'EdgeSet':
+        """
+        :param edges: Edges table.
+        :param selection: Optional row selection of edges.
+        :return: EdgeSet of selected edges.
+        """
+        return cls(edge_keys(edges, selection))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """
+        :param keys:
+            Pair keys to query. Sorted keys, e.g. keys of another EdgeSet, are fastest.
+        :return: Boolean mask of keys in this set.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+
+        if len(self.keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+
+        order = None
+        if len(keys) > 1 and not np.all(keys[1:] >= keys[:-1]):
+            # Binary search of unordered queries miss cache on every step,
+            # 10^7 queries take seconds. Search in sorted order instead,
+            # argsort is still most of the cost, so query with sorted keys if order is not needed.
+            order = np.argsort(keys)
+            keys = keys[order]
+
+        position = np.searchsorted(self.keys, keys)
+        np.minimum(position, len(self.keys) - 1, out=position)
+        found = self.keys[position] == keys
+
+        if order is None:
+            return found
+
+        result = np.empty(len(keys), dtype=bool)
+        result[order] = found
+
+        return result
+
+    def mask(self, edges) -> np.ndarray:
+        """
+        :param edges: Edges table.
+        :return: Boolean mask of edges in this set.
+        """
+        return self.contains(edge_keys(edges))
+
+    def intersection(self, other: 'EdgeSet') -> 'EdgeSet':
+        found, _ = _shared(self.keys, other.keys)
+        return EdgeSet(self.keys[found], assume_sorted=True)
+
+    def difference(self, other: 'EdgeSet') -> 'EdgeSet':
+        found, _ = _shared(self.keys, other.keys)
+        return EdgeSet(self.keys[~found], assume_sorted=True)
+
+    def union(self, other: 'EdgeSet') -> 'EdgeSet':
+        _, found = _shared(self.keys, other.keys)
+        merged = np.concatenate([self.keys, other.keys[~found]])
+        merged.sort(kind='stable')
+
+        return EdgeSet(merged, assume_sorted=True)
+
+    __and__ = intersection
+    __sub__ = difference
+    __or__ = union
+
+    def to_table(self) -> dict:
+        """
+        :return: Dict of hit_id_1 and hit_id_2, lower hit id first.
+        """
+        hit_id_1, hit_id_2 = decode_keys(self.keys)
+
+        return {
+            'hit_id_1': hit_id_1,
+            'hit_id_2': hit_id_2
+        }
+
+
+def build_truth_edges(hits, truth) -> dict:
+    """
+    Connect consecutive hits of each particle sorted on transverse radius.
+    Noise hits are not connected.
+
+    :param hits: Hits table.
+    :param truth: Truth table.
+    :return: Dict of hit_id_1 and hit_id_2, inner hit first.
+    """
+    hit_id = column(hits, 'hit_id')
+    particle_id = hit_particle_ids(hits, truth)
+
+    if has_columns(hits, ['r']):
+        r = column(hits, 'r')
+    else:
+        x, y = cartesian(hits)
+        r = np.sqrt(x * x + y * y)
+
+    order = np.lexsort((r, particle_id))
+    particle_id = particle_id[order]
+
+    consecutive = (particle_id[1:] == particle_id[:-1]) & (particle_id[1:] != 0)
+
+    return {
+        'hit_id_1': hit_id[order[:-1][consecutive]],
+        'hit_id_2': hit_id[order[1:][consecutive]]
+    }
+
+
+def truth_edges_of(data):
+    """
+    :param data: Data with truth_edges, or hits and truth.
+    :return: Truth edges pass in data, or build from hits and truth.
+    """
+    if 'truth_edges' in data:
+        return data['truth_edges']
+
+    for requirement in ('hits', 'truth'):
+        if requirement not in data:
+            raise RuntimeError(f'Data requirement for truth edges not satisfy: {requirement}')
+
+    return build_truth_edges(data['hits'], data['truth'])
+
+
+def edge_recall(edges, truth_edges, selection=None) -> Tuple[EdgeSet, np.ndarray]:
+    """
+    :param edges: Edges table.
+    :param truth_edges: Truth edges table.
+    :param selection: Optional row selection of edges, e.g. score cut.
+    :return:
+        EdgeSet of truth edges, and boolean mask of its keys found in edges.
+        Mask follow sorted keys of the set, not rows of truth_edges,
+        so both sets are searched in sorted order.
+    """
+    truth = EdgeSet.from_table(truth_edges)
+
+    return truth, EdgeSet.from_table(edges, selection).contains(truth.keys)
+
+
+def compare_edges(edges, reference_edges, selection=None, reference_selection=None) -> dict:
+    """
+    Compare two graphs.
+
+    :param edges: Edges table.
+    :param reference_edges: Edges table to compare with.
+    :param selection: Optional row selection of edges.
+    :param reference_selection: Optional row selection of reference edges.
+    :return: Dict of EdgeSet:
+        - common: Pairs in both graphs.
+        - gained: Pairs in edges only.
+        - lost: Pairs in reference edges only.
+    """
+    current = EdgeSet.from_table(edges, selection)
+    reference = EdgeSet.from_table(reference_edges, reference_selection)
+
+    found, reference_found = _shared(current.keys, reference.keys)
+
+    return {
+        'common': EdgeSet(current.keys[found], assume_sorted=True),
+        'gained': EdgeSet(current.keys[~found], assume_sorted=True),
+        'lost': EdgeSet(reference.keys[~reference_found], assume_sorted=True)
+    }
+
+
+def _particle_values(particles, var_col):
+    if var_col == 'pt' and not has_columns(particles, ['pt']):
+        return particle_pt(particles)
+
+    return column(particles, var_col)
+
+
+def _prepare_edge_recall(data, var_col, bins, edge_filter=None):
+    edges, truth, particles = data['edges'], data['truth'], data['particles']
+    truth_edges = truth_edges_of(data)
+
+    truth_set, found = edge_recall(edges, truth_edges, edge_filter)
+
+    # Both hits of truth edge belong to same particle.
+    edge_particle = index_lookup(column(truth, 'hit_id'), decode_keys(truth_set.keys)[0])
+    edge_particle = np.where(edge_particle >= 0, column(truth, 'particle_id')[edge_particle], 0)
+    particle_index = index_lookup(column(particles, 'particle_id'), edge_particle)
+
+    known = particle_index >= 0
+    values = _particle_values(particles, var_col)[particle_index[known]]
+    found_known = found[known]
+
+    (total, matched), bins = histogram(
+        values, bins=bins, masks=[np.ones(len(found_known), dtype=bool), found_known]
+    )
+
+    return {
+        'total': total,
+        'found': matched,
+        'bins': bins,
+        'recall': np.count_nonzero(found) / max(len(found), 1)
+    }
+
+
+@plot(
+    'exatrkx.edge_sets.recall',
+    ['edges', 'truth', 'particles'],
+    prepare=_prepare_edge_recall
+)
+def edge_recall_plot(ax, prepared, var_col, var_name: str = None, errbar_opts: dict = None):
+    """
+    Plot fraction of truth edges found in edges against variable of their particle.
+    Require edges, truth and particles dataframe, and truth_edges or hits dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param var_col: Column of particles to use as x axis, pt is computed from px, py if absent.
+    :param var_name: Name to display as x axis label. Same as var_col if None.
+    :param bins: Bins of variable.
+    :param edge_filter: Use edges pass filter only, e.g. score cut.
+    :param errbar_opts: Options pass to ax.errorbar.
+    :return:
+    """
+    total = prepared['total'].astype(float)
+    nonzero = total != 0
+
+    recall = np.divide(prepared['found'], total, out=np.zeros_like(total), where=nonzero)
+    error = np.sqrt(np.divide(
+        recall * (1.0 - recall), total, out=np.zeros_like(total), where=nonzero
+    ))
+
+    bins = np.asarray(prepared['bins'])
+
+    errbar_opts = {
+        'fmt': 'o',
+        'lw': 2
+    } | (errbar_opts or {})
+    ax.errorbar(
+        0.5 * (bins[1:] + bins[:-1]), recall,
+        xerr=0.5 * (bins[1:] - bins[:-1]), yerr=error,
+        label=f'Edge recall ({prepared["recall"]:.3f})',
+        **errbar_opts
+    )
+
+    ax.set_ylim(0.0, 1.05)
+    ax.set_xlabel(var_name or var_col)
+    ax.set_ylabel('Truth edge recall')
+    ax.legend()
+    ax.grid(True)
+
+
+def _prepare_edge_difference(data, edge_filter=None, reference_filter=None):
+    hits = data['hits']
+
+    result = compare_edges(data['edges'], data['reference_edges'], edge_filter, reference_filter)
+
+    prepared = {
+        'n_common': len(result['common'])
+    }
+    for name in ('gained', 'lost'):
+        table = result[name].to_table()
+
+        prepared[f'{name}_segments'] = pair_segments(hits, table)
+        prepared[f'n_{name}'] = len(result[name])
+
+        if 'truth' in data:
+            prepared[f'n_{name}_true'] = np.count_nonzero(pair_truth(table, data['truth']))
+
+    return prepared
+
+
+@plot(
+    'exatrkx.edge_sets.difference',
+    ['hits', 'edges', 'reference_edges'],
+    prepare=_prepare_edge_difference
+)
+def edge_difference_plot(ax, prepared, gained_opts: dict = None, lost_opts: dict = None):
+    """
+    Plot 2D connections of edges gained and lost against reference edges.
+    Require hits, edges and reference_edges dataframe.
+    Number of true edges is shown in legend if truth dataframe is given.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param edge_filter: Use edges pass filter only.
+    :param reference_filter: Use reference edges pass filter only.
+    :param gained_opts: Options pass to LineCollection of gained edges.
+    :param lost_opts: Options pass to LineCollection of lost edges.
+    :return:
+    """
+    labels = {}
+    for name in ('gained', 'lost'):
+        label = f'{name.capitalize()} {prepared[f"n_{name}"]}'
+        if f'n_{name}_true' in prepared:
+            label += f' ({prepared[f"n_{name}_true"]} true)'
+        labels[name] = label
+
+    gained_opts = {
+        'linewidths': 0.5,
+        'colors': 'tab:green',
+        'label': labels['gained']
+    } | (gained_opts or {})
+    lost_opts = {
+        'linewidths': 0.5,
+        'colors': 'tab:red',
+        'label': labels['lost']
+    } | (lost_opts or {})
+
+    ax.add_collection(mc.LineCollection(prepared['lost_segments'], **lost_opts))
+    ax.add_collection(mc.LineCollection(prepared['gained_segments'], **gained_opts))
+
+    ax.autoscale_view()
+    ax.set_title(f'{prepared["n_common"]} common edges')
+    ax.set_xlabel('x [mm]')
+    ax.set_ylabel('y [mm]')
+    ax.legend()
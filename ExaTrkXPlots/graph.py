@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Node degree and neighbourhood statistics of edge graph in ExaTrkX routine.
+
+Graph of an event is built once from edges as CSR (by source) and CSC (by target) arrays,
+and cached with its edges table, so plots of same event share it:
+
+    graph = edge_graph(hits, edges)
+    graph.in_degree, graph.csr, graph.k_hop_sizes(2)
+
+Edge points from hit_id_1 to hit_id_2, nodes are rows of hits.
+
+For plot data requirement, detail list below:
+    - hits:
+        - required: hit_id, z and x, y or r
+    - edges:
+        - required: hit_id_1, hit_id_2
+        - optional: truth
+    - truth:
+        - required: hit_id, particle_id
+
+Edges are split true and fake by truth column of edges,
+or by particle_id of both hits if truth table is given.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
+
+from functools import cached_property
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse
+
+from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import column, has_columns, num_rows, row_mask
+from ExaTrkXPlots.detector import hit_r
+from ExaTrkXPlots.edge_features import cached_for_edges
+from ExaTrkXPlots.histogram import bin_index, draw_histogram, histogram_bins
+from ExaTrkXPlots.pairs import pair_hit_index, pair_truth
+
+
+def _group(keys: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pointer of each group like CSR indptr, and stable order of rows grouped by key.
+    """
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    # Sort key and row packed in one integer, about 3x faster than stable argsort.
+    packed = keys.astype(np.int64) << 32
+    packed |= np.arange(len(keys), dtype=np.int64)
+    packed.sort()
+
+    return indptr, (packed & 0xFFFFFFFF).astype(keys.dtype)
+
+
+class EdgeGraph:
+    """
+    Directed graph of edges over hit rows.
+
+    Edges with any hit not found in hits are dropped,
+    edge_index is row in edges table of each kept edge.
+
+    Degrees are counted on construction, CSR and CSC arrays are built on first use.
+    Each is tuple of (indptr, indices, edges), neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], successors in csr and predecessors in csc.
+    edges is position of same entries in source, target and edge_index.
+    """
+    def __init__(self, n_nodes: int, source: np.ndarray, target: np.ndarray, edge_index: np.ndarray = None):
+        """
+        :param n_nodes: Number of nodes.
+        :param source: Source node of each edge.
+        :param target: Target node of each edge.
+        :param edge_index: Row in edges table of each edge. Same as position if None.
+        """
+        self.n_nodes = n_nodes
+        self.source = source
+        self.target = target
+        self.edge_index = np.arange(len(source)) if edge_index is None else edge_index
+
+        self.out_degree = np.bincount(source, minlength=n_nodes)
+        self.in_degree = np.bincount(target, minlength=n_nodes)
+
+    @classmethod
+    def from_tables(cls, hits, edges) -> 'EdgeGraph':
+        """
+        :param hits: Hits table.
+        :param edges: Edges table.
+        :return: EdgeGraph of all edges.
+        """
+        index_1, index_2 = pair_hit_index(hits, edges)
+
+        found = (index_1 >= 0) & (index_2 >= 0)
+        edge_index = np.flatnonzero(found)
+
+        return cls(num_rows(hits), index_1[found], index_2[found], edge_index)
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    @property
+    def degree(self) -> np.ndarray:
+        return self.out_degree + self.in_degree
+
+    @cached_property
+    def csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        indptr, edges = _group(self.source, self.out_degree)
+        return indptr, self.target[edges], edges
+
+    @cached_property
+    def csc(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        indptr, edges = _group(self.target, self.in_degree)
+        return indptr, self.source[edges], edges
+
+    def edge_mask(self, selection) -> np.ndarray:
+        """
+        :param selection: Boolean mask or row index of edges table.
+        :return: Boolean mask of edges of this graph.
+        """
+        selection = np.asarray(selection)
+        if selection.dtype != bool:
+            mask = np.zeros(int(self.edge_index.max(initial=-1)) + 1, dtype=bool)
+            mask[selection[selection < len(mask)]] = True
+            selection = mask
+
+        return selection[self.edge_index]
+
+    def degrees(self, direction: str = 'all', selection=None) -> np.ndarray:
+        """
+        Degree of each node, counting selected edges only.
+
+        :param direction: One of in, out or all.
+        :param selection: Optional boolean mask or row index of edges table.
+        :return: Degree of each node.
+        """
+        if direction not in ('in', 'out', 'all'):
+            raise ValueError(f'Unknown direction: {direction}')
+
+        if selection is None:
+            return {'in': self.in_degree, 'out': self.out_degree, 'all': self.degree}[direction]
+
+        mask = self.edge_mask(selection)
+
+        result = np.zeros(self.n_nodes, dtype=np.int64)
+        if direction in ('out', 'all'):
+            result += np.bincount(self.source[mask], minlength=self.n_nodes)
+        if direction in ('in', 'all'):
+            result += np.bincount(self.target[mask], minlength=self.n_nodes)
+
+        return result
+
+    def subgraph(self, selection) -> 'EdgeGraph':
+        """
+        :param selection: Boolean mask or row index of edges table.
+        :return: EdgeGraph of selected edges, e.g. above score cut.
+        """
+        mask = self.edge_mask(selection)
+
+        return EdgeGraph(self.n_nodes, self.source[mask], self.target[mask], self.edge_index[mask])
+
+    def adjacency(self, directed: bool = True) -> scipy.sparse.csr_matrix:
+        """
+        :param directed: Connect source to target only, otherwise both ways.
+        :return: Boolean adjacency matrix, duplicated edges are merged.
+        """
+        indptr, indices, _ = self.csr
+        adjacency = scipy.sparse.csr_matrix(
+            (np.ones(len(indices), dtype=bool), indices, indptr),
+            shape=(self.n_nodes, self.n_nodes)
+        )
+        if not directed:
+            adjacency = adjacency + adjacency.T
+
+        adjacency = adjacency.tocsr()
+        adjacency.sum_duplicates()
+
+        return adjacency
+
+    def k_hop_sizes(self, k: int, directed: bool = False) -> np.ndarray:
+        """
+        Number of distinct nodes reachable within k hops, excluding node itself.
+        Computed as nonzero of boolean (A + I)^k, memory grows fast with k on dense graph.
+
+        :param k: Number of hops.
+        :param directed: Follow edges from source to target only.
+        :return: Size of k-hop neighbourhood of each node.
+        """
+        step = (self.adjacency(directed) + scipy.sparse.identity(self.n_nodes, dtype=bool, format='csr')).tocsr()
+
+        reach = step
+        for _ in range(k - 1):
+            reach = reach @ step
+
+        reach = reach.tocsr()
+        reach.sum_duplicates()
+
+        return np.diff(reach.indptr) - 1
+
+
+def edge_graph(hits, edges) -> EdgeGraph:
+    """
+    EdgeGraph of all edges, cached until edges table is freed.
+
+    :param hits: Hits table.
+    :param edges: Edges table.
+    :return: EdgeGraph.
+    """
+    return cached_for_edges(hits, edges, EdgeGraph.from_tables)
+
+
+def _edge_truth(data):
+    edges = data['edges']
+
+    if has_columns(edges, ['truth']):
+        return column(edges, 'truth') > 0.5
+    if 'truth' in data:
+        return pair_truth(edges, data['truth'])
+
+    return None
+
+
+def _edge_selection(edges, edge_filter, mask=None):
+    # Combine edge filter and boolean mask of edges, None if nothing is selected out.
+    if edge_filter is None:
+        return mask
+
+    selection = np.zeros(num_rows(edges), dtype=bool)
+    selection[row_mask(edges, edge_filter)] = True
+
+    return selection if mask is None else selection & mask
+
+
+def _prepare_degree_hist(data, direction: str = 'all', edge_filter=None):
+    edges = data['edges']
+    graph = edge_graph(data['hits'], edges)
+
+    degrees = {
+        'all': graph.degrees(direction, _edge_selection(edges, edge_filter))
+    }
+
+    truth = _edge_truth(data)
+    if truth is not None:
+        degrees['true'] = graph.degrees(direction, _edge_selection(edges, edge_filter, truth))
+        degrees['fake'] = graph.degrees(direction, _edge_selection(edges, edge_filter, ~truth))
+
+    n_bins = max(int(values.max(initial=0)) for values in degrees.values()) + 1
+
+    prepared = {
+        name: np.bincount(values, minlength=n_bins) for name, values in degrees.items()
+    }
+    prepared['bins'] = np.arange(n_bins + 1) - 0.5
+
+    return prepared
+
+
+@plot('exatrkx.graph.degree', ['hits', 'edges'], prepare=_prepare_degree_hist)
+def degree_hist(ax, prepared, direction: str = 'all', hist_opts: dict = None):
+    """
+    Plot histogram of node degree, split by true and fake edges if truth is available.
+    Require hits and edges dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param direction: Count in, out or all edges of each node.
+    :param edge_filter: Count edges pass filter only, e.g. score cut.
+    :param hist_opts: Options pass to ax.stairs.
+    :return:
+    """
+    hist_opts = {
+        'lw': 2,
+        'log': True
+    } | (hist_opts or {})
+
+    for key, label in [('all', 'All'), ('true', 'True'), ('fake', 'Fake')]:
+        if key in prepared:
+            draw_histogram(ax, prepared[key], prepared['bins'], label=f'{label} edges', **hist_opts)
+
+    ax.set_xlabel('In-degree' if direction == 'in' else 'Out-degree' if direction == 'out' else 'Degree')
+    ax.set_ylabel('Nodes')
+    ax.legend()
+
+
+def _prepare_degree_radius(data, bins=50, range=None, edge_filter=None):
+    hits, edges = data['hits'], data['edges']
+    graph = edge_graph(hits, edges)
+    selection = _edge_selection(edges, edge_filter)
+
+    r = hit_r(hits)
+    bins = histogram_bins(r, bins, range)
+    n_bins = len(bins) - 1
+
+    index = bin_index(r, bins)
+    inside = index >= 0
+    index = index[inside]
+
+    nodes = np.bincount(index, minlength=n_bins)
+
+    prepared = {
+        'bins': bins,
+        'nodes': nodes
+    }
+    for direction in ('in', 'out'):
+        total = np.bincount(
+            index, weights=graph.degrees(direction, selection)[inside], minlength=n_bins
+        )
+        prepared[direction] = np.divide(
+            total, nodes, out=np.full(n_bins, np.nan), where=nodes != 0
+        )
+
+    return prepared
+
+
+@plot('exatrkx.graph.degree_radius', ['hits', 'edges'], prepare=_prepare_degree_radius)
+def degree_radius_plot(ax, prepared, hist_opts: dict = None):
+    """
+    Plot mean in-degree and out-degree of nodes against transverse radius.
+    Require hits and edges dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param bins: Number of uniform bins or bin edges of r.
+    :param range: Range of r of uniform bins.
+    :param edge_filter: Count edges pass filter only, e.g. score cut.
+    :param hist_opts: Options pass to ax.stairs.
+    :return:
+    """
+    hist_opts = {
+        'lw': 2
+    } | (hist_opts or {})
+
+    draw_histogram(ax, prepared['in'], prepared['bins'], label='In-degree', **hist_opts)
+    draw_histogram(ax, prepared['out'], prepared['bins'], label='Out-degree', **hist_opts)
+
+    ax.set_xlabel('r [mm]')
+    ax.set_ylabel('Mean degree')
+    ax.legend()
+    ax.grid(True)
+
+
+def _prepare_degree_hotspots(
+    data, z_bins=100, r_bins=50, min_degree: int = None, edge_filter=None
+):
+    hits, edges = data['hits'], data['edges']
+    graph = edge_graph(hits, edges)
+
+    degree = graph.degrees('all', _edge_selection(edges, edge_filter))
+
+    z, r = column(hits, 'z'), hit_r(hits)
+    z_bins = histogram_bins(z, z_bins)
+    r_bins = histogram_bins(r, r_bins)
+    n_z, n_r = len(z_bins) - 1, len(r_bins) - 1
+
+    z_index, r_index = bin_index(z, z_bins), bin_index(r, r_bins)
+    inside = (z_index >= 0) & (r_index >= 0)
+    cell = r_index[inside] * n_z + z_index[inside]
+    degree = degree[inside]
+
+    nodes = np.bincount(cell, minlength=n_z * n_r)
+    if min_degree is None:
+        values = np.divide(
+            np.bincount(cell, weights=degree, minlength=n_z * n_r), nodes,
+            out=np.zeros(n_z * n_r), where=nodes != 0
+        )
+    else:
+        values = np.bincount(cell[degree >= min_degree], minlength=n_z * n_r).astype(float)
+
+    return {
+        'z_bins': z_bins,
+        'r_bins': r_bins,
+        'nodes': nodes.reshape(n_r, n_z),
+        'values': values.reshape(n_r, n_z)
+    }
+
+
+@plot('exatrkx.graph.hotspots', ['hits', 'edges'], prepare=_prepare_degree_hotspots)
+def degree_hotspot_plot(ax, prepared, min_degree: int = None, mesh_opts: dict = None):
+    """
+    Plot map of node degree in r-z plane to find high degree regions.
+    Require hits and edges dataframe.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param z_bins: Number of uniform bins or bin edges of z.
+    :param r_bins: Number of uniform bins or bin edges of r.
+    :param min_degree:
+        Show number of nodes with degree at least min_degree in each cell.
+        Show mean degree if None.
+    :param edge_filter: Count edges pass filter only, e.g. score cut.
+    :param mesh_opts: Options pass to ax.pcolormesh.
+    :return:
+    """
+    # Hide cells without node.
+    values = np.ma.masked_where(prepared['nodes'] == 0, prepared['values'])
+
+    mesh_opts = {
+        'cmap': 'inferno'
+    } | (mesh_opts or {})
+    mesh = ax.pcolormesh(prepared['z_bins'], prepared['r_bins'], values, **mesh_opts)
+
+    label = 'Mean degree' if min_degree is None else f'Nodes with degree >= {min_degree}'
+    ax.figure.colorbar(mesh, ax=ax, label=label)
+
+    ax.set_xlabel('z [mm]')
+    ax.set_ylabel('r [mm]')
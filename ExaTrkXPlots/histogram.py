@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared histogram kernel of histogram style plots.
+
+Values are binned once in prepare step, and drawn from counts with ax.stairs,
+so drawing cost does not depend on number of rows.
+Bins follow np.histogram convention: all bins are half-open except last one.
+"""
+
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+
+def histogram_bins(values: np.ndarray, bins: Union[int, Sequence[float]] = 10, range=None) -> np.ndarray:
+    """
+    Resolve bin edges like np.histogram.
+
+    :param values: Values to histogram.
+    :param bins: Number of uniform bins or bin edges.
+    :param range: Lower and upper edge of uniform bins. Range of values if None.
+    :return: Bin edges.
+    """
+    if np.ndim(bins) != 0:
+        return np.asarray(bins, dtype=float)
+
+    if range is None:
+        finite = values[np.isfinite(values)]
+        range = (finite.min(), finite.max()) if len(finite) else (0.0, 1.0)
+
+    lower, upper = float(range[0]), float(range[1])
+    if lower == upper:
+        lower, upper = lower - 0.5, upper + 0.5
+
+    return np.linspace(lower, upper, int(bins) + 1)
+
+
+def _is_uniform(bins: np.ndarray) -> bool:
+    widths = np.diff(bins)
+
+    return len(widths) > 0 and np.allclose(widths, widths[0], rtol=1e-9, atol=0.0)
+
+
+def bin_index(values: np.ndarray, bins: np.ndarray) -> np.ndarray:
+    """
+    Bin index of each value, -1 if value is outside bins.
+    Values are compared in float64 with float64 bin edges, whatever their own dtype.
+
+    :param values: Values.
+    :param bins: Bin edges.
+    :return: Bin index of each value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    bins = np.asarray(bins, dtype=np.float64)
+    n_bins = len(bins) - 1
+
+    if _is_uniform(bins):
+        # Direct index arithmetic instead of search.
+        index = np.subtract(values, bins[0], dtype=float)
+        index *= n_bins / (bins[-1] - bins[0])
+        with np.errstate(invalid='ignore'):
+            index = index.astype(np.intp)
+        np.clip(index, 0, n_bins - 1, out=index)
+
+        # Correct rounding near edges.
+        index -= values < bins[index]
+        index += (values >= bins[index + 1]) & (index != n_bins - 1)
+    else:
+        index = np.searchsorted(bins, values, side='right') - 1
+        # Last bin include upper edge.
+        np.clip(index, 0, n_bins - 1, out=index)
+
+    # Values outside bins, including NaN.
+    index[~((values >= bins[0]) & (values <= bins[-1]))] = -1
+
+    return index
+
+
+def histogram(
+    values: np.ndarray,
+    bins: Union[int, Sequence[float]] = 10,
+    range=None,
+    weights: np.ndarray = None,
+    masks: Sequence[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram values, with fast path for uniform bins.
+
+    Same result as np.histogram on values cast to float64.
+    For lower precision input, e.g. float32, np.histogram round uniform bin edges
+    to input dtype, so values near edges may fall in neighbour bin there.
+
+    :param values: Values to histogram.
+    :param bins: Number of uniform bins or bin edges.
+    :param range: Lower and upper edge of uniform bins. Range of values if None.
+    :param weights: Optional weight of each value.
+    :param masks:
+        Optional boolean masks of values.
+        If assigned, values are binned once and one histogram is made for each mask.
+    :return:
+        Counts and bin edges.
+        Counts has shape (len(masks), n_bins) if masks is assigned, otherwise (n_bins, ).
+    """
+    values = np.asarray(values)
+    bins = histogram_bins(values, bins, range)
+    n_bins = len(bins) - 1
+
+    index = bin_index(values, bins)
+    inside = index >= 0
+
+    def count(selected):
+        return np.bincount(
+            index[selected],
+            weights=None if weights is None else np.asarray(weights)[selected],
+            minlength=n_bins
+        )
+
+    if masks is None:
+        return count(inside), bins
+
+    return np.stack([count(inside & np.asarray(mask)) for mask in masks]), bins
+
+
+def draw_histogram(ax, counts: np.ndarray, bins: np.ndarray, /, **hist_opts):
+    """
+    Draw precomputed histogram as step line.
+
+    :param ax: matplotlib axis object.
+    :param counts: Counts of each bin.
+    :param bins: Bin edges.
+    :param hist_opts:
+        Options pass to ax.stairs.
+        Also accept density and log as ax.hist does, bins, range and histtype are ignored.
+    :return: StepPatch artist.
+    """
+    hist_opts = dict(hist_opts)
+    for key in ('bins', 'range', 'histtype'):
+        hist_opts.pop(key, None)
+    density = hist_opts.pop('density', False)
+    log = hist_opts.pop('log', False)
+
+    counts = np.asarray(counts, dtype=float)
+    if density:
+        total = counts.sum()
+        counts = counts / (total * np.diff(bins)) if total else counts
+
+    artist = ax.stairs(counts, bins, **hist_opts)
+
+    if log:
+        ax.set_yscale('log')
+
+    return artist
@@ -14,54 +14,167 @@ For plot data requirement, detail list below:
         - optional: score
     - particles:
         - required: particle_id
-        - optional: vx, vy, vz, parent_pid
+        - optional: vx, vy, vz, parent_pid, pt or px, py
     - truth:
         - required: hit_id, particle_id
 
 For required columns, it use for all plot require this type of dataframe.
 For optional columns, it use for special purpose and not required for all plots.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
 """
 
 import numpy as np
-import pandas as pd
+import matplotlib
 
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, has_columns, index_lookup, row_mask
+
+
+def _prepare_hits(data, hit_filter=None):
+    hits = data['hits']
+
+    x, y = cartesian(hits)
+
+    if hit_filter is not None:
+        mask = row_mask(hits, hit_filter)
+        x, y = x[mask], y[mask]
+
+    return {
+        'x': x,
+        'y': y
+    }
 
 
-@plot('exatrkx.hits.2d', ['hits'])
-def hit_plot(ax, data, hit_filter=None, scatter_opts=None):
+@plot('exatrkx.hits.2d', ['hits'], prepare=_prepare_hits)
+def hit_plot(ax, prepared, scatter_opts=None):
     """
     Plot hit 2D positions. Require hits dataframe.
     """
+    scatter_opts = {
+        's': 8.0
+    } | (scatter_opts or {})
+
+    ax.scatter(
+        prepared['x'], prepared['y'], **scatter_opts
+    )
+
+    ax.set_xlabel('x [mm]')
+    ax.set_ylabel('y [mm]')
+    ax.axis('equal')
+
+    # Hits are unlabeled unless label is given in scatter_opts.
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend()
+
+
+def hit_particle_ids(hits, truth) -> np.ndarray:
+    """
+    Look up particle_id of each hit through truth. Hit not found in truth is noise (0).
+
+    :param hits: Hits table.
+    :param truth: Truth table.
+    :return: particle_id of each hit.
+    """
+    index = index_lookup(column(truth, 'hit_id'), column(hits, 'hit_id'))
+    particle_id = column(truth, 'particle_id')
+
+    return np.where(index >= 0, particle_id[index], 0)
+
+
+def particle_pt(particles) -> np.ndarray:
+    """
+    :param particles: Particles table, with pt column or px, py columns.
+    :return: Transverse momentum of each particle.
+    """
+    if has_columns(particles, ['pt']):
+        return column(particles, 'pt')
+
+    return np.hypot(column(particles, 'px'), column(particles, 'py'))
+
+
+def _prepare_hits_by_particle(
+    data, hit_filter=None, pt_cut: float = None, top_n: int = None, show_noise: bool = False
+):
     hits = data['hits']
 
+    x, y = cartesian(hits)
+    particle_id = hit_particle_ids(hits, data['truth'])
+
     if hit_filter is not None:
-        hits = hits[hit_filter]
+        mask = row_mask(hits, hit_filter)
+        x, y, particle_id = x[mask], y[mask], particle_id[mask]
+
+    # Integer code of each particle.
+    particle_ids, codes = np.unique(particle_id, return_inverse=True)
+    selected = particle_ids != 0
+
+    if pt_cut is not None:
+        particles = data['particles']
+        index = index_lookup(column(particles, 'particle_id'), particle_ids)
+        pt = particle_pt(particles)
 
-    if all(pd.Series(['x', 'y']).isin(hits.columns)):
-        x, y = hits['x'], hits['y']
-    elif all(pd.Series(['r', 'phi']).isin(hits.columns)):
-        # Cylindrical coord.
-        r = hits['r']
-        phi = hits['phi']
+        selected &= (index >= 0) & (np.where(index >= 0, pt[index], 0.0) >= pt_cut)
 
-        # Compute cartesian coord
-        x = r * np.cos(phi)
-        y = r * np.sin(phi)
-    else:
-        raise KeyError('No valid coordinate data found.')
+    if top_n is not None:
+        # Keep particles with most hits.
+        n_hits = np.where(selected, np.bincount(codes, minlength=len(particle_ids)), -1)
+        largest = np.argsort(n_hits, kind='stable')[::-1][:top_n]
+
+        top = np.zeros_like(selected)
+        top[largest] = True
+        selected &= top
+
+    keep = selected[codes]
+    noise = particle_ids[codes] == 0
+
+    return {
+        'x': x[keep],
+        'y': y[keep],
+        'codes': codes[keep],
+        'noise_x': x[noise] if show_noise else x[:0],
+        'noise_y': y[noise] if show_noise else y[:0]
+    }
+
+
+@plot('exatrkx.hits.particles', ['hits', 'truth'], prepare=_prepare_hits_by_particle)
+def hits_by_particle(ax, prepared, cmap='tab20', scatter_opts=None, noise_opts=None):
+    """
+    Plot hit 2D positions colored by truth particle. Require hits and truth dataframe.
+    Particles dataframe is also required if pt_cut is used.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param hit_filter: Plot hit pass filter only.
+    :param pt_cut: Plot hits of particles with pt above cut only.
+    :param top_n: Plot hits of n particles with most hits only.
+    :param show_noise: Plot noise hits in gray.
+    :param cmap: Categorical colormap, cycled if there are more particles than colors.
+    :param scatter_opts: Options pass to ax.scatter.
+    :param noise_opts: Options pass to ax.scatter of noise hits.
+    :return:
+    """
+    cmap = matplotlib.colormaps[cmap]
+
+    if len(prepared['noise_x']) > 0:
+        noise_opts = {
+            's': 2.0,
+            'color': 'lightgray'
+        } | (noise_opts or {})
+        ax.scatter(prepared['noise_x'], prepared['noise_y'], **noise_opts)
 
     scatter_opts = {
         's': 8.0
     } | (scatter_opts or {})
 
+    # One scatter for all particles, cycle colors by particle code.
     ax.scatter(
-        x, y, **scatter_opts
+        prepared['x'], prepared['y'],
+        c=prepared['codes'] % cmap.N,
+        cmap=cmap, vmin=0, vmax=cmap.N - 1,
+        **scatter_opts
     )
 
     ax.set_xlabel('x [mm]')
     ax.set_ylabel('y [mm]')
     ax.axis('equal')
-
-    ax.legend()
-
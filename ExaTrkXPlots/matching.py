@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Match reconstructed tracks to truth particles,
+and build generated, reconstructable and matched tables for ExaTrkXPlots.tracks.
+
+Input tables:
+    - truth:
+        - required: hit_id, particle_id
+    - particles:
+        - required: particle_id
+    - tracks:
+        - required: hit_id, track_id
+        A hit may belong to multiple tracks. Rows with negative track_id are unassigned.
+
+Hit counts of every track and particle pair are collected in a sparse co-occurrence matrix
+in one pass, then matching criterion is evaluated on its nonzero entries:
+
+    data |= match_tracks(data['truth'], data['particles'], data['tracks'])
+
+Add entry to MATCHING_CRITERIA to define more criteria.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
+
+from typing import Callable, Dict, Union
+
+import numpy as np
+import scipy.sparse
+
+from ExaTrkXPlots.columns import column, index_lookup, num_rows, take_rows
+
+
+# Criterion take number of shared hits, hits of track, hits of particle of each nonzero pair
+# and matching fraction, and return boolean mask of matched pairs.
+MATCHING_CRITERIA: Dict[str, Callable] = {
+    # Track is mostly made of particle, and contain most of particle hits.
+    'double_majority': lambda shared, track_hits, particle_hits, fraction: (
+        (shared > fraction * track_hits) & (shared > fraction * particle_hits)
+    ),
+    # Track is mostly made of particle, i.e. purity above fraction.
+    'track_majority': lambda shared, track_hits, particle_hits, fraction: (
+        shared > fraction * track_hits
+    ),
+    # Track contain most of particle hits.
+    'particle_majority': lambda shared, track_hits, particle_hits, fraction: (
+        shared > fraction * particle_hits
+    )
+}
+
+
+def co_occurrence(truth, particles, tracks):
+    """
+    Count hits shared by each track and particle.
+
+    :param truth: Truth table.
+    :param particles: Particles table.
+    :param tracks: Tracks table.
+    :return:
+        - track_ids: Sorted unique track_id, row of matrix.
+        - matrix: CSR matrix of shared hits, column is row index of particles.
+        - track_hits: Number of hits of each track, including noise.
+        - particle_hits: Number of hits of each particle in truth.
+    """
+    n_particles = num_rows(particles)
+
+    # Particle row of each truth hit, -1 for noise and particles not in particles table.
+    truth_particle = index_lookup(column(particles, 'particle_id'), column(truth, 'particle_id'))
+    particle_hits = np.bincount(truth_particle[truth_particle >= 0], minlength=n_particles)
+
+    track_id = column(tracks, 'track_id')
+    assigned = track_id >= 0
+    track_id = track_id[assigned]
+
+    if (
+        np.issubdtype(track_id.dtype, np.integer)
+        and len(track_id) > 0
+        and track_id.max() <= 4 * len(track_id) + 1024
+    ):
+        # Dense labels, like connected components. Count without sort.
+        counts = np.bincount(track_id.astype(np.intp, copy=False))
+        track_ids = np.flatnonzero(counts)
+        track_hits = counts[track_ids]
+        track_code = index_lookup(track_ids, track_id)
+    else:
+        track_ids, track_code = np.unique(track_id, return_inverse=True)
+        track_hits = np.bincount(track_code, minlength=len(track_ids))
+
+    truth_index = index_lookup(column(truth, 'hit_id'), column(tracks, 'hit_id')[assigned])
+    hit_particle = np.where(truth_index >= 0, truth_particle[truth_index], -1)
+
+    found = hit_particle >= 0
+    # Duplicate coordinates are summed on conversion.
+    matrix = scipy.sparse.coo_matrix(
+        (
+            np.ones(np.count_nonzero(found), dtype=np.int32),
+            (track_code[found], hit_particle[found])
+        ),
+        shape=(len(track_ids), n_particles)
+    ).tocsr()
+
+    return track_ids, matrix, track_hits, particle_hits
+
+
+def match_tracks(
+    truth,
+    particles,
+    tracks,
+    min_hits: int = 3,
+    criterion: Union[str, Callable] = 'double_majority',
+    matching_fraction: float = 0.5
+) -> dict:
+    """
+    Match tracks to particles.
+
+    Particle is reconstructable if it has at least min_hits hits,
+    and matched if any track with at least min_hits hits match it by criterion.
+
+    :param truth: Truth table.
+    :param particles: Particles table.
+    :param tracks: Tracks table.
+    :param min_hits: Minimum number of hits of tracks and reconstructable particles.
+    :param criterion: Name in MATCHING_CRITERIA, or callable with same signature.
+    :param matching_fraction: Fraction pass to criterion.
+    :return:
+        Dict can be merged into data of track plots:
+            - generated: Particles table.
+            - reconstructable: Rows of reconstructable particles.
+            - matched: Rows of matched particles.
+            - tracks: Dict of arrays of each track with at least min_hits hits:
+                - track_id
+                - n_hits: Number of hits.
+                - particle_id: Particle with most shared hits, 0 if no particle hit.
+                - n_shared: Number of hits shared with that particle.
+                - matched: Whether track match a reconstructable particle.
+    """
+    if not callable(criterion):
+        if criterion not in MATCHING_CRITERIA:
+            raise KeyError(f'Unknown matching criterion: {criterion}')
+        criterion = MATCHING_CRITERIA[criterion]
+
+    track_ids, matrix, track_hits, particle_hits = co_occurrence(truth, particles, tracks)
+
+    # Nonzero entries, sorted by row.
+    row = np.repeat(np.arange(len(track_ids)), np.diff(matrix.indptr))
+    col, shared = matrix.indices, matrix.data
+
+    candidate = track_hits >= min_hits
+    reconstructable = particle_hits >= min_hits
+
+    matched = (
+        criterion(shared, track_hits[row], particle_hits[col], matching_fraction)
+        & candidate[row] & reconstructable[col]
+    )
+
+    matched_particles = np.zeros(len(particle_hits), dtype=bool)
+    matched_particles[col[matched]] = True
+
+    matched_tracks = np.zeros(len(track_ids), dtype=bool)
+    matched_tracks[row[matched]] = True
+
+    # Particle with most shared hits of each track, first entry of each row after sort.
+    order = np.lexsort((-shared, row))
+    first = order[np.r_[True, row[order][1:] != row[order][:-1]]] if len(order) else order
+
+    majority = np.full(len(track_ids), -1, dtype=np.int64)
+    majority[row[first]] = col[first]
+    n_shared = np.zeros(len(track_ids), dtype=shared.dtype)
+    n_shared[row[first]] = shared[first]
+
+    particle_id = column(particles, 'particle_id')
+    majority_id = np.zeros(len(track_ids), dtype=particle_id.dtype)
+    majority_id[majority >= 0] = particle_id[majority[majority >= 0]]
+
+    return {
+        'generated': particles,
+        'reconstructable': take_rows(particles, reconstructable),
+        'matched': take_rows(particles, matched_particles),
+        'tracks': {
+            'track_id': track_ids[candidate],
+            'n_hits': track_hits[candidate],
+            'particle_id': majority_id[candidate],
+            'n_shared': n_shared[candidate],
+            'matched': matched_tracks[candidate]
+        }
+    }
@@ -20,94 +20,249 @@ For plot data requirement, detail list below:
 
 For required columns, it use for all plot require this type of dataframe.
 For optional columns, it use for special purpose and not required for all plots.
-"""
 
-from typing import Any
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
 
 import numpy as np
-import pandas as pd
+import matplotlib
 from matplotlib import collections as mc
 
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, column_names, has_columns, index_lookup, row_mask
+from ExaTrkXPlots.edge_features import EDGE_FEATURES, edge_features
+from ExaTrkXPlots.histogram import draw_histogram, histogram
 
 
-@plot('exatrkx.hit_pairs.2d', ['hits', 'pairs'])
-def hit_pair_plot(ax, data, line_opts=None):
+def pair_hit_index(hits, pairs):
     """
-    Plot hit pair 2D connections. Require hits dataframe and pairs dataframe.
+    Look up row index in hits of both hits of each pair.
+
+    :param hits: Hits table.
+    :param pairs: Pairs table.
+    :return: Row index of hit_id_1 and hit_id_2, -1 if not found.
     """
-    hits = data['hits']
-    pairs = data['pairs']
-
-    if all(pd.Series(['x', 'y']).isin(hits.columns)):
-        pass
-    elif all(pd.Series(['r', 'phi']).isin(hits.columns)):
-        # Cylindrical coord.
-        r = hits['r']
-        phi = hits['phi']
-
-        # Compute cartesian coord
-        x = r * np.cos(phi)
-        y = r * np.sin(phi)
-        hits = hits.assign(
-            x=x, y=y
-        )
-    else:
-        raise KeyError('No valid coordinate data found.')
+    hit_id = column(hits, 'hit_id')
 
-    pairs = pd.merge(
-        pairs, hits,
-        left_on='hit_id_1',
-        right_on='hit_id'
+    return (
+        index_lookup(hit_id, column(pairs, 'hit_id_1')),
+        index_lookup(hit_id, column(pairs, 'hit_id_2'))
     )
 
-    pairs = pd.merge(
-        pairs, hits,
-        left_on='hit_id_2',
-        right_on='hit_id',
-        suffixes=('_1', '_2')
-    )
 
-    positions = pairs[['x_1', 'y_1', 'x_2', 'y_2']].to_numpy()
-    position_pairs = [((x1, y1), (x2, y2)) for x1, y1, x2, y2 in positions]
+def pair_truth(pairs, truth) -> np.ndarray:
+    """
+    Label pairs true if both hits belong to same particle, fake otherwise.
+    Noise hits (particle_id 0 or not found in truth) never make true pair.
+
+    :param pairs: Pairs table.
+    :param truth: Truth table.
+    :return: Boolean array of each pair.
+    """
+    hit_id = column(truth, 'hit_id')
+    particle_id = column(truth, 'particle_id')
+
+    index_1 = index_lookup(hit_id, column(pairs, 'hit_id_1'))
+    index_2 = index_lookup(hit_id, column(pairs, 'hit_id_2'))
+
+    particle_id_1 = np.where(index_1 >= 0, particle_id[index_1], 0)
+    particle_id_2 = np.where(index_2 >= 0, particle_id[index_2], 0)
+
+    return (particle_id_1 == particle_id_2) & (particle_id_1 != 0)
+
+
+def index_segments(x, y, index_1, index_2) -> np.ndarray:
+    """
+    :param x: x of hits.
+    :param y: y of hits.
+    :param index_1: Row index of first hits.
+    :param index_2: Row index of second hits.
+    :return: Array of segments with shape (n, 2, 2).
+    """
+    # Keep precision of coordinates, e.g. float32 of compacted hits.
+    segments = np.empty((len(index_1), 2, 2), dtype=np.result_type(x, y))
+    segments[:, 0, 0] = x[index_1]
+    segments[:, 0, 1] = y[index_1]
+    segments[:, 1, 0] = x[index_2]
+    segments[:, 1, 1] = y[index_2]
+
+    return segments
 
+
+def pair_segments(hits, pairs, selection: np.ndarray = None) -> np.ndarray:
+    """
+    Compute 2D line segments of hit pairs.
+    Pairs with any hit not found in hits are dropped.
+
+    :param hits: Hits table.
+    :param pairs: Pairs table.
+    :param selection: Optional boolean mask of pairs to keep.
+    :return: Array of segments with shape (n, 2, 2).
+    """
+    x, y = cartesian(hits)
+    index_1, index_2 = pair_hit_index(hits, pairs)
+
+    found = (index_1 >= 0) & (index_2 >= 0)
+    if selection is not None:
+        found &= selection
+
+    return index_segments(x, y, index_1[found], index_2[found])
+
+
+def _prepare_hit_pairs(data):
+    return {
+        'segments': pair_segments(data['hits'], data['pairs'])
+    }
+
+
+@plot('exatrkx.hit_pairs.2d', ['hits', 'pairs'], prepare=_prepare_hit_pairs)
+def hit_pair_plot(ax, prepared, line_opts=None):
+    """
+    Plot hit pair 2D connections. Require hits dataframe and pairs dataframe.
+    """
     line_opts = {
         'linewidths': 0.1
     } | (line_opts or {})
 
     line_collection = mc.LineCollection(
-        position_pairs, **line_opts
+        prepared['segments'], **line_opts
     )
     ax.add_collection(line_collection)
 
     ax.legend()
 
 
-@plot('exatrkx.hit_pairs.hist', ['edges'])
+def _prepare_edge_hist(data, feature: str, edge_filter=None, hist_opts: dict = None):
+    edges = data['edges']
+
+    if feature not in column_names(edges) and feature in EDGE_FEATURES:
+        if 'hits' not in data:
+            raise RuntimeError(f'Edge feature {feature} require hits.')
+        values = edge_features(data['hits'], edges)[feature]
+    else:
+        values = column(edges, feature)
+    if edge_filter is not None:
+        values = values[row_mask(edges, edge_filter)]
+
+    hist_opts = hist_opts or {}
+    counts, bins = histogram(
+        values,
+        bins=hist_opts.get('bins', 10),
+        range=hist_opts.get('range', None)
+    )
+
+    return {
+        'counts': counts,
+        'bins': bins
+    }
+
+
+@plot('exatrkx.hit_pairs.hist', ['edges'], prepare=_prepare_edge_hist)
 def edge_hist(
     ax,
-    data,
+    prepared,
     feature: str,
-    edge_filter=None,
-    hist_opts: dict=None
+    hist_opts: dict = None
 ):
     """
     Plot edge histogram. Require edges dataframe.
-    Columns use by feature and edge_filter should also be exist in edges dataframe.
+    Columns use by feature and edge_filter should also be exist in edges dataframe,
+    or feature is name of geometric feature in ExaTrkXPlots.edge_features, e.g. dphi,
+    which is computed from hits dataframe.
     """
-    edges = data['edges']
-    if edge_filter is not None:
-        edges = edges[edge_filter]
-
     ax.set_xlabel(feature)
 
     hist_opts = {
         'lw': 2,
         'log': False,
         'density': False
-    } | (his_opts or {})
-    ax.hist(
-        edges[feature], histtype='step', **hist_opts
-    )
+    } | (hist_opts or {})
+
+    draw_histogram(ax, prepared['counts'], prepared['bins'], **hist_opts)
+
+    ax.legend()
+
+
+def _prepare_truth_pairs(data, edge_filter=None):
+    hits, edges = data['hits'], data['edges']
+
+    x, y = cartesian(hits)
+    index_1, index_2 = pair_hit_index(hits, edges)
+    truth = pair_truth(edges, data['truth'])
+
+    found = (index_1 >= 0) & (index_2 >= 0)
+    if edge_filter is not None:
+        found &= row_mask(edges, edge_filter)
+
+    true_edges = found & truth
+    fake_edges = found & ~truth
+
+    prepared = {
+        'true_segments': index_segments(x, y, index_1[true_edges], index_2[true_edges]),
+        'fake_segments': index_segments(x, y, index_1[fake_edges], index_2[fake_edges]),
+        'true_score': None,
+        'fake_score': None
+    }
+
+    if has_columns(edges, ['score']):
+        score = column(edges, 'score')
+        prepared['true_score'] = score[true_edges]
+        prepared['fake_score'] = score[fake_edges]
+
+    return prepared
+
+
+@plot('exatrkx.hit_pairs.truth', ['hits', 'edges', 'truth'], prepare=_prepare_truth_pairs)
+def truth_pair_plot(
+    ax,
+    prepared,
+    color_by_score: bool = False,
+    cmap: str = 'viridis',
+    true_opts: dict = None,
+    fake_opts: dict = None
+):
+    """
+    Plot 2D connections of edges, labelled true or fake by truth.
+    Require hits, edges and truth dataframe.
+    Edge is true if both hits belong to same non-noise particle.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param edge_filter: Plot edge pass filter only.
+    :param color_by_score: Color edges by score column of edges.
+    :param cmap: Colormap of score.
+    :param true_opts: Options pass to LineCollection of true edges.
+    :param fake_opts: Options pass to LineCollection of fake edges.
+    :return:
+    """
+    true_opts = {
+        'linewidths': 0.5,
+        'label': 'True'
+    } | ({} if color_by_score else {'colors': 'tab:blue'}) | (true_opts or {})
+    fake_opts = {
+        'linewidths': 0.3,
+        'linestyles': 'dashed',
+        'alpha': 0.5,
+        'label': 'Fake'
+    } | ({} if color_by_score else {'colors': 'tab:red'}) | (fake_opts or {})
+
+    if color_by_score:
+        if prepared['true_score'] is None:
+            raise RuntimeError('Color by score require score column in edges.')
+
+        norm = matplotlib.colors.Normalize(0.0, 1.0)
+        true_opts |= {'array': prepared['true_score'], 'cmap': cmap, 'norm': norm}
+        fake_opts |= {'array': prepared['fake_score'], 'cmap': cmap, 'norm': norm}
+
+    # Draw fake edges below true edges.
+    ax.add_collection(mc.LineCollection(prepared['fake_segments'], **fake_opts))
+    true_lines = mc.LineCollection(prepared['true_segments'], **true_opts)
+    ax.add_collection(true_lines)
+
+    if color_by_score:
+        ax.figure.colorbar(true_lines, ax=ax, label='Score')
 
+    ax.autoscale_view()
+    ax.set_xlabel('x [mm]')
+    ax.set_ylabel('y [mm]')
     ax.legend()
@@ -20,60 +20,100 @@ For plot data requirement, detail list below:
 
 For required columns, it use for all plot require this type of dataframe.
 For optional columns, it use for special purpose and not required for all plots.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
 """
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
 import matplotlib.collections as mc
 
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import cartesian, column, index_lookup
+from ExaTrkXPlots.pairs import index_segments
 
 
-@plot('exatrkx.particles.production_vertex', ['pairs', 'hits', 'particles'])
-def production_vertices(ax, data):
-    pairs = data['pairs']
-    hits = data['hits']
-    particles = data['particles']
+def _hit_particles(hits, particles) -> np.ndarray:
+    """
+    Look up particle row index of each hit through particle_id column of hits.
 
-    if all(pd.Series(['x', 'y']).isin(hits.columns)):
-        pass
-    elif all(pd.Series(['r', 'phi']).isin(hits.columns)):
-        # Cylindrical coord.
-        r = hits['r']
-        phi = hits['phi']
-
-        # Compute cartesian coord
-        x = r * np.cos(phi)
-        y = r * np.sin(phi)
-        hits = hits.assign(
-            x=x, y=y
-        )
-    else:
-        raise KeyError('No valid coordinate data found.')
+    :return: Particle row index of each hit, -1 if not found.
+    """
+    return index_lookup(
+        column(particles, 'particle_id'), column(hits, 'particle_id')
+    )
+
+
+def _pair_particles(pairs, hits, hit_particle, hit_col):
+    """
+    Look up particle row index of one side of hit pairs.
 
-    hits_with_particles = pd.merge(
-        hits, particles,
-        how='inner'
+    :param hit_particle: Particle row index of each hit, see _hit_particles.
+    :return: Hit row index and particle row index, -1 if not found.
+    """
+    hit_index = index_lookup(column(hits, 'hit_id'), column(pairs, hit_col))
+
+    particle_index = np.where(
+        hit_index >= 0, hit_particle[hit_index], -1
     )
 
-    pairs_with_pid = pd.merge(
-        pairs,
-        hits_with_particles,
-        left_on='hit_id_1',
-        right_on='hit_id',
-        how="inner"
+    return hit_index, particle_index
+
+
+def _vertices(particles, particle_index):
+    """
+    Unique production vertices of particles, sorted.
+
+    Vertices are grouped over particles table once, which is much smaller than pairs,
+    then vertex of each particle_index is a plain lookup.
+
+    :return: Vertices with shape (n, 3) and vertex index of each particle_index.
+    """
+    vertices, particle_vertex = np.unique(np.stack([
+        column(particles, 'vx'),
+        column(particles, 'vy'),
+        column(particles, 'vz')
+    ], axis=1), axis=0, return_inverse=True)
+    particle_vertex = particle_vertex.reshape(-1)
+
+    # Keep vertices of given particles only.
+    used = np.zeros(len(vertices), dtype=bool)
+    used[particle_vertex[particle_index]] = True
+    remap = np.cumsum(used, dtype=np.int32) - 1
+
+    return vertices[used], remap[particle_vertex][particle_index]
+
+
+def _prepare_production_vertices(data):
+    pairs = data['pairs']
+    hits = data['hits']
+    particles = data['particles']
+
+    _, particle_index = _pair_particles(
+        pairs, hits, _hit_particles(hits, particles), 'hit_id_1'
     )
+    particle_index = np.unique(particle_index[particle_index >= 0])
 
     # Group by vertex.
-    pairs_group_by_vertices = pairs_with_pid.groupby(['vx', 'vy', 'vz'])
+    vertices, _ = _vertices(particles, particle_index)
+
+    return {
+        'vertices': vertices
+    }
 
-    # Create color map.
-    colors = plt.cm.get_cmap('gnuplot', len(pairs_group_by_vertices) + 1)
 
-    for idx, (vertex, pairs) in enumerate(pairs_group_by_vertices):
-        vx, vy, vz = vertex
+@plot(
+    'exatrkx.particles.production_vertex',
+    ['pairs', 'hits', 'particles'],
+    prepare=_prepare_production_vertices
+)
+def production_vertices(ax, prepared):
+    vertices = prepared['vertices']
+
+    # Create color map.
+    colors = matplotlib.colormaps['gnuplot'].resampled(len(vertices) + 1)
 
+    for idx, (vx, vy, vz) in enumerate(vertices):
         # Get color.
         color = colors(idx)
 
@@ -85,126 +125,93 @@ def production_vertices(ax, data):
         )
 
 
-@plot('exatrkx.particles.types', ['pairs', 'hits', 'particles'])
-def particle_types(ax, data):
+def _prepare_particle_types(data):
     hits = data['hits']
     pairs = data['pairs']
     particles = data['particles']
 
-    if all(pd.Series(['x', 'y']).isin(hits.columns)):
-        pass
-    elif all(pd.Series(['r', 'phi']).isin(hits.columns)):
-        # Cylindrical coord.
-        r = hits['r']
-        phi = hits['phi']
-
-        # Compute cartesian coord
-        x = r * np.cos(phi)
-        y = r * np.sin(phi)
-        hits = hits.assign(
-            x=x, y=y
-        )
-    else:
-        raise KeyError('No valid coordinate data found.')
+    x, y = cartesian(hits)
 
-    hits_with_particles = pd.merge(
-        hits, particles,
-        how='inner'
+    hit_index, particle_index = _pair_particles(
+        pairs, hits, _hit_particles(hits, particles), 'hit_id_2'
     )
+    found = particle_index >= 0
+    hit_index, particle_index = hit_index[found], particle_index[found]
 
-    pairs_with_pid = pd.merge(
-        pairs,
-        hits_with_particles,
-        left_on='hit_id_2',
-        right_on='hit_id',
-        how="inner"
-    )
+    # Annotate each particle at its outermost hit.
+    r = np.hypot(x[hit_index], y[hit_index])
+    order = np.lexsort((r, particle_index))
+    last = np.r_[particle_index[order][1:] != particle_index[order][:-1], True]
+    outermost = order[last]
 
-    # Group by vertex.
-    pairs_group_by_vertices = pairs_with_pid.groupby(['vx', 'vy', 'vz'])
+    return {
+        'particle_type': column(particles, 'particle_type')[
+            particle_index[outermost]
+        ].astype(int),
+        'x': x[hit_index[outermost]],
+        'y': y[hit_index[outermost]]
+    }
 
-    for idx, (vertex, pairs) in enumerate(pairs_group_by_vertices):
-        for particle_id, tracks in pairs.groupby('particle_id'):
-            # particle_type = particle_types[int(tracks['particle_type'].iloc[0])]
-            particle_type = int(tracks['particle_type'].iloc[0])
 
-            if 'r_2' not in tracks.columns:
-                tracks['r_2'] = np.sqrt(tracks['x']**2 + tracks['y']**2)
+@plot('exatrkx.particles.types', ['pairs', 'hits', 'particles'], prepare=_prepare_particle_types)
+def particle_types(ax, prepared):
+    for particle_type, x, y in zip(
+        prepared['particle_type'], prepared['x'], prepared['y']
+    ):
+        ax.annotate(particle_type, (x, y))
 
-            x, y = tracks.loc[
-                tracks['r_2'].idxmax()
-            ][['x', 'y']]
-            ax.annotate(particle_type, (x, y))
 
-
-@plot('exatrkx.particles.tracks_with_production_vertex.2d', ['pairs', 'hits', 'particles'])
-def particle_track_with_production_vertex(ax, data, line_width=0.1):
-    """
-    Plot hit pair 2D connections. Require hits dataframe and pairs dataframe.
-    """
+def _prepare_particle_track_with_production_vertex(data):
     hits = data['hits']
     pairs = data['pairs']
     particles = data['particles']
 
-    if all(pd.Series(['x', 'y']).isin(hits.columns)):
-        pass
-    elif all(pd.Series(['r', 'phi']).isin(hits.columns)):
-        # Cylindrical coord.
-        r = hits['r']
-        phi = hits['phi']
-
-        # Compute cartesian coord
-        x = r * np.cos(phi)
-        y = r * np.sin(phi)
-        hits = hits.assign(
-            x=x, y=y
-        )
-    else:
-        raise KeyError('No valid coordinate data found.')
+    hit_particle = _hit_particles(hits, particles)
+    hit_index_1, particle_index_1 = _pair_particles(pairs, hits, hit_particle, 'hit_id_1')
+    hit_index_2, particle_index_2 = _pair_particles(pairs, hits, hit_particle, 'hit_id_2')
 
-    hits_with_particles = pd.merge(
-        hits, particles,
-        how='inner'
-    )
+    # Both hits should belong to a particle.
+    found = (particle_index_1 >= 0) & (particle_index_2 >= 0)
 
-    pairs = pd.merge(
-        pairs, hits_with_particles,
-        left_on='hit_id_1',
-        right_on='hit_id'
-    )
+    # Group by vertex.
+    vertices, vertex_index = _vertices(particles, particle_index_1[found])
 
-    pairs = pd.merge(
-        pairs, hits_with_particles,
-        left_on='hit_id_2',
-        right_on='hit_id',
-        suffixes=('_1', '_2')
-    )
+    # Reuse hit index of lookup above instead of looking up pairs again.
+    x, y = cartesian(hits)
 
-    # Group by vertex.
-    pairs_group_by_vertices = pairs.groupby(['vx_1', 'vy_1', 'vz_1'])
+    return {
+        'segments': index_segments(x, y, hit_index_1[found], hit_index_2[found]),
+        'vertices': vertices,
+        'vertex_index': vertex_index
+    }
+
+
+@plot(
+    'exatrkx.particles.tracks_with_production_vertex.2d',
+    ['pairs', 'hits', 'particles'],
+    prepare=_prepare_particle_track_with_production_vertex
+)
+def particle_track_with_production_vertex(ax, prepared, line_width=0.1):
+    """
+    Plot hit pair 2D connections. Require hits dataframe and pairs dataframe.
+    """
+    vertices = prepared['vertices']
 
     # Create color map.
-    colors = plt.cm.get_cmap('gnuplot', len(pairs_group_by_vertices) + 1)
+    colors = matplotlib.colormaps['gnuplot'].resampled(len(vertices) + 1)
 
-    for idx, (vertex, pairs) in enumerate(pairs_group_by_vertices):
-        # Get color.
-        color = colors(idx)
+    line_collection = mc.LineCollection(
+        prepared['segments'],
+        linewidths=line_width,
+        colors=colors(prepared['vertex_index'])
+    )
+    ax.add_collection(line_collection)
 
-        for particle_id, tracks in pairs.groupby('particle_id_1'):
-            positions = pairs[['x_1', 'y_1', 'x_2', 'y_2']].to_numpy()
-            position_pairs = [((x1, y1), (x2, y2)) for x1, y1, x2, y2 in positions]
-            line_collection = mc.LineCollection(
-                position_pairs,
-                linewidths=line_width,
-                color=color
-            )
-            ax.add_collection(line_collection)
-
-        vx, vy, vz = vertex
+    for idx, (vx, vy, vz) in enumerate(vertices):
         ax.scatter(
             vx, vy,
             marker='+',
-            color=color,
+            color=colors(idx),
             label=f'({vx}, {vy})'
         )
 
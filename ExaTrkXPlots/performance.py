@@ -1,14 +1,73 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import numpy as np
+import sklearn.metrics
+
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import as_array
+from ExaTrkXPlots.bootstrap import bootstrap_curves
+from ExaTrkXPlots.histogram import draw_histogram, histogram
 
-import sklearn.metrics
+
+def _truth_and_score(data):
+    score = as_array(data['score'])
+
+    # Truth should be bool array.
+    # We apply >0.5 in case user pass numerical array.
+    truth = (as_array(data['truth']) > 0.5)
+
+    return truth, score
+
+
+def _bootstrap_curves(
+    data, bootstrap, confidence, bootstrap_processes, bootstrap_bins, seed
+):
+    """
+    Bootstrap band of ROC and precision-recall curves. Empty if bootstrap is None.
+    """
+    if bootstrap is None:
+        return {}
+
+    truth, score = _truth_and_score(data)
+
+    return bootstrap_curves(
+        truth, score,
+        n_bins=bootstrap_bins,
+        confidence=confidence,
+        n_boot=bootstrap,
+        processes=bootstrap_processes,
+        seed=seed
+    )
+
+
+def _prepare_score_distribution(data, hist_opts=None):
+    truth, score = _truth_and_score(data)
+
+    hist_opts = hist_opts or {}
+    bins = hist_opts.get('bins', 50)
+    hist_range = hist_opts.get('range', None)
+
+    # Bin once, true and fake share same bins.
+    (true_counts, fake_counts), bins = histogram(
+        score, bins=bins, range=hist_range, masks=[truth, ~truth]
+    )
+
+    return {
+        'true_counts': true_counts,
+        'true_bins': bins,
+        'fake_counts': fake_counts,
+        'fake_bins': bins
+    }
 
 
-@plot('exatrkx.performance.score_distribution', ['truth', 'score'])
+@plot(
+    'exatrkx.performance.score_distribution',
+    ['truth', 'score'],
+    prepare=_prepare_score_distribution
+)
 def score_distribution(
-    ax, data, hist_opts=None
+    ax, prepared, hist_opts=None
 ):
     """
     Plot score distribution for true and fake data.
@@ -19,29 +78,20 @@ def score_distribution(
     :param hist_opts: histogram options.
     :return:
     """
-    score = data['score']
-
-    # Truth should be bool array.
-    # We apply >0.5 in case user pass numerical array.
-    truth = (data['truth'] > 0.5)
-
     hist_opts = {
-        'bins': 50,
         'log': True,
         'lw': 2
     } | (hist_opts or {})
 
     # True target.
-    ax.hist(
-        score[truth],
-        histtype='step',
+    draw_histogram(
+        ax, prepared['true_counts'], prepared['true_bins'],
         label='true',
         **hist_opts
     )
     # False target.
-    ax.hist(
-        score[~truth],
-        histtype='step',
+    draw_histogram(
+        ax, prepared['fake_counts'], prepared['fake_bins'],
         label='fake',
         **hist_opts
     )
@@ -51,31 +101,23 @@ def score_distribution(
     ax.legend()
 
 
-@plot('exatrkx.performance.roc_curve', ['truth', 'score'])
-def score_roc_curve(
-    ax, data,
+def _prepare_roc_curve(
+    data,
+    bootstrap: int = None,
+    confidence: float = 0.68,
+    bootstrap_processes: int = None,
+    bootstrap_bins: int = 1000,
+    seed: int = None
 ):
-    """
-    Plot ROC curve.
-
-    :param ax: matplotlib axis object.
-    :param data: Data.
-    :param title: Plot title. If None, "ROC curve, AUC = {auc:.4f}" will be used.
-    :return:
-    """
-    score = data['score']
-
-    # Truth should be bool array.
-    # We apply >0.5 in case user pass numerical array.
-    truth = (data['truth'] > 0.5)
-
     # Compute curve.
     if all(tag in data for tag in ['false_positive_rate', 'true_positive_rate']):
         # If user pass precompute precision, recall, thresholds,
         # we don't need to recompute all of them.
-        false_positive_rate = data['false_positive_rate']
-        true_positive_rate = data['true_positive_rate']
+        false_positive_rate = as_array(data['false_positive_rate'])
+        true_positive_rate = as_array(data['true_positive_rate'])
     else:
+        truth, score = _truth_and_score(data)
+
         # Compute curve.
         false_positive_rate, true_positive_rate, _ = sklearn.metrics.roc_curve(truth, score)
 
@@ -84,13 +126,51 @@ def score_roc_curve(
         true_positive_rate
     )
 
+    return {
+        'false_positive_rate': false_positive_rate,
+        'true_positive_rate': true_positive_rate,
+        'auc': auc
+    } | _bootstrap_curves(
+        data, bootstrap, confidence, bootstrap_processes, bootstrap_bins, seed
+    )
+
+
+@plot('exatrkx.performance.roc_curve', ['truth', 'score'], prepare=_prepare_roc_curve)
+def score_roc_curve(
+    ax, prepared,
+):
+    """
+    Plot ROC curve.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param title: Plot title. If None, "ROC curve, AUC = {auc:.4f}" will be used.
+    :param bootstrap: Number of bootstrap replicates. No band if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param bootstrap_bins: Number of score bins use in bootstrap.
+    :param seed: Random seed of bootstrap.
+    :return:
+    """
     # ROC curve.
-    ax.plot(
-        false_positive_rate,
-        true_positive_rate,
+    line, = ax.plot(
+        prepared['false_positive_rate'],
+        prepared['true_positive_rate'],
         lw=2
     )
 
+    title = f'ROC curve, AUC = {float(prepared["auc"]):.4f}'
+
+    if 'true_positive_rate_band' in prepared:
+        lower, upper = prepared['true_positive_rate_band']
+        ax.fill_between(
+            prepared['band_false_positive_rate'], lower, upper,
+            color=line.get_color(), alpha=0.3, lw=0
+        )
+
+        auc_lower, auc_upper = prepared['auc_band']
+        title += f' [{auc_lower:.4f}, {auc_upper:.4f}]'
+
     # AUC=0.5.
     ax.plot([0, 1], [0, 1], '--', lw=2)
 
@@ -98,51 +178,110 @@ def score_roc_curve(
     ax.set_ylabel('True Positive Rate')
     ax.tick_params(width=2, grid_alpha=0.5)
 
-    ax.set_title(f'ROC curve, AUC = {auc:.4f}')
+    ax.set_title(title)
 
 
-@plot('exatrkx.performance.precision_recall_with_threshold', ['truth', 'score'])
-def precision_recall_with_threshold(
-    ax, data
+def _prepare_precision_recall(
+    data,
+    bootstrap: int = None,
+    confidence: float = 0.68,
+    bootstrap_processes: int = None,
+    bootstrap_bins: int = 1000,
+    seed: int = None
 ):
-    """
-    Plot precision and recall change with different threshold.
-
-    :param ax: matplotlib axis object.
-    :param data: Data.
-    :param title: Plot title.
-    :return:
-    """
-    score = data['score']
-
-    # Truth should be bool array.
-    # We apply >0.5 in case user pass numerical array.
-    truth = (data['truth'] > 0.5)
-
     # Compute curve.
     if all(tag in data for tag in ['precision', 'recall', 'thresholds']):
         # If user pass precompute precision, recall, thresholds,
         # we don't need to recompute all of them.
-        precision = data['precision']
-        recall = data['recall']
-        thresholds = data['thresholds']
+        precision = as_array(data['precision'])
+        recall = as_array(data['recall'])
+        thresholds = as_array(data['thresholds'])
     else:
+        truth, score = _truth_and_score(data)
+
         # Compute curve.
         precision, recall, thresholds = sklearn.metrics.precision_recall_curve(
             truth,
             score
         )
 
-    ax.plot(thresholds, precision[:-1], label='purity', lw=2)
-    ax.plot(thresholds, recall[:-1], label='efficiency', lw=2)
+    return {
+        'precision': precision,
+        'recall': recall,
+        'thresholds': thresholds
+    } | _bootstrap_curves(
+        data, bootstrap, confidence, bootstrap_processes, bootstrap_bins, seed
+    )
+
+
+@plot(
+    'exatrkx.performance.precision_recall_with_threshold',
+    ['truth', 'score'],
+    prepare=_prepare_precision_recall
+)
+def precision_recall_with_threshold(
+    ax, prepared
+):
+    """
+    Plot precision and recall change with different threshold.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param title: Plot title.
+    :param bootstrap: Number of bootstrap replicates. No band if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param bootstrap_bins: Number of score bins use in bootstrap.
+    :param seed: Random seed of bootstrap.
+    :return:
+    """
+    thresholds = prepared['thresholds']
+
+    purity, = ax.plot(thresholds, prepared['precision'][:-1], label='purity', lw=2)
+    efficiency, = ax.plot(thresholds, prepared['recall'][:-1], label='efficiency', lw=2)
+
+    if 'precision_band' in prepared:
+        for line, band in [
+            (purity, prepared['precision_band']),
+            (efficiency, prepared['true_positive_rate_band'])
+        ]:
+            ax.fill_between(
+                prepared['band_thresholds'], band[0], band[1],
+                color=line.get_color(), alpha=0.3, lw=0
+            )
     ax.set_xlabel('Cut on model score')
     ax.tick_params(width=2, grid_alpha=0.5)
     ax.legend(loc='upper right')
 
 
-@plot('exatrkx.performance.precision_recall', ['truth', 'score'])
+def _prepare_precision_recall_curve(
+    data,
+    bootstrap: int = None,
+    confidence: float = 0.68,
+    bootstrap_processes: int = None,
+    bootstrap_bins: int = 1000,
+    seed: int = None
+):
+    if bootstrap is None and all(tag in data for tag in ['precision', 'recall']):
+        # If user pass precompute precision, recall,
+        # we don't need to recompute all of them.
+        return {
+            'precision': as_array(data['precision']),
+            'recall': as_array(data['recall'])
+        }
+
+    return _prepare_precision_recall(
+        data, bootstrap, confidence, bootstrap_processes, bootstrap_bins, seed
+    )
+
+
+@plot(
+    'exatrkx.performance.precision_recall',
+    ['truth', 'score'],
+    prepare=_prepare_precision_recall_curve
+)
 def precision_recall_curve(
-    ax, data
+    ax, prepared
 ):
     """
     Plot precision and recall dependency.
@@ -150,28 +289,22 @@ def precision_recall_curve(
     :param ax: matplotlib axis object.
     :param data: Data.
     :param title: Plot title.
+    :param bootstrap: Number of bootstrap replicates. No band if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param bootstrap_bins: Number of score bins use in bootstrap.
+    :param seed: Random seed of bootstrap.
     :return:
     """
-    score = data['score']
-
-    # Truth should be bool array.
-    # We apply >0.5 in case user pass numerical array.
-    truth = (data['truth'] > 0.5)
-
-    if all(tag in data for tag in ['precision', 'recall']):
-        # If user pass precompute precision, recall, thresholds,
-        # we don't need to recompute all of them.
-        precision = data['precision']
-        recall = data['recall']
-    else:
-        # Compute curve.
-        precision, recall, _ = sklearn.metrics.precision_recall_curve(
-            truth,
-            score
+    line, = ax.plot(prepared['precision'], prepared['recall'], lw=2)
+
+    if 'precision_at_recall_band' in prepared:
+        # Precision is not monotonic, shade band of precision along recall instead.
+        lower, upper = prepared['precision_at_recall_band']
+        ax.fill_betweenx(
+            prepared['band_recall'], lower, upper,
+            color=line.get_color(), alpha=0.3, lw=0
         )
-
-    ax.plot(precision, recall, lw=2)
     ax.set_xlabel('Purity')
     ax.set_ylabel('Efficiency')
     ax.tick_params(width=2, grid_alpha=0.5)
-
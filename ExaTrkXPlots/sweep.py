@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Performance sweep over many model output checkpoints.
+
+Each checkpoint is reduced to scalar metrics and a downsampled ROC curve
+in a worker process, so only few checkpoints are in memory at a time.
+
+Model output files are either:
+    - .npz: Contain truth and score arrays.
+      Arrays stored without compression are memory-mapped.
+    - .npy: Structured array with truth and score fields, memory-mapped.
+
+Epoch of checkpoint is read from last integer in file name,
+e.g. 12.npz or epoch=12.npz, otherwise order of file is used.
+
+For plot data requirement, detail list below:
+    - sweep:
+        Either result of sweep_checkpoints or glob pattern of model output files.
+"""
+
+from typing import Union, Dict, Sequence, AnyStr
+from os import PathLike
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import multiprocessing
+import re
+import zipfile
+
+import numpy as np
+import sklearn.metrics
+from matplotlib import collections as mc
+
+from ExaTrkXPlotting import plot
+
+
+def _load_npz_member(path: Path, key: str) -> np.ndarray:
+    """
+    Load array from npz, memory-mapped if it is stored without compression.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(f'{key}.npy')
+
+        if info.compress_type == zipfile.ZIP_STORED:
+            with open(path, 'rb') as fp:
+                # Skip local file header to .npy content.
+                fp.seek(info.header_offset + 26)
+                name_length, extra_length = map(int, np.frombuffer(fp.read(4), dtype='<u2'))
+                fp.seek(info.header_offset + 30 + name_length + extra_length)
+
+                version = np.lib.format.read_magic(fp)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+
+                if not dtype.hasobject:
+                    return np.memmap(
+                        path, dtype=dtype, mode='r', shape=shape,
+                        order='F' if fortran_order else 'C',
+                        offset=fp.tell()
+                    )
+
+    with np.load(path, allow_pickle=False) as fp:
+        return fp[key]
+
+
+def load_model_output(path: Union[PathLike, AnyStr]):
+    """
+    Load truth and score of a checkpoint.
+
+    :param path: Model output file.
+    :return: Truth and score arrays.
+    """
+    path = Path(path)
+
+    if path.suffix == '.npy':
+        data = np.load(path, mmap_mode='r')
+        return data['truth'], data['score']
+
+    return _load_npz_member(path, 'truth'), _load_npz_member(path, 'score')
+
+
+def _epoch(path: Path, index: int) -> int:
+    numbers = re.findall(r'\d+', path.stem)
+
+    return int(numbers[-1]) if numbers else index
+
+
+def checkpoint_metrics(
+    path: Union[PathLike, AnyStr],
+    cuts: Sequence[float] = (0.5, ),
+    curve_points: int = 200
+) -> Dict[str, np.ndarray]:
+    """
+    Reduce a checkpoint to scalar metrics and downsampled ROC curve.
+
+    :param path: Model output file.
+    :param cuts: Score cuts to compute purity and efficiency.
+    :param curve_points: Number of points of downsampled ROC curve.
+    :return: Dict of auc, purity and efficiency at each cut, and ROC curve.
+    """
+    truth, score = load_model_output(path)
+
+    # Truth should be bool array.
+    # We apply >0.5 in case user pass numerical array.
+    truth = np.asarray(truth) > 0.5
+    score = np.asarray(score)
+
+    false_positive_rate, true_positive_rate, _ = sklearn.metrics.roc_curve(truth, score)
+
+    purity, efficiency = [], []
+    n_true = np.count_nonzero(truth)
+    for cut in cuts:
+        selected = score > cut
+        n_selected = np.count_nonzero(selected)
+        n_true_selected = np.count_nonzero(truth & selected)
+
+        purity.append(n_true_selected / n_selected if n_selected else 0.0)
+        efficiency.append(n_true_selected / n_true if n_true else 0.0)
+
+    # Downsample on fixed false positive rate grid.
+    roc_false_positive_rate = np.linspace(0.0, 1.0, curve_points)
+
+    return {
+        'auc': sklearn.metrics.auc(false_positive_rate, true_positive_rate),
+        'purity': np.array(purity),
+        'efficiency': np.array(efficiency),
+        'roc_true_positive_rate': np.interp(
+            roc_false_positive_rate, false_positive_rate, true_positive_rate
+        )
+    }
+
+
+def _checkpoint_metrics(task):
+    return checkpoint_metrics(*task)
+
+
+def sweep_checkpoints(
+    pattern: Union[PathLike, AnyStr, Sequence],
+    cuts: Sequence[float] = (0.5, ),
+    curve_points: int = 200,
+    processes: int = None
+) -> Dict[str, np.ndarray]:
+    """
+    Compute metrics of many checkpoints on a process pool.
+
+    :param pattern: Glob pattern or list of model output files.
+    :param cuts: Score cuts to compute purity and efficiency.
+    :param curve_points: Number of points of downsampled ROC curves.
+    :param processes:
+        Number of processes. Also bound number of checkpoints loaded at same time.
+        None to use number of CPUs.
+        Processes are spawned, so calling script need a __main__ guard.
+    :return:
+        Dict of arrays, each row is a checkpoint sorted by epoch:
+            - epoch, auc: Shape (n, ).
+            - purity, efficiency: Shape (n, len(cuts)).
+            - cuts: Shape (len(cuts), ).
+            - roc_false_positive_rate: Shape (curve_points, ).
+            - roc_true_positive_rate: Shape (n, curve_points).
+    """
+    if isinstance(pattern, (str, PathLike)):
+        paths = sorted(glob.glob(str(pattern)))
+    else:
+        paths = list(pattern)
+    paths = [Path(path) for path in paths]
+
+    if not paths:
+        raise RuntimeError(f'No checkpoint found: {pattern}')
+
+    epochs = np.array([_epoch(path, index) for index, path in enumerate(paths)])
+    order = np.argsort(epochs, kind='stable')
+    paths = [paths[index] for index in order]
+
+    tasks = [(path, tuple(cuts), curve_points) for path in paths]
+    if processes == 1:
+        results = list(map(_checkpoint_metrics, tasks))
+    else:
+        # Prepare step may run on Plotter thread pool,
+        # fork from a multithreaded process can deadlock on locks held by other threads.
+        with ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            results = list(executor.map(_checkpoint_metrics, tasks))
+
+    return {
+        'epoch': epochs[order],
+        'auc': np.array([result['auc'] for result in results]),
+        'purity': np.stack([result['purity'] for result in results]),
+        'efficiency': np.stack([result['efficiency'] for result in results]),
+        'cuts': np.asarray(cuts, dtype=float),
+        'roc_false_positive_rate': np.linspace(0.0, 1.0, curve_points),
+        'roc_true_positive_rate': np.stack([
+            result['roc_true_positive_rate'] for result in results
+        ])
+    }
+
+
+def _prepare_sweep(
+    data,
+    cuts: Sequence[float] = (0.5, ),
+    curve_points: int = 200,
+    processes: int = None
+):
+    sweep = data['sweep']
+
+    if isinstance(sweep, dict):
+        # Precomputed sweep.
+        return sweep
+
+    return sweep_checkpoints(sweep, cuts, curve_points, processes)
+
+
+@plot('exatrkx.performance.sweep.trend', ['sweep'], prepare=_prepare_sweep)
+def sweep_trend(
+    ax,
+    prepared,
+    metrics: Sequence[str] = ('auc', 'purity', 'efficiency'),
+    plot_opts: dict = None
+):
+    """
+    Plot metrics against epoch.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param metrics: Metrics to plot, any of auc, purity and efficiency.
+    :param cuts: Score cuts of purity and efficiency.
+    :param curve_points: Number of points of downsampled ROC curves.
+    :param processes: Number of processes to load checkpoints.
+    :param plot_opts: Options pass to ax.plot.
+    :return:
+    """
+    epoch = prepared['epoch']
+
+    plot_opts = {
+        'marker': '.',
+        'lw': 2
+    } | (plot_opts or {})
+
+    for metric in metrics:
+        if metric == 'auc':
+            ax.plot(epoch, prepared['auc'], label='AUC', **plot_opts)
+            continue
+
+        values = prepared[metric]
+        label = 'Purity' if metric == 'purity' else 'Efficiency'
+        for idx, cut in enumerate(prepared['cuts']):
+            ax.plot(
+                epoch, values[:, idx],
+                label=f'{label} (score > {cut:g})',
+                **plot_opts
+            )
+
+    ax.set_xlabel('Epochs')
+    ax.grid(True)
+    ax.legend()
+
+
+@plot('exatrkx.performance.sweep.roc', ['sweep'], prepare=_prepare_sweep)
+def sweep_roc_curves(
+    ax,
+    prepared,
+    every: int = 1,
+    cmap: str = 'viridis',
+    line_opts: dict = None
+):
+    """
+    Plot overlaid ROC curves of checkpoints, colored by epoch.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param every: Plot every n-th checkpoint only.
+    :param cmap: Colormap of epoch.
+    :param cuts: Score cuts of purity and efficiency.
+    :param curve_points: Number of points of downsampled ROC curves.
+    :param processes: Number of processes to load checkpoints.
+    :param line_opts: Options pass to LineCollection.
+    :return:
+    """
+    epoch = prepared['epoch'][::every]
+    true_positive_rate = prepared['roc_true_positive_rate'][::every]
+    false_positive_rate = np.broadcast_to(
+        prepared['roc_false_positive_rate'], true_positive_rate.shape
+    )
+
+    line_opts = {
+        'linewidths': 1.0,
+        'cmap': cmap
+    } | (line_opts or {})
+
+    curves = mc.LineCollection(
+        np.stack([false_positive_rate, true_positive_rate], axis=-1),
+        array=epoch,
+        **line_opts
+    )
+    ax.add_collection(curves)
+    ax.figure.colorbar(curves, ax=ax, label='Epochs')
+
+    # AUC=0.5.
+    ax.plot([0, 1], [0, 1], '--', color='gray', lw=1)
+
+    ax.set_xlim(0.0, 1.0)
+    ax.set_ylim(0.0, 1.05)
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multi-resolution tile pyramid export of hit and edge displays.
+
+Event is aggregated once into count grid at finest zoom level,
+each coarser level is made by summing 2x2 cells of level below,
+so cost is linear in number of hits and total edge length in finest pixels,
+and does not depend on number of levels.
+Finest grid is binned one block at a time, e.g. 4096 pixels on each side,
+and only non-empty tiles are kept, as pixel index and count of occupied pixels.
+Memory therefore does not grow with area of finest grid, 4**max_zoom tiles.
+
+Output use standard z/x/y PNG tile layout, one directory per layer:
+
+    output/
+        index.html
+        hits/{z}/{x}/{y}.png
+        edges/{z}/{x}/{y}.png
+
+Open index.html in a browser to pan and zoom. Empty tiles are not written.
+
+For data requirement, detail list below:
+    - hits:
+        - required: hit_id, x, y or r, phi
+    - edges:
+        - required: hit_id_1, hit_id_2
+        - optional: score
+
+Tables can be any type supported by ExaTrkXPlots.columns.
+"""
+
+from typing import Union, Dict, List, AnyStr, Callable, Sequence, Tuple
+from os import PathLike
+from pathlib import Path
+import json
+
+import numpy as np
+import matplotlib
+import matplotlib.image
+
+from ExaTrkXPlots.columns import cartesian, row_mask
+from ExaTrkXPlots.pairs import pair_hit_index
+
+
+def square_extent(x: np.ndarray, y: np.ndarray, margin: float = 0.02) -> Tuple[float, float, float]:
+    """
+    Square region contain all points.
+
+    :param x: x of points.
+    :param y: y of points.
+    :param margin: Margin in fraction of side length.
+    :return: x_min, y_min and side length.
+    """
+    x_min, x_max = float(np.min(x)), float(np.max(x))
+    y_min, y_max = float(np.min(y)), float(np.max(y))
+
+    side = max(x_max - x_min, y_max - y_min) * (1.0 + 2.0 * margin) or 1.0
+
+    return (
+        0.5 * (x_min + x_max - side),
+        0.5 * (y_min + y_max - side),
+        side
+    )
+
+
+def _pixels(x, y, extent, size, window=None) -> np.ndarray:
+    """
+    Flat pixel index of points in window, row 0 on top. Points outside window is -1.
+    """
+    x_min, y_min, side = extent
+    row_start, column_start, window_size = (0, 0, size) if window is None else window
+
+    column = np.floor((x - x_min) / side * size).astype(np.int64) - column_start
+    row = size - 1 - np.floor((y - y_min) / side * size).astype(np.int64) - row_start
+
+    inside = (column >= 0) & (column < window_size) & (row >= 0) & (row < window_size)
+
+    return np.where(inside, row * window_size + column, -1)
+
+
+def _accumulate(counts: np.ndarray, pixels: np.ndarray):
+    pixels = pixels[pixels >= 0]
+
+    if len(pixels) < counts.size // 8:
+        # Few pixels, avoid temporary int64 grid of bincount.
+        pixels, n = np.unique(pixels, return_counts=True)
+        counts.reshape(-1)[pixels] += n.astype(counts.dtype)
+    else:
+        counts += np.bincount(pixels, minlength=counts.size).reshape(counts.shape).astype(counts.dtype)
+
+
+def point_counts(x: np.ndarray, y: np.ndarray, extent, size: int, window=None) -> np.ndarray:
+    """
+    Count points in each pixel.
+
+    :param x: x of points.
+    :param y: y of points.
+    :param extent: x_min, y_min and side length of grid.
+    :param size: Number of pixels on each side.
+    :param window: Row, column and size of square part of grid to count. Whole grid if None.
+    :return: Count grid of window.
+    """
+    window_size = size if window is None else window[2]
+
+    counts = np.zeros((window_size, window_size), dtype=np.uint32)
+    _accumulate(counts, _pixels(x, y, extent, size, window))
+
+    return counts
+
+
+def segment_counts(
+    segments: np.ndarray,
+    extent,
+    size: int,
+    chunk_size: int = 1 << 22,
+    window=None
+) -> np.ndarray:
+    """
+    Count segments cross each pixel.
+    Segments are sampled every pixel, in chunks to bound memory.
+
+    :param segments: Segments with shape (n, 2, 2).
+    :param extent: x_min, y_min and side length of grid.
+    :param size: Number of pixels on each side.
+    :param chunk_size: Maximum number of samples at once.
+    :param window: Row, column and size of square part of grid to count. Whole grid if None.
+    :return: Count grid of window.
+    """
+    window_row, window_column, window_size = (0, 0, size) if window is None else window
+
+    counts = np.zeros((window_size, window_size), dtype=np.uint32)
+    x_min, y_min, side = extent
+    scale = size / side
+
+    # Work in pixel units of whole grid, row 0 on top.
+    column_start = (segments[:, 0, 0] - x_min) * scale
+    row_start = (y_min + side - segments[:, 0, 1]) * scale
+    column_delta = (segments[:, 1, 0] - segments[:, 0, 0]) * scale
+    row_delta = (segments[:, 0, 1] - segments[:, 1, 1]) * scale
+
+    if window is not None:
+        # Sample only segments whose bounding box overlap window.
+        column_end, row_end = column_start + column_delta, row_start + row_delta
+        overlap = np.flatnonzero(
+            (np.maximum(column_start, column_end) >= window_column)
+            & (np.minimum(column_start, column_end) < window_column + window_size)
+            & (np.maximum(row_start, row_end) >= window_row)
+            & (np.minimum(row_start, row_end) < window_row + window_size)
+        )
+        column_start, row_start = column_start[overlap], row_start[overlap]
+        column_delta, row_delta = column_delta[overlap], row_delta[overlap]
+
+    n_samples = np.ceil(np.hypot(column_delta, row_delta)).astype(np.int64) + 1
+    step = 1.0 / np.maximum(n_samples - 1, 1)
+
+    # Split segments so each chunk has about chunk_size samples.
+    bounds = np.searchsorted(
+        np.cumsum(n_samples), np.arange(chunk_size, n_samples.sum(), chunk_size)
+    )
+    for index in np.split(np.arange(len(n_samples)), np.unique(bounds)):
+        if len(index) == 0:
+            continue
+
+        samples = n_samples[index]
+        first = np.cumsum(samples) - samples
+        # Sample position along each segment from 0 to 1.
+        t = (np.arange(samples.sum()) - np.repeat(first, samples)) * np.repeat(step[index], samples)
+
+        columns = np.floor(
+            np.repeat(column_start[index], samples) + t * np.repeat(column_delta[index], samples)
+        ).astype(np.int64) - window_column
+        rows = np.floor(
+            np.repeat(row_start[index], samples) + t * np.repeat(row_delta[index], samples)
+        ).astype(np.int64) - window_row
+
+        inside = (columns >= 0) & (columns < window_size) & (rows >= 0) & (rows < window_size)
+        pixels = np.where(inside, rows * window_size + columns, -1)
+
+        # Count each segment once per pixel.
+        # Samples of a segment visit pixels in order, so repeats are always adjacent.
+        repeated = np.zeros(len(pixels), dtype=bool)
+        repeated[1:] = pixels[1:] == pixels[:-1]
+        repeated[first] = False
+        _accumulate(counts, pixels[~repeated])
+
+    return counts
+
+
+def downsample(counts: np.ndarray) -> np.ndarray:
+    """
+    Sum each 2x2 cells.
+
+    :param counts: Count grid with even size.
+    :return: Count grid with half size.
+    """
+    size = counts.shape[0] // 2
+
+    return counts.reshape(size, 2, size, 2).sum(axis=(1, 3), dtype=counts.dtype)
+
+
+def pyramid(counts: np.ndarray, max_zoom: int) -> List[np.ndarray]:
+    """
+    Build all zoom levels from finest level.
+
+    :param counts: Count grid of finest level.
+    :param max_zoom: Zoom level of counts.
+    :return: Count grids of level 0 to max_zoom.
+    """
+    levels = [counts]
+    for _ in range(max_zoom):
+        levels.append(downsample(levels[-1]))
+
+    return levels[::-1]
+
+
+def _sparse_tiles(counts: np.ndarray, tile_size: int, row: int = 0, column: int = 0) -> List[Tuple]:
+    """
+    Non-empty tiles of count grid, as column, row, flat pixel index in tile and counts.
+    """
+    n = counts.shape[0] // tile_size
+    tiles = counts.reshape(n, tile_size, n, tile_size).swapaxes(1, 2)
+    # uint16 for 256 pixels tile.
+    pixel_dtype = np.min_scalar_type(tile_size * tile_size - 1)
+
+    result = []
+    for tile_row, tile_column in zip(*np.nonzero(tiles.any(axis=(2, 3)))):
+        tile = tiles[tile_row, tile_column].ravel()
+        pixels = np.flatnonzero(tile)
+        result.append((column + tile_column, row + tile_row, pixels.astype(pixel_dtype), tile[pixels]))
+
+    return result
+
+
+def tile_levels(
+    count: Callable[[Tuple[int, int, int]], np.ndarray],
+    max_zoom: int,
+    tile_size: int = 256,
+    block_size: int = 4096
+) -> List[List[Tuple]]:
+    """
+    Build non-empty tiles of all zoom levels, with finest grid binned block by block.
+
+    Levels finer than block are kept sparse only,
+    whole grid is dense from level where each block become one tile.
+
+    :param count:
+        Function return count grid of window of finest grid,
+        window is row, column and size of square part.
+    :param max_zoom: Finest zoom level. Finest grid has tile_size * 2**max_zoom pixels on each side.
+    :param tile_size: Number of pixels on each side of tile.
+    :param block_size: Maximum number of finest pixels on each side of block.
+    :return:
+        Non-empty tiles of level 0 to max_zoom,
+        each as column, row, flat pixel index in tile and counts.
+    """
+    block_zoom = min(max_zoom, max(0, (block_size // tile_size).bit_length() - 1))
+    block = tile_size << block_zoom
+    n_blocks = 1 << (max_zoom - block_zoom)
+
+    levels = [[] for _ in range(max_zoom + 1)]
+    coarse = np.zeros((n_blocks * tile_size, n_blocks * tile_size), dtype=np.uint32)
+
+    for block_row in range(n_blocks):
+        for block_column in range(n_blocks):
+            counts = count((block_row * block, block_column * block, block))
+
+            for zoom in range(max_zoom, max_zoom - block_zoom, -1):
+                n = counts.shape[0] // tile_size
+                levels[zoom] += _sparse_tiles(counts, tile_size, block_row * n, block_column * n)
+                counts = downsample(counts)
+
+            coarse[
+                block_row * tile_size:(block_row + 1) * tile_size,
+                block_column * tile_size:(block_column + 1) * tile_size
+            ] = counts
+
+    for zoom, counts in enumerate(pyramid(coarse, max_zoom - block_zoom)):
+        levels[zoom] = _sparse_tiles(counts, tile_size)
+
+    return levels
+
+
+def write_tiles(
+    levels: Sequence[List[Tuple]],
+    directory: Union[PathLike, AnyStr],
+    tile_size: int = 256,
+    cmap: str = 'viridis'
+) -> int:
+    """
+    Write tiles as z/x/y PNG files. Counts are colored in log scale per level.
+
+    :param levels: Non-empty tiles of each zoom level from tile_levels.
+    :param directory: Output directory of layer.
+    :param tile_size: Number of pixels on each side of tile.
+    :param cmap: Colormap.
+    :return: Number of written tiles.
+    """
+    directory = Path(directory)
+    cmap = matplotlib.colormaps[cmap]
+    tile = np.zeros(tile_size * tile_size, dtype=np.uint32)
+
+    n_tiles = 0
+    for zoom, tiles in enumerate(levels):
+        norm = np.log1p(float(max((counts.max() for *_, counts in tiles), default=0))) or 1.0
+
+        for column, row, pixels, counts in tiles:
+            tile[:] = 0
+            tile[pixels] = counts
+            image = tile.reshape(tile_size, tile_size)
+
+            rgba = cmap(np.log1p(image) / norm, bytes=True)
+            rgba[..., 3] = np.where(image > 0, 255, 0)
+
+            path = directory / str(zoom) / str(column) / f'{row}.png'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Fast compression, tiles are many and mostly small.
+            matplotlib.image.imsave(path, rgba, pil_kwargs={'compress_level': 1})
+            n_tiles += 1
+
+    return n_tiles
+
+
+def export_tiles(
+    output: Union[PathLike, AnyStr],
+    data: Dict,
+    max_zoom: int = 4,
+    tile_size: int = 256,
+    hit_filter=None,
+    edge_filter=None,
+    layers: Dict[str, str] = None,
+    extent: Tuple[float, float, float] = None,
+    block_size: int = 4096
+) -> Path:
+    """
+    Export hit and edge displays as tile pyramid with a local HTML viewer.
+
+    :param output: Output directory.
+    :param data: Data contain hits, and optionally edges.
+    :param max_zoom: Finest zoom level. Finest grid has tile_size * 2**max_zoom pixels on each side.
+    :param tile_size: Number of pixels on each side of tile.
+    :param hit_filter: Include hit pass filter only.
+    :param edge_filter: Include edge pass filter only.
+    :param layers: Colormap of each layer, hits and edges. Layer not in dict is skipped.
+    :param extent: x_min, y_min and side length of region. Region cover all hits if None.
+    :param block_size: Maximum number of finest pixels on each side binned at once.
+    :return: Location of viewer.
+    """
+    output = Path(output)
+    size = tile_size * 2 ** max_zoom
+    layers = {
+        'hits': 'viridis',
+        'edges': 'magma'
+    } if layers is None else layers
+
+    hits = data['hits']
+    x, y = cartesian(hits)
+
+    if extent is None:
+        extent = square_extent(x, y)
+
+    written = []
+
+    if 'hits' in layers:
+        mask = slice(None) if hit_filter is None else row_mask(hits, hit_filter)
+        hit_x, hit_y = x[mask], y[mask]
+        levels = tile_levels(
+            lambda window: point_counts(hit_x, hit_y, extent, size, window),
+            max_zoom, tile_size, block_size
+        )
+
+        write_tiles(levels, output / 'hits', tile_size, layers['hits'])
+        written.append('hits')
+
+    if 'edges' in layers and 'edges' in data:
+        edges = data['edges']
+        index_1, index_2 = pair_hit_index(hits, edges)
+
+        found = (index_1 >= 0) & (index_2 >= 0)
+        if edge_filter is not None:
+            found &= row_mask(edges, edge_filter)
+        index_1, index_2 = index_1[found], index_2[found]
+
+        segments = np.stack([
+            np.stack([x[index_1], y[index_1]], axis=1),
+            np.stack([x[index_2], y[index_2]], axis=1)
+        ], axis=1)
+        levels = tile_levels(
+            lambda window: segment_counts(segments, extent, size, window=window),
+            max_zoom, tile_size, block_size
+        )
+
+        write_tiles(levels, output / 'edges', tile_size, layers['edges'])
+        written.append('edges')
+
+    viewer = output / 'index.html'
+    viewer.write_text(_VIEWER.replace('__CONFIG__', json.dumps({
+        'tileSize': tile_size,
+        'maxZoom': max_zoom,
+        'layers': written,
+        'extent': list(extent)
+    })))
+
+    return viewer
+
+
+_VIEWER = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ExaTrkX event tiles</title>
+<style>
+  html, body { margin: 0; height: 100%; overflow: hidden; background: #fff; font: 13px sans-serif; }
+  #map { position: absolute; inset: 0; cursor: grab; }
+  #map img { position: absolute; image-rendering: pixelated; pointer-events: none; }
+  #panel { position: absolute; top: 8px; left: 8px; background: rgba(255,255,255,0.85); padding: 6px 8px; }
+</style>
+</head>
+<body>
+<div id="map"></div>
+<div id="panel"><div id="layers"></div><div id="status"></div></div>
+<script>
+const config = __CONFIG__;
+const map = document.getElementById('map');
+const visible = {};
+// View state: world pixels at finest level per screen pixel, and world center.
+const worldSize = config.tileSize * Math.pow(2, config.maxZoom);
+let scale = worldSize / Math.min(window.innerWidth, window.innerHeight);
+let center = [worldSize / 2, worldSize / 2];
+
+for (const layer of config.layers) {
+  visible[layer] = true;
+  const label = document.createElement('label');
+  label.innerHTML = `<input type="checkbox" checked> ${layer} `;
+  label.firstChild.onchange = (event) => { visible[layer] = event.target.checked; render(); };
+  document.getElementById('layers').appendChild(label);
+}
+
+function render() {
+  const zoom = Math.max(0, Math.min(config.maxZoom, Math.round(config.maxZoom - Math.log2(scale))));
+  const cell = Math.pow(2, config.maxZoom - zoom) * config.tileSize / scale;
+  const n = Math.pow(2, zoom);
+  const left = window.innerWidth / 2 - center[0] / scale;
+  const top = window.innerHeight / 2 - center[1] / scale;
+
+  map.replaceChildren();
+  for (const layer of config.layers) {
+    if (!visible[layer]) continue;
+    for (let x = Math.max(0, Math.floor(-left / cell)); x < Math.min(n, Math.ceil((window.innerWidth - left) / cell)); x++) {
+      for (let y = Math.max(0, Math.floor(-top / cell)); y < Math.min(n, Math.ceil((window.innerHeight - top) / cell)); y++) {
+        const img = document.createElement('img');
+        img.src = `${layer}/${zoom}/${x}/${y}.png`;
+        img.onerror = () => img.remove();
+        img.style.left = `${left + x * cell}px`;
+        img.style.top = `${top + y * cell}px`;
+        img.style.width = img.style.height = `${cell + 0.5}px`;
+        map.appendChild(img);
+      }
+    }
+  }
+
+  const [x0, y0, side] = config.extent;
+  const mm = side / worldSize * scale;
+  document.getElementById('status').textContent =
+    `zoom ${zoom}, center (${(x0 + center[0] / worldSize * side).toFixed(1)}, ` +
+    `${(y0 + side - center[1] / worldSize * side).toFixed(1)}), ${mm.toFixed(3)} per pixel`;
+}
+
+let drag = null;
+map.onmousedown = (event) => { drag = [event.clientX, event.clientY]; };
+window.onmouseup = () => { drag = null; };
+window.onmousemove = (event) => {
+  if (!drag) return;
+  center[0] -= (event.clientX - drag[0]) * scale;
+  center[1] -= (event.clientY - drag[1]) * scale;
+  drag = [event.clientX, event.clientY];
+  render();
+};
+map.onwheel = (event) => {
+  event.preventDefault();
+  const factor = Math.exp(event.deltaY * 0.002);
+  // Keep world point under cursor fixed.
+  const dx = event.clientX - window.innerWidth / 2, dy = event.clientY - window.innerHeight / 2;
+  center[0] += dx * scale * (1 - factor);
+  center[1] += dy * scale * (1 - factor);
+  scale *= factor;
+  render();
+};
+window.onresize = render;
+render();
+</script>
+</body>
+</html>
+'''
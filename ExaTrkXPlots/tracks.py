@@ -14,26 +14,72 @@ For plot data requirement, detail list below:
     - matched:
         Matched tracks
 
+    - efficiency_map:
+        Counts from efficiency_map_counts, use instead of above tables for efficiency map plots.
+
 No required column for those dataframes, but if you assign x_variable or track_filter,
 then used column must exist.
+
+Those tables can be built from truth, particles and reconstructed tracks
+by ExaTrkXPlots.matching.match_tracks.
+
+Tables can be any type supported by ExaTrkXPlots.columns.
 """
 
 from typing import Callable
-import math
 
 import numpy as np
 
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import column, row_mask
+from ExaTrkXPlots.bootstrap import bootstrap_efficiency
+from ExaTrkXPlots.histogram import bin_index, draw_histogram, histogram, histogram_bins
+
+
+def _track_values(table, var_col, track_filter=None):
+    """
+    Read variable of tracks pass filter.
+    """
+    values = column(table, var_col)
+
+    if track_filter is not None:
+        values = values[row_mask(table, track_filter)]
+
+    return values
+
+
+def _prepare_track_histograms(data, bins, var_col, track_filter: Callable = None):
+    """
+    Histogram generated, reconstructable and matched tracks with same bins.
+    """
+    gen_hist, bins = histogram(
+        _track_values(data['generated'], var_col, track_filter), bins=bins
+    )
+    reco_hist, _ = histogram(
+        _track_values(data['reconstructable'], var_col, track_filter), bins=bins
+    )
+    matched_hist, _ = histogram(
+        _track_values(data['matched'], var_col, track_filter), bins=bins
+    )
 
+    return {
+        'generated': gen_hist,
+        'reconstructable': reco_hist,
+        'matched': matched_hist,
+        'bins': bins
+    }
 
-@plot('exatrkx.tracks.distribution', ['generated', 'reconstructable', 'matched'])
+
+@plot(
+    'exatrkx.tracks.distribution',
+    ['generated', 'reconstructable', 'matched'],
+    prepare=_prepare_track_histograms
+)
 def tracks(
     ax,
-    data,
-    bins,
+    prepared,
     var_col,
     var_name = None,
-    track_filter: Callable = None,
     hist_opts: dict = None,
 ):
     """
@@ -46,42 +92,23 @@ def tracks(
     :param track_filter: Plot track pass filter only.
     :return:
     """
-    generated = data['generated']
-    reconstructable = data['reconstructable']
-    matched = data['matched']
-
-    # Apply filter.
-    if track_filter is not None:
-        generated = generated[track_filter(generated)]
-        reconstructable = reconstructable[track_filter(reconstructable)]
-        matched = matched[track_filter(matched)]
+    bins = prepared['bins']
 
     hist_opts = {
         'lw': 2,
         'log': False
     } | (hist_opts or {})
 
-    ax.hist(
-        generated[var_col],
-        label='Generated',
-        histtype='step',
-        bins=bins,
-        **hist_opts
-    )
-    ax.hist(
-        reconstructable[var_col],
-        label='Reconstructable',
-        histtype='step',
-        bins=bins,
-        **hist_opts
-    )
-    ax.hist(
-        matched[var_col],
-        label='Matched',
-        histtype='step',
-        bins=bins,
-        **hist_opts
-    )
+    for key, label in [
+        ('generated', 'Generated'),
+        ('reconstructable', 'Reconstructable'),
+        ('matched', 'Matched')
+    ]:
+        draw_histogram(
+            ax, prepared[key], bins,
+            label=label,
+            **hist_opts
+        )
 
     ax.set_ylabel('Events')
     ax.set_xlabel(var_name or var_col)
@@ -98,24 +125,80 @@ def _efficiency(matched, population):
     :param population: Population in each bins.
     :return: Efficiency, Error
     """
+    matched = np.asarray(matched, dtype=float)
+    population = np.asarray(population, dtype=float)
 
-    efficiency = [
-        x / y if y != 0 else 0.0 for x, y in zip(
-            matched, population
-        )
-    ]
-    error = [
-        math.sqrt(eff * (1.0 - eff) / y) if y != 0 else 0.0 for eff, y in zip(
-            efficiency, population
-        )
-    ]
+    nonzero = population != 0
+
+    efficiency = np.divide(
+        matched, population, out=np.zeros_like(matched), where=nonzero
+    )
+    error = np.sqrt(np.divide(
+        np.clip(efficiency * (1.0 - efficiency), 0.0, None), population,
+        out=np.zeros_like(matched), where=nonzero
+    ))
 
     return efficiency, error
 
 
-@plot('exatrkx.tracks.efficiency', ['generated', 'reconstructable', 'matched'])
+def _prepare_track_efficiency(
+    data,
+    bins,
+    var_col,
+    track_filter: Callable = None,
+    bootstrap: int = None,
+    confidence: float = 0.68,
+    bootstrap_processes: int = None,
+    seed: int = None
+):
+    """
+    Histogram tracks, and optionally bootstrap confidence band of efficiency.
+    """
+    prepared = _prepare_track_histograms(data, bins, var_col, track_filter)
+
+    if bootstrap is not None:
+        for key, population in [
+            ('physical_band', prepared['generated']),
+            ('technical_band', prepared['reconstructable'])
+        ]:
+            prepared[key] = bootstrap_efficiency(
+                prepared['matched'], population,
+                confidence=confidence,
+                n_boot=bootstrap,
+                processes=bootstrap_processes,
+                seed=seed
+            )
+
+    return prepared
+
+
+def _efficiency_error(prepared, efficiency, error, kind):
+    """
+    Helper function to use bootstrap band as error if present.
+    """
+    band = prepared.get(f'{kind}_band', None)
+    if band is None:
+        return error
+
+    return np.clip([efficiency - band[0], band[1] - efficiency], 0.0, None)
+
+
+def _bin_centers(bins):
+    """
+    Helper function to compute x location and error for each bin.
+    """
+    bins = np.asarray(bins)
+
+    return 0.5 * (bins[1:] + bins[:-1]), 0.5 * (bins[1:] - bins[:-1])
+
+
+@plot(
+    'exatrkx.tracks.efficiency',
+    ['generated', 'reconstructable', 'matched'],
+    prepare=_prepare_track_efficiency
+)
 def tracking_efficiency(
-    ax, data, bins, var_col, var_name=None, track_filter=None, errbar_opts=None
+    ax, prepared, var_col, var_name=None, errbar_opts=None
 ):
     """
     Plot track efficiency, both physical and technical, define as
@@ -130,36 +213,26 @@ def tracking_efficiency(
     :param var_name: Name to display as x axis label. Same as var_col if None.
     :param bins: Bins of histogram.
     :param track_filter: Plot track pass filter only.
+    :param bootstrap: Number of bootstrap replicates. Use binomial error if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param seed: Random seed of bootstrap.
     :return:
     """
-
-    generated = data['generated']
-    reconstructable = data['reconstructable']
-    matched = data['matched']
-
-    # Apply filter.
-    if track_filter is not None:
-        generated = generated[track_filter]
-        reconstructable = reconstructable[track_filter]
-        matched = matched[track_filter]
-
-    # Compute histogram.
-    gen_hist, gen_bins = np.histogram(generated[var_col], bins=bins)
-    reco_hist, reco_bins = np.histogram(reconstructable[var_col], bins=bins)
-    matched_hist, matched_bins = np.histogram(matched[var_col], bins=bins)
-
-    # Compute x location and error for each bin.
-    xvals, xerrs = [], []
-    for i in range(1, len(gen_bins)):
-        xvals.append(0.5*(gen_bins[i]+gen_bins[i-1]))
-        xerrs.append(0.5*(gen_bins[i]-gen_bins[i-1]))
+    xvals, xerrs = _bin_centers(prepared['bins'])
 
     # Compute efficiency.
     physical_efficiency, physical_efficiency_error = _efficiency(
-        matched_hist, gen_hist
+        prepared['matched'], prepared['generated']
+    )
+    physical_efficiency_error = _efficiency_error(
+        prepared, physical_efficiency, physical_efficiency_error, 'physical'
     )
     technical_efficiency, technical_efficiency_error = _efficiency(
-        matched_hist, reco_hist
+        prepared['matched'], prepared['reconstructable']
+    )
+    technical_efficiency_error = _efficiency_error(
+        prepared, technical_efficiency, technical_efficiency_error, 'technical'
     )
 
     # Plot physical and technical efficiency.
@@ -188,14 +261,16 @@ def tracking_efficiency(
     ax.grid(True)
 
 
-@plot('exatrkx.tracks.efficiency.technical', ['generated', 'reconstructable', 'matched'])
+@plot(
+    'exatrkx.tracks.efficiency.technical',
+    ['generated', 'reconstructable', 'matched'],
+    prepare=_prepare_track_efficiency
+)
 def tracking_efficiency_techical(
     ax,
-    data,
-    bins,
+    prepared,
     var_col,
     var_name: str = None,
-    track_filter: Callable = None,
     errbar_opts: dict = None
 ):
     """
@@ -209,33 +284,20 @@ def tracking_efficiency_techical(
     :param var_name: Name to display as x axis label. Same as var_col if None.
     :param bins: Bins of histogram.
     :param track_filter: Plot track pass filter only.
+    :param bootstrap: Number of bootstrap replicates. Use binomial error if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param seed: Random seed of bootstrap.
     :return:
     """
-
-    generated = data['generated']
-    reconstructable = data['reconstructable']
-    matched = data['matched']
-
-    # Apply filter.
-    if track_filter is not None:
-        generated = generated[track_filter(generated)]
-        reconstructable = reconstructable[track_filter(reconstructable)]
-        matched = matched[track_filter(matched)]
-
-    # Compute histogram.
-    gen_hist, gen_bins = np.histogram(generated[x_variable], bins=bins)
-    reco_hist, reco_bins = np.histogram(reconstructable[x_variable], bins=bins)
-    matched_hist, matched_bins = np.histogram(matched[x_variable], bins=bins)
-
-    # Compute x location and error for each bin.
-    xvals, xerrs = [], []
-    for i in range(1, len(gen_bins)):
-        xvals.append(0.5*(gen_bins[i]+gen_bins[i-1]))
-        xerrs.append(0.5*(gen_bins[i]-gen_bins[i-1]))
+    xvals, xerrs = _bin_centers(prepared['bins'])
 
     # Compute efficiency.
     technical_efficiency, technical_efficiency_error = _efficiency(
-        matched_hist, reco_hist
+        prepared['matched'], prepared['reconstructable']
+    )
+    technical_efficiency_error = _efficiency_error(
+        prepared, technical_efficiency, technical_efficiency_error, 'technical'
     )
 
     ax.set_ylim(0.0, 1.05)
@@ -257,14 +319,17 @@ def tracking_efficiency_techical(
     ax.grid(True)
 
 
-@plot('exatrkx.tracks.efficiency.physical', ['generated', 'reconstructable', 'matched'])
+@plot(
+    'exatrkx.tracks.efficiency.physical',
+    ['generated', 'reconstructable', 'matched'],
+    prepare=_prepare_track_efficiency
+)
 def tracking_efficiency_physical(
     ax,
-    data,
-    bins,
+    prepared,
     var_col,
     var_name=None,
-    track_filter: Callable = None,
+    errbar_opts: dict = None
 ):
     """
     Plot physical tracking efficiency, define as
@@ -277,33 +342,20 @@ def tracking_efficiency_physical(
     :param var_col: Column name to use as x axis of distribution. Must exist in data.
     :param var_name: Name to display as x axis label. Same as var_col if None.
     :param track_filter: Plot track pass filter only.
+    :param bootstrap: Number of bootstrap replicates. Use binomial error if None.
+    :param confidence: Confidence level of bootstrap band.
+    :param bootstrap_processes: Number of processes to run bootstrap.
+    :param seed: Random seed of bootstrap.
     :return:
     """
-
-    generated = data['generated']
-    reconstructable = data['reconstructable']
-    matched = data['matched']
-
-    # Apply filter.
-    if track_filter is not None:
-        generated = generated[track_filter(generated)]
-        reconstructable = reconstructable[track_filter(reconstructable)]
-        matched = matched[track_filter(matched)]
-
-    # Compute histogram.
-    gen_hist, gen_bins = np.histogram(generated[var_col], bins=bins)
-    reco_hist, reco_bins = np.histogram(reconstructable[var_col], bins=bins)
-    matched_hist, matched_bins = np.histogram(matched[var_col], bins=bins)
-
-    # Compute x location and error for each bin.
-    xvals, xerrs = [], []
-    for i in range(1, len(gen_bins)):
-        xvals.append(0.5*(gen_bins[i]+gen_bins[i-1]))
-        xerrs.append(0.5*(gen_bins[i]-gen_bins[i-1]))
+    xvals, xerrs = _bin_centers(prepared['bins'])
 
     # Compute efficiency.
     physical_efficiency, physical_efficiency_error = _efficiency(
-        matched_hist, gen_hist
+        prepared['matched'], prepared['generated']
+    )
+    physical_efficiency_error = _efficiency_error(
+        prepared, physical_efficiency, physical_efficiency_error, 'physical'
     )
 
     ax.set_ylim(0.0, 1.05)
@@ -324,3 +376,234 @@ def tracking_efficiency_physical(
     ax.legend()
     ax.grid(True)
 
+
+def efficiency_map_counts(
+    generated,
+    reconstructable,
+    matched,
+    x_col,
+    y_col,
+    x_bins,
+    y_bins,
+    track_filter: Callable = None
+):
+    """
+    Count generated, reconstructable and matched tracks over two variables.
+    Each table is binned once over both variables.
+
+    Result can be pass as efficiency_map in data
+    to share same counts between multiple efficiency map plots.
+
+    :param generated: Generated tracks.
+    :param reconstructable: Reconstructable tracks.
+    :param matched: Matched tracks.
+    :param x_col: Column name of first variable.
+    :param y_col: Column name of second variable.
+    :param x_bins: Bins of first variable.
+    :param y_bins: Bins of second variable.
+    :param track_filter: Count track pass filter only.
+    :return: Dict of 2D counts and bins.
+    """
+    counts = {}
+    for key, table in [
+        ('generated', generated),
+        ('reconstructable', reconstructable),
+        ('matched', matched)
+    ]:
+        x = column(table, x_col)
+        y = column(table, y_col)
+        if track_filter is not None:
+            mask = row_mask(table, track_filter)
+            x, y = x[mask], y[mask]
+
+        # Number of bins resolve to edges of generated tracks.
+        x_bins = histogram_bins(x, x_bins)
+        y_bins = histogram_bins(y, y_bins)
+        n_x, n_y = len(x_bins) - 1, len(y_bins) - 1
+
+        x_index = bin_index(x, x_bins)
+        y_index = bin_index(y, y_bins)
+        inside = (x_index >= 0) & (y_index >= 0)
+        counts[key] = np.bincount(
+            x_index[inside] * n_y + y_index[inside], minlength=n_x * n_y
+        ).reshape(n_x, n_y)
+
+    return counts | {
+        'x_bins': x_bins,
+        'y_bins': y_bins
+    }
+
+
+def _prepare_efficiency_map(
+    data, x_col, y_col, x_bins=10, y_bins=10, track_filter: Callable = None
+):
+    if 'efficiency_map' in data:
+        # If user pass precompute counts,
+        # we don't need to recompute all of them.
+        return data['efficiency_map']
+
+    # Tables are only required without precomputed counts.
+    for requirement in ('generated', 'reconstructable', 'matched'):
+        if requirement not in data:
+            raise RuntimeError(f'Data requirement for efficiency map not satisfy: {requirement}')
+
+    return efficiency_map_counts(
+        data['generated'],
+        data['reconstructable'],
+        data['matched'],
+        x_col, y_col,
+        x_bins, y_bins,
+        track_filter
+    )
+
+
+@plot(
+    'exatrkx.tracks.efficiency_map',
+    None,
+    prepare=_prepare_efficiency_map
+)
+def tracking_efficiency_map(
+    ax,
+    prepared,
+    x_col,
+    y_col,
+    x_name: str = None,
+    y_name: str = None,
+    efficiency: str = 'technical',
+    annotate: bool = False,
+    mesh_opts: dict = None,
+    text_opts: dict = None
+):
+    """
+    Plot 2D tracking efficiency map, e.g. over pT and eta.
+
+    :param ax: matplotlib axis object.
+    :param data:
+        Data. Require efficiency_map, or generated, reconstructable and matched
+        with column used in x_col, y_col and track_filter.
+    :param x_col: Column name to use as x axis. Must exist in data.
+    :param y_col: Column name to use as y axis. Must exist in data.
+    :param x_bins: Bins of x axis.
+    :param y_bins: Bins of y axis.
+    :param x_name: Name to display as x axis label. Same as x_col if None.
+    :param y_name: Name to display as y axis label. Same as y_col if None.
+    :param efficiency: Either physical or technical.
+    :param annotate: Annotate efficiency and statistical error in each cell.
+    :param track_filter: Plot track pass filter only.
+    :return:
+    """
+    if efficiency == 'physical':
+        population = prepared['generated']
+    elif efficiency == 'technical':
+        population = prepared['reconstructable']
+    else:
+        raise ValueError(f'Unknown efficiency: {efficiency}')
+
+    values, errors = _efficiency(prepared['matched'], population)
+
+    # Hide empty cells.
+    values = np.ma.masked_where(np.asarray(population) == 0, values)
+
+    mesh_opts = {
+        'cmap': 'viridis',
+        'vmin': 0.0,
+        'vmax': 1.0
+    } | (mesh_opts or {})
+    mesh = ax.pcolormesh(
+        prepared['x_bins'], prepared['y_bins'], values.T, **mesh_opts
+    )
+    ax.figure.colorbar(mesh, ax=ax, label=f'{efficiency.capitalize()} Efficiency')
+
+    if annotate:
+        text_opts = {
+            'ha': 'center',
+            'va': 'center',
+            'fontsize': 'x-small'
+        } | (text_opts or {})
+
+        xvals, _ = _bin_centers(prepared['x_bins'])
+        yvals, _ = _bin_centers(prepared['y_bins'])
+        for i, j in zip(*np.nonzero(~np.ma.getmaskarray(values))):
+            ax.text(
+                xvals[i], yvals[j],
+                f'{values[i, j]:.2f}\n±{errors[i, j]:.2f}',
+                **text_opts
+            )
+
+    ax.set_xlabel(x_name or x_col)
+    ax.set_ylabel(y_name or y_col)
+
+
+@plot(
+    'exatrkx.tracks.efficiency_map.projection',
+    None,
+    prepare=_prepare_efficiency_map
+)
+def tracking_efficiency_map_projection(
+    ax,
+    prepared,
+    x_col,
+    y_col,
+    axis: str = 'x',
+    x_name: str = None,
+    y_name: str = None,
+    errbar_opts: dict = None
+):
+    """
+    Plot 1D projection of 2D tracking efficiency map,
+    both physical and technical, from same counts of the map.
+
+    :param ax: matplotlib axis object.
+    :param data:
+        Data. Require efficiency_map, or generated, reconstructable and matched
+        with column used in x_col, y_col and track_filter.
+    :param x_col: Column name of first variable.
+    :param y_col: Column name of second variable.
+    :param x_bins: Bins of first variable.
+    :param y_bins: Bins of second variable.
+    :param axis: Variable to project on, either x or y.
+    :param x_name: Name of first variable. Same as x_col if None.
+    :param y_name: Name of second variable. Same as y_col if None.
+    :param track_filter: Plot track pass filter only.
+    :return:
+    """
+    if axis not in ('x', 'y'):
+        raise ValueError(f'Unknown axis: {axis}')
+
+    # Sum over the other variable.
+    sum_axis = 1 if axis == 'x' else 0
+    generated = np.sum(prepared['generated'], axis=sum_axis)
+    reconstructable = np.sum(prepared['reconstructable'], axis=sum_axis)
+    matched = np.sum(prepared['matched'], axis=sum_axis)
+
+    xvals, xerrs = _bin_centers(prepared[f'{axis}_bins'])
+
+    physical_efficiency, physical_efficiency_error = _efficiency(matched, generated)
+    technical_efficiency, technical_efficiency_error = _efficiency(matched, reconstructable)
+
+    ax.set_ylim(0.0, 1.05)
+
+    errbar_opts = {
+        'fmt': 'o',
+        'lw': 2
+    } | (errbar_opts or {})
+    ax.errorbar(
+        xvals, physical_efficiency,
+        xerr=xerrs, yerr=physical_efficiency_error,
+        label='Physical Efficiency',
+        **errbar_opts
+    )
+    ax.errorbar(
+        xvals, technical_efficiency,
+        xerr=xerrs, yerr=technical_efficiency_error,
+        label='Technical Efficiency',
+        **errbar_opts
+    )
+
+    if axis == 'x':
+        ax.set_xlabel(x_name or x_col)
+    else:
+        ax.set_xlabel(y_name or y_col)
+
+    ax.legend()
+    ax.grid(True)
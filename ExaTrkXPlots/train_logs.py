@@ -8,33 +8,218 @@ Plots about particles in ExaTrkX routine.
 
 For plot data requirement, detail list below:
     - history:
-        Train history. Either array or dict.
-        For dict, dict must contain data assign by tag.
+        Train history. Either array or table.
+        For table, table must contain column assign by tag.
         For array, treated as value for each step.
+
+Long history is downsampled before drawing, so render time does not depend on its length.
 """
 
+from typing import Sequence, Union
+
 import numpy as np
+import scipy.signal
 from matplotlib.ticker import MaxNLocator
 
 from ExaTrkXPlotting import plot
+from ExaTrkXPlots.columns import as_array, column
+
+
+def smooth(values: np.ndarray, method: str = 'ema', factor: float = None) -> np.ndarray:
+    """
+    Smooth train history. NaN steps, e.g. missing log entries, are skipped.
+
+    :param values: Value of each step.
+    :param method:
+        - ema: Exponential moving average, factor is weight of previous average. Default 0.9.
+        - window: Trailing moving average, factor is window length in steps, at least 2. Default 10.
+    :param factor: Smoothing factor. Default of method if None.
+    :return:
+        Smoothed values. NaN step take value of last valid step,
+        and steps before first valid step are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return values
+
+    valid = ~np.isnan(values)
+
+    if method == 'ema':
+        factor = 0.9 if factor is None else factor
+        if not valid.any():
+            return values
+
+        # y[t] = (1 - factor) * x[t] + factor * y[t-1], start from first value.
+        finite = values[valid]
+        smoothed, _ = scipy.signal.lfilter(
+            [1.0 - factor], [1.0, -factor], finite, zi=[factor * finite[0]]
+        )
+
+        # Carry average over NaN steps.
+        last = np.cumsum(valid) - 1
+        return np.where(last >= 0, smoothed[np.maximum(last, 0)], np.nan)
+
+    if method == 'window':
+        factor = 10 if factor is None else factor
+        if factor < 2:
+            raise ValueError(f'Window length must be at least 2 steps, got {factor}')
+        window = int(factor)
+
+        # Sum and number of valid values in trailing window.
+        value_sums = np.cumsum(np.r_[0.0, np.where(valid, values, 0.0)])
+        valid_sums = np.cumsum(np.r_[0, valid])
+        first = np.maximum(np.arange(len(values)) + 1 - window, 0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            smoothed = (value_sums[1:] - value_sums[first]) / (valid_sums[1:] - valid_sums[first])
+
+        # Window without valid value, carry last average.
+        last = np.maximum.accumulate(np.where(np.isnan(smoothed), -1, np.arange(len(values))))
+        return np.where(last >= 0, smoothed[np.maximum(last, 0)], np.nan)
+
+    raise ValueError(f'Unknown smoothing method: {method}')
+
+
+def _buckets(n: int, n_buckets: int):
+    """
+    Split n steps into equal buckets, last bucket padded.
+
+    :return: Bucket size, padded length.
+    """
+    size = -(-n // n_buckets)
+    return size, size * (-(-n // size))
+
+
+def downsample(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Shape-preserving downsampling. Keep minimum and maximum of each bucket.
+
+    :param values: Value of each step.
+    :param max_points: Maximum number of points to keep.
+    :return: Sorted indices of steps to keep.
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n)
+
+    size, padded = _buckets(n, max(max_points // 2, 1))
 
+    buckets = np.full(padded, np.nan)
+    buckets[:n] = values
+    buckets = buckets.reshape(-1, size)
 
-@plot('exatrkx.train_log', ['history'])
-def train_log(ax, data, tag=None, steps_per_epoch=1, plot_opts=None):
+    # Replace NaN so that all-NaN bucket still give a valid index.
+    offset = np.arange(len(buckets)) * size
+    minimum = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offset
+    maximum = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offset
+
+    indices = np.unique(np.concatenate([minimum, maximum]))
+    return indices[indices < n]
+
+
+def envelope(values: np.ndarray, max_points: int):
+    """
+    Minimum and maximum of each bucket.
+
+    :param values: Value of each step.
+    :param max_points: Maximum number of buckets.
+    :return: Center step, minimum and maximum of each bucket.
+    """
+    n = len(values)
+    size, padded = _buckets(n, max(min(n, max_points), 1))
+
+    buckets = np.full(padded, np.nan)
+    buckets[:n] = values
+    buckets = buckets.reshape(-1, size)
+
+    steps = np.minimum(np.arange(len(buckets)) * size + 0.5 * (size - 1), n - 1)
+
+    return steps, np.nanmin(buckets, axis=1), np.nanmax(buckets, axis=1)
+
+
+def _prepare_train_log(
+    data,
+    tag: Union[str, Sequence[str]] = None,
+    steps_per_epoch=1,
+    max_points: int = 4000,
+    smoothing: str = None,
+    smoothing_factor: float = None,
+    show_envelope: bool = False
+):
     history = data['history']
-    if tag is None:
-        values = history
-    else:
-        values = history[tag]
 
-    train_epochs = np.arange(0, len(values)) * 1.0/steps_per_epoch
+    tags = [tag] if tag is None or isinstance(tag, str) else list(tag)
+
+    prepared = {
+        'tags': np.array([tag or '' for tag in tags])
+    }
+    for idx, tag in enumerate(tags):
+        if tag is None:
+            raw = as_array(history)
+        else:
+            raw = column(history, tag)
 
+        values = raw if smoothing is None else smooth(raw, smoothing, smoothing_factor)
+
+        steps = downsample(values, max_points)
+        prepared[f'epochs_{idx}'] = steps * 1.0/steps_per_epoch
+        prepared[f'values_{idx}'] = np.asarray(values)[steps]
+
+        if show_envelope:
+            # Band of raw values around (smoothed) curve.
+            band_steps, lower, upper = envelope(raw, max_points // 2)
+            prepared[f'band_epochs_{idx}'] = band_steps * 1.0/steps_per_epoch
+            prepared[f'lower_{idx}'] = lower
+            prepared[f'upper_{idx}'] = upper
+
+    return prepared
+
+
+@plot('exatrkx.train_log', ['history'], prepare=_prepare_train_log)
+def train_log(ax, prepared, tag=None, plot_opts=None, band_opts=None):
+    """
+    Plot train history.
+
+    :param ax: matplotlib axis object.
+    :param data: Data.
+    :param tag: Tag or list of tags to plot. None if history is array.
+    :param steps_per_epoch: Number of steps per epoch.
+    :param max_points:
+        Maximum number of points to draw for each tag.
+        Longer history is downsampled, keeping minimum and maximum of each bucket.
+    :param smoothing: None, ema or window. See smooth.
+    :param smoothing_factor:
+        Weight of previous average for ema, default 0.9,
+        or window length for window, default 10.
+    :param show_envelope: Draw minimum and maximum band of raw values.
+    :param plot_opts: Options pass to ax.plot.
+    :param band_opts: Options pass to ax.fill_between.
+    :return:
+    """
     plot_opts = plot_opts or {}
-    ax.plot(train_epochs, values, **plot_opts)
-    
+    band_opts = {
+        'alpha': 0.2,
+        'lw': 0
+    } | (band_opts or {})
+
+    tags = prepared['tags']
+    for idx, tag in enumerate(tags):
+        line, = ax.plot(
+            prepared[f'epochs_{idx}'],
+            prepared[f'values_{idx}'],
+            **({'label': tag} if len(tags) > 1 else {}) | plot_opts
+        )
+
+        if f'lower_{idx}' in prepared:
+            ax.fill_between(
+                prepared[f'band_epochs_{idx}'],
+                prepared[f'lower_{idx}'],
+                prepared[f'upper_{idx}'],
+                **{'color': line.get_color()} | band_opts
+            )
+
     ax.set_xlabel('Epochs')
-    ax.set_ylabel(tag or 'History')
+    ax.set_ylabel(tags[0] if len(tags) == 1 and tags[0] else 'History')
     ax.xaxis.set_major_locator(MaxNLocator(integer=True))
 
     ax.legend()
-
@@ -1,7 +1,26 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import logging
+import sys
+
+# Progress of rendering is printed by default.
+# Configure this logger to change, e.g. setLevel(logging.WARNING) to quiet it.
+_logger = logging.getLogger(__name__)
+if not _logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
 from .plot_manager import plot_manager
 from .plotter import Plotter
 from .plot import plot
 from .plot_config import PlotConfig
+from .render_cache import RenderCache
+from .render_session import RenderSession, run_jobs, subplots
+from .artifact import Artifact, save_artifact, load_artifact, export_artifact
+from .shared_data import SharedDataStore, SharedRef, attach
+from .compaction import Compactor, compact
+from .server import RenderServer, render_remote
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Serializable prepared-plot artifacts.
+
+Prepared data of split plot (see Plot) can be export as compressed .npz artifact,
+then render later without original data, e.g. to restyle a figure.
+
+Artifact contain prepared arrays and a metadata entry record:
+    - format: Artifact format version.
+    - plot: Plot name.
+    - plot_version: Plot version when artifact is export.
+"""
+
+from typing import Union, Dict, Any, AnyStr, Tuple
+from os import PathLike
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+
+from .plot_manager import plot_manager
+
+
+ARTIFACT_FORMAT = 1
+
+_METADATA_KEY = '__artifact__'
+
+
+class Artifact(PathLike):
+    """
+    Reference to an artifact file. Use as data of PlotConfig.
+    """
+    def __init__(self, path: Union[PathLike, AnyStr]):
+        self.path = Path(path)
+
+    def __fspath__(self):
+        return os.fspath(self.path)
+
+    def __repr__(self):
+        return f'Artifact({str(self.path)!r})'
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """
+        :return: Metadata of artifact.
+        """
+        with np.load(self.path, allow_pickle=False) as fp:
+            return json.loads(str(fp[_METADATA_KEY]))
+
+    def load(self, plot=None) -> Dict[str, Any]:
+        """
+        Load prepared data.
+
+        :param plot:
+            Plot to check artifact against. Skip check if None.
+        :return:
+            Prepared data.
+        """
+        metadata, prepared = load_artifact(self.path)
+
+        if plot is not None:
+            if metadata['plot'] != plot.name:
+                raise RuntimeError(
+                    f'Artifact {self.path} is export by {metadata["plot"]}, not {plot.name}.'
+                )
+            if metadata['plot_version'] != plot.version:
+                raise RuntimeError(
+                    f'Artifact {self.path} is export by {plot.name} version '
+                    f'{metadata["plot_version"]}, but current version is {plot.version}.'
+                )
+
+        return prepared
+
+
+def save_artifact(
+    path: Union[PathLike, AnyStr],
+    plot,
+    prepared: Dict[str, Any]
+) -> Path:
+    """
+    Save prepared data as artifact.
+
+    :param path:
+        Artifact location. Suffix .npz is append if not present.
+    :param plot:
+        Plot type ID or plotting object which prepare the data.
+    :param prepared:
+        Prepared data. Must be a dict of arrays, scalars or None.
+    :return:
+        Artifact location.
+    """
+    if isinstance(plot, str):
+        plot = plot_manager.plot(plot)
+
+    if not isinstance(prepared, dict):
+        raise TypeError(f'Only dict prepared data can be export, got {type(prepared).__name__}.')
+
+    arrays = {}
+    scalars, nones = [], []
+    for key, value in prepared.items():
+        if value is None:
+            nones.append(key)
+            continue
+
+        array = np.asarray(value)
+        if array.dtype.hasobject:
+            raise TypeError(f'Prepared data {key} is not a plain array.')
+        if array.ndim == 0:
+            scalars.append(key)
+
+        arrays[key] = array
+
+    metadata = {
+        'format': ARTIFACT_FORMAT,
+        'plot': plot.name,
+        'plot_version': plot.version,
+        'scalars': scalars,
+        'none': nones
+    }
+
+    path = Path(path)
+    if path.suffix != '.npz':
+        path = path.with_name(path.name + '.npz')
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    np.savez_compressed(
+        path, **arrays, **{_METADATA_KEY: np.array(json.dumps(metadata))}
+    )
+
+    return path
+
+
+def load_artifact(path: Union[PathLike, AnyStr]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Load artifact.
+
+    :param path: Artifact location.
+    :return: Metadata and prepared data.
+    """
+    with np.load(path, allow_pickle=False) as fp:
+        metadata = json.loads(str(fp[_METADATA_KEY]))
+
+        if metadata['format'] > ARTIFACT_FORMAT:
+            raise RuntimeError(
+                f'Artifact format {metadata["format"]} is newer than supported {ARTIFACT_FORMAT}.'
+            )
+
+        prepared = {
+            key: fp[key] for key in fp.files if key != _METADATA_KEY
+        }
+
+    for key in metadata['scalars']:
+        prepared[key] = prepared[key].item()
+    for key in metadata['none']:
+        prepared[key] = None
+
+    return metadata, prepared
+
+
+def export_artifact(path: Union[PathLike, AnyStr], plot, data, **kwargs) -> Path:
+    """
+    Run prepare step of plot and save result as artifact.
+
+    :param path: Artifact location.
+    :param plot: Plot type ID or plotting object. Must have prepare step.
+    :param data: Data pass to plot.
+    :param kwargs: Plot args.
+    :return: Artifact location.
+    """
+    if isinstance(plot, str):
+        plot = plot_manager.plot(plot)
+
+    if not plot.is_split:
+        raise RuntimeError(f'Plot {plot.name} has no prepare step, cannot export artifact.')
+
+    return save_artifact(path, plot, plot.prepare(data, **kwargs))
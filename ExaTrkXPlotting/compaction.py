@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in dtype compaction of input tables.
+
+Inputs like TrackML CSV arrive as float64 and int64 everywhere.
+Compaction downcast each column once before plotting, so all later copies are smaller:
+    - float64 columns become float32 if round trip error stay within tolerance,
+      otherwise they are kept as it is.
+    - Integer columns, e.g. ids, become narrowest signed integer type hold all values.
+      This is always lossless. Signed type is used so differences of ids never wrap around.
+    - Categorical columns, e.g. particle_type, become pandas categorical.
+      For non-pandas tables they are narrowed like other integer columns.
+
+Supported tables are pandas DataFrame, structured array and dict of arrays.
+Dict is compacted recursively, other values are kept as it is.
+
+Compaction copy data, original is only freed once nothing refer to it.
+For lowest peak memory, compact each table right after loading,
+so only one table is ever alive at full width:
+
+    data = {name: compact(pd.read_csv(path)) for name, path in paths.items()}
+"""
+
+from typing import Any, Iterable, List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+_INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+class CompactionReport(NamedTuple):
+    """
+    What happened to a column.
+    """
+    column: str
+    dtype: str
+    compact_dtype: str
+    max_error: float = 0.0
+
+
+class Compactor:
+    """
+    Dtype compaction with precision check.
+    """
+    def __init__(
+        self,
+        atol: float = 1e-3,
+        rtol: float = 1e-6,
+        categorical: Iterable[str] = ('particle_type', ),
+        exclude: Iterable[str] = ()
+    ):
+        """
+        Define a compaction.
+
+        :param atol:
+            Absolute tolerance of float32 round trip, in unit of data, e.g. 1e-3 mm.
+        :param rtol:
+            Relative tolerance of float32 round trip.
+            Column is downcast only if |float32(x) - x| <= atol + rtol * |x| for all values.
+        :param categorical:
+            Columns to convert to pandas categorical.
+        :param exclude:
+            Columns to keep as it is.
+        """
+        self.atol = atol
+        self.rtol = rtol
+        self.categorical = set(categorical)
+        self.exclude = set(exclude)
+
+        # Reports of last call only, so a Compactor reused across events does not grow.
+        self.reports: List[CompactionReport] = []
+
+    def __call__(self, data):
+        """
+        Compact data.
+
+        :param data: Table, array or dict of them.
+        :return: Compacted data. Input is never modified.
+        """
+        self.reports = []
+
+        return self._compact(data, '')
+
+    def _compact(self, data, name: str):
+        if isinstance(data, dict):
+            return {
+                key: self._compact(value, f'{name}.{key}' if name else str(key))
+                for key, value in data.items()
+            }
+
+        if isinstance(data, pd.DataFrame):
+            return pd.DataFrame({
+                column: self._compact_column(data[column], f'{name}.{column}', column)
+                for column in data.columns
+            }, index=data.index)
+
+        if isinstance(data, np.ndarray):
+            if data.dtype.names is None:
+                return self._compact_array(data, name, name.rsplit('.', 1)[-1])
+
+            fields = {
+                field: self._compact_array(data[field], f'{name}.{field}', field)
+                for field in data.dtype.names
+            }
+            result = np.empty(len(data), dtype=[
+                (field, values.dtype, values.shape[1:]) for field, values in fields.items()
+            ])
+            for field, values in fields.items():
+                result[field] = values
+
+            return result
+
+        return data
+
+    def _compact_column(self, series: pd.Series, name: str, column: str):
+        if column in self.exclude:
+            return series
+
+        if column in self.categorical and not isinstance(series.dtype, pd.CategoricalDtype):
+            self.reports.append(CompactionReport(name, str(series.dtype), 'category'))
+            return series.astype('category')
+
+        if isinstance(series.dtype, np.dtype):
+            return pd.Series(
+                self._compact_array(series.to_numpy(), name, column),
+                index=series.index, name=series.name
+            )
+
+        return series
+
+    def _compact_array(self, values: np.ndarray, name: str, column: str) -> np.ndarray:
+        if column in self.exclude or values.size == 0:
+            return values
+
+        if values.dtype == np.float64:
+            compact = values.astype(np.float32)
+
+            with np.errstate(invalid='ignore'):
+                error = np.abs(compact.astype(np.float64) - values)
+                within = error <= self.atol + self.rtol * np.abs(values)
+            # Non-finite values survive round trip as long as they stay non-finite.
+            within |= ~np.isfinite(values) & (np.isnan(values) == np.isnan(compact))
+
+            max_error = float(np.nanmax(np.where(np.isfinite(error), error, 0.0)))
+            if not within.all():
+                self.reports.append(CompactionReport(
+                    name, str(values.dtype), str(values.dtype), max_error
+                ))
+                return values
+
+            self.reports.append(CompactionReport(
+                name, str(values.dtype), str(compact.dtype), max_error
+            ))
+            return compact
+
+        if np.issubdtype(values.dtype, np.integer):
+            lower, upper = values.min(), values.max()
+
+            for dtype in _INTEGER_TYPES:
+                info = np.iinfo(dtype)
+                if info.min <= lower and upper <= info.max:
+                    break
+            else:
+                # Unsigned values beyond int64.
+                return values
+
+            if np.dtype(dtype).itemsize >= values.dtype.itemsize:
+                return values
+
+            self.reports.append(CompactionReport(name, str(values.dtype), np.dtype(dtype).name))
+            return values.astype(dtype)
+
+        return values
+
+
+def compact(data, **kwargs) -> Any:
+    """
+    Compact dtype of data. See Compactor for options.
+
+    :param data: Table, array or dict of them.
+    :param kwargs: Options pass to Compactor.
+    :return: Compacted data.
+    """
+    return Compactor(**kwargs)(data)
+
+
+def memory_usage(data) -> int:
+    """
+    :param data: Table, array or dict of them.
+    :return: Number of bytes of arrays in data.
+    """
+    if isinstance(data, dict):
+        return sum(memory_usage(value) for value in data.values())
+
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(index=False, deep=True).sum())
+
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+
+    return 0
+
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from typing import List
+from typing import Any, Callable, Dict, List
 import functools
+import inspect
 
 from .plot_manager import plot_manager
 
@@ -10,15 +11,35 @@ from .plot_manager import plot_manager
 class Plot:
     """
     Plotting function wrapper.
+
+    A plot is either a single function draw data on axes,
+    or split into two steps:
+        - prepare(data, **args): Compute plain arrays from data. Do not touch axes.
+        - draw(ax, prepared, **args): Draw prepared arrays on axes.
+    For split plot, each step only receive args appear in its signature.
     """
-    def __init__(self, name, data_requirements: List, func):
+    def __init__(self, name, data_requirements: List, func, version=None, prepare=None):
         self.plot_func = func
+        self.prepare_func = prepare
         self.data_requirements = data_requirements
         self.name = name
+        self.version = version
 
         plot_manager.register(self)
 
-    def __call__(self, ax, data, ax_opts=None, *args, **kwargs):
+    @property
+    def is_split(self) -> bool:
+        """
+        :return: Whether this plot has separate prepare step.
+        """
+        return self.prepare_func is not None
+
+    def check(self, data):
+        """
+        Check data with requirements.
+
+        :param data: Data pass to plot.
+        """
         if self.data_requirements is not None:
             # If data check is enable, check data with requirements.
             for requirement in self.data_requirements:
@@ -27,13 +48,83 @@ class Plot:
                         f'Data requirement for {self.name} not satisfy: {requirement}'
                     )
 
+    def prepare(self, data, ax_opts=None, **kwargs) -> Any:
+        """
+        Run prepare step. Safe to call from worker threads.
+        For plot without prepare step, data is return as it is.
+
+        :param data: Data pass to plot.
+        :param ax_opts: Ignored, only use by draw.
+        :param kwargs: Plot args.
+        :return: Prepared data pass to draw.
+        """
+        self.check(data)
+
+        if not self.is_split:
+            return data
+
+        prepare_kwargs, _ = self._split_kwargs(kwargs)
+
+        return self.prepare_func(data, **prepare_kwargs)
+
+    def draw(self, ax, prepared, ax_opts=None, **kwargs):
+        """
+        Run draw step.
+
+        :param ax: matplotlib axis object.
+        :param prepared: Prepared data return by prepare.
+        :param ax_opts: Options pass to ax.set after draw.
+        :param kwargs: Plot args.
+        """
+        if self.is_split:
+            _, kwargs = self._split_kwargs(kwargs)
+
+        self.plot_func(ax, prepared, **kwargs)
+
+        if ax_opts is not None:
+            ax.set(**ax_opts)
+
+    def __call__(self, ax, data, ax_opts=None, *args, **kwargs):
+        if self.is_split:
+            self.draw(ax, self.prepare(data, **kwargs), ax_opts, **kwargs)
+            return
+
+        self.check(data)
+
         self.plot_func(ax, data, *args, **kwargs)
 
         if ax_opts is not None:
             ax.set(**ax_opts)
 
+    def _split_kwargs(self, kwargs: Dict[str, Any]):
+        prepare_kwargs = _accepted_kwargs(self.prepare_func, kwargs)
+        draw_kwargs = _accepted_kwargs(self.plot_func, kwargs)
+
+        unexpected = set(kwargs) - set(prepare_kwargs) - set(draw_kwargs)
+        if unexpected:
+            raise TypeError(
+                f'{self.name} got unexpected keyword arguments: {sorted(unexpected)}'
+            )
+
+        return prepare_kwargs, draw_kwargs
+
+
+def _accepted_kwargs(func: Callable, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    parameters = inspect.signature(func).parameters
+
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values()):
+        return dict(kwargs)
+
+    return {
+        key: value for key, value in kwargs.items()
+        if key in parameters and parameters[key].kind in (
+            inspect.Parameter.POSITIONAL_OR_KEYWORD,
+            inspect.Parameter.KEYWORD_ONLY
+        )
+    }
+
 
-def plot(name: str, data_requirements: List = None):
+def plot(name: str, data_requirements: List = None, version=None, prepare: Callable = None):
     """
     Decoration to define a plot.
 
@@ -44,11 +135,18 @@ def plot(name: str, data_requirements: List = None):
         This will be use to check input data before plotting.
         Only work if data is subscriptable.
         None if you want to disable this feature.
+    :param version:
+        Version of this plot.
+        Change it to invalidate cached render when plot behavior change.
+    :param prepare:
+        Optional prepare step, take data and args, return plain arrays.
+        If assigned, decorated function become draw step, take axes and prepared data.
+        Prepare step of all axes in a figure can run concurrently.
     :return:
         Decorator.
     """
     def decorator(func):
-        plot = Plot(name, data_requirements, func)
+        plot = Plot(name, data_requirements, func, version, prepare)
 
         # Copy docstring and function signature.
         functools.update_wrapper(plot, func)
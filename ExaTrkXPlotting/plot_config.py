@@ -3,6 +3,9 @@
 
 from typing import Any, Dict
 
+from .artifact import Artifact
+from .shared_data import resolve
+
 
 class PlotConfig:
     """
@@ -13,7 +16,9 @@ class PlotConfig:
         plot: Any = None,
         data: Any = None,
         config: Any = None,
-        args: Dict = None
+        args: Dict = None,
+        artifact: Any = None,
+        export: Any = None
     ):
         """
         Define a plot configuration.
@@ -22,16 +27,24 @@ class PlotConfig:
             Plot type ID or plotting object.
         :param data:
             Data pass to plotting function.
+            SharedRef in data is replaced by attached shared data.
         :param config:
             External configuration.
             Either a string to reference external configuration or a config dictionary.
         :param args:
             Other kwargs pass to plotting function.
+        :param artifact:
+            Artifact location to render from instead of data.
+            Plot type is read from artifact if not assigned.
+        :param export:
+            Location to export prepared data as artifact.
         """
         self.plot = plot
         self.data = data
         self.config = config
         self.kwargs = args or {}
+        self.artifact = artifact
+        self.export = export
 
     def parse(
         self,
@@ -43,6 +56,7 @@ class PlotConfig:
         plot = self.plot
         data = self.data or external_data
         kwargs = self.kwargs
+        artifact = self.artifact
 
         if config is not None:
             if isinstance(config, str):
@@ -59,6 +73,16 @@ class PlotConfig:
                         **self.kwargs,
                         **config['args']
                     }
+                if 'artifact' in config:
+                    artifact = artifact or config['artifact']
+
+        # Refer to shared memory by name.
+        data = resolve(data)
+
+        if artifact is not None:
+            # Render from prepared data instead.
+            data = Artifact(artifact)
+            plot = plot or data.metadata['plot']
 
         if plot is None:
             raise RuntimeError('Unrecognized plot configuration. Skip.')
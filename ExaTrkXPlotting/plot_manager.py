@@ -1,15 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import threading
+
+
 class _PlotManager:
     def __init__(self):
         self._plots = {}
+        # Plots may be registered while other threads are rendering.
+        self._lock = threading.RLock()
 
     def register(self, plot):
-        self._plots[plot.name] = plot
+        with self._lock:
+            self._plots[plot.name] = plot
 
     def plot(self, name):
-        return self._plots.get(name, None)
+        with self._lock:
+            return self._plots.get(name, None)
 
     def plots(self):
         """
@@ -17,7 +24,8 @@ class _PlotManager:
 
         :return: List of defined plots.
         """
-        return list(self._plots.keys())
+        with self._lock:
+            return list(self._plots.keys())
 
 
 plot_manager = _PlotManager()
@@ -5,16 +5,27 @@ from typing import Union, Dict, Any, AnyStr
 from os import PathLike
 from pathlib import Path
 from time import time
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
 
 import yaml
 
 import numpy as np
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from matplotlib.backend_bases import FigureCanvasBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+from .artifact import Artifact, save_artifact
+from .compaction import Compactor
 from .plot_config import PlotConfig
 from .plot_manager import plot_manager
+from .render_cache import RenderCache
+
+
+logger = logging.getLogger(__name__)
 
 
 class Plotter:
@@ -24,18 +35,28 @@ class Plotter:
         plots: Any = None,
         data: Any = None,
         config: Any = None,
+        compact: Union[bool, Compactor] = False
     ):
         """
         Plotter of a figure.
 
         :param fig:
             matplotlib Figure object.
+            Figure created by pyplot is closed by pyplot after plot.
+            Figure created directly, e.g. by ExaTrkXPlotting.subplots, never touch pyplot,
+            so many figures can be plotted from different threads at the same time.
         :param plots:
             Configurations define how to plot each axes.
         :param config:
             Single or list of external configuration file path or config dict.
         :param data:
             Data pass to all plotting function if no data assign in configuration.
+        :param compact:
+            Compact dtype of data before prepare step to reduce memory.
+            True to use default Compactor, or a Compactor with custom tolerance.
+            Data pass to Plotter is compacted here, and only compacted copy is kept,
+            so original is freed once caller drop it, e.g. pass loaded data directly.
+            Data assigned in configuration is compacted once per plot call.
         """
         self.fig = fig
         self.plots = {axes: [] for axes in fig.get_axes()}
@@ -45,50 +66,140 @@ class Plotter:
                 self.plots[ax] = plot_config
 
         self.config = config
+
+        if compact is True:
+            compact = Compactor()
+        self.compactor = compact or None
+
+        # Compact at load time instead of per plot call,
+        # otherwise original and compacted copy are both alive during render.
+        if self.compactor is not None and data is not None:
+            data = self.compactor(data)
         self.data = data
+        self._compact_data = data
+
+        self._compacted = {}
+        self._compact_lock = threading.Lock()
 
     def plot(
-        self, save: Union[PathLike, AnyStr] = None, close: bool = True
+        self,
+        save: Union[PathLike, AnyStr] = None,
+        close: bool = True,
+        cache: RenderCache = None,
+        workers: int = None
     ):
         """
         Plot the figure.
 
         :param save:
             Figure save location. None if you want to show plot instead of save it.
+            Only figure created by pyplot can be shown.
         :param close:
             Whether close figure after plot complete to clean memory.
             This might be unwanted if you want to plot multiple time on same figure.
+        :param cache:
+            Render cache to skip render if output with same content already exist.
+            Only work if save is assigned.
+        :param workers:
+            Number of threads to run prepare step of plots.
+            None to use one thread per plot up to number of CPUs.
+            Draw step always run in order in calling thread.
         """
         t_start = time()
 
         external_config = self._parse_external_configuration(self.config)
 
+        render_key = None
+        if cache is not None and save is not None:
+            render_key = cache.key(
+                self.fig, self.plots, external_config, self.data, self.compactor
+            )
+
+            if cache.hit(render_key, save):
+                logger.info(
+                    f'Plot unchanged, skip render.\n'
+                    f'Figure output to {Path(save).absolute()}\n'
+                )
+
+                if close:
+                    self._close()
+                return
+
+        jobs = []
         for (ax, plt_config) in self.plots.items():
             if isinstance(plt_config, list):
                 # If configuration is list
                 # overlap different plot on same axes.
+                # Skip invalid configuration instead of abort.
                 for subplot_config in plt_config:
-                    try:
-                        self._plot(ax, subplot_config, external_config, self.data)
-                    except RuntimeError as error:
-                        print(error)
-                        continue
+                    jobs.append((ax, subplot_config, True))
             else:
-                self._plot(ax, plt_config, external_config, self.data)
+                jobs.append((ax, plt_config, False))
+
+        if workers is None:
+            workers = min(len(jobs), os.cpu_count() or 1)
+
+        self._compacted.clear()
+
+        # Prepare all plots concurrently, then draw one by one.
+        executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        try:
+            if executor is not None:
+                futures = [
+                    executor.submit(self._prepare, plt_config, external_config, self.data)
+                    for _, plt_config, _ in jobs
+                ]
+
+            for idx, (ax, plt_config, skip_error) in enumerate(jobs):
+                try:
+                    if executor is not None:
+                        prepared = futures[idx].result()
+                    else:
+                        prepared = self._prepare(plt_config, external_config, self.data)
+
+                    self._draw(ax, *prepared)
+                except RuntimeError as error:
+                    if not skip_error:
+                        raise
+                    logger.warning(error)
+                    continue
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            self._compacted.clear()
 
         if save is not None:
             save = Path(save)
+            if type(self.fig.canvas) is FigureCanvasBase:
+                # Figure not attached to any backend, render with Agg directly
+                # instead of let savefig switch canvas.
+                FigureCanvasAgg(self.fig)
             self.fig.savefig(save)
 
-            print(
+            if render_key is not None:
+                cache.record(render_key, save)
+
+            logger.info(
                 f'Plot complete in {time()-t_start:.4f} second.\n'
                 f'Figure output to {save.absolute()}\n'
             )
-        else:
+        elif self._is_pyplot_figure():
+            import matplotlib.pyplot as plt
             plt.show()
 
         # Clean up.
         if close:
+            self._close()
+
+    def _is_pyplot_figure(self) -> bool:
+        # Only pyplot assign a figure manager to canvas.
+        return getattr(self.fig.canvas, 'manager', None) is not None
+
+    def _close(self):
+        # Figure not created by pyplot is not referred by any global state,
+        # it is freed once caller drop it.
+        if self._is_pyplot_figure():
+            import matplotlib.pyplot as plt
             plt.close(self.fig)
 
     def _parse_external_configuration(self, config) -> Dict[str, Any]:
@@ -112,20 +223,48 @@ class Plotter:
 
         return {}
 
-    def _plot(self, ax, plt_config, external_config, data):
+    def _prepare(self, plt_config, external_config, data):
         plt_type, plt_data, plt_args = plt_config.parse(
             external_config, data
         )
 
         if isinstance(plt_type, str):
-            if plt_type in plot_manager.plots():
-                print(f'Plotting {plt_type}...')
-                plot_manager.plot(plt_type)(ax, plt_data, **plt_args)
-            else:
-                raise RuntimeError(f'Plot definition not found: {plt_type}. Skip.')
+            plt_name, plt_type = plt_type, plot_manager.plot(plt_type)
+            if plt_type is None:
+                raise RuntimeError(f'Plot definition not found: {plt_name}. Skip.')
+
+        if isinstance(plt_data, Artifact):
+            if not getattr(plt_type, 'is_split', False):
+                raise RuntimeError(f'Plot {plt_type.name} cannot render from artifact. Skip.')
+
+            plt_data = plt_data.load(plt_type)
+        elif hasattr(plt_type, 'prepare'):
+            plt_data = plt_type.prepare(self._compact(plt_data), **plt_args)
+
+            export = getattr(plt_config, 'export', None)
+            if export is not None:
+                save_artifact(export, plt_type, plt_data)
+
+        return plt_type, plt_data, plt_args
+
+    def _compact(self, data):
+        if self.compactor is None or data is None or data is self._compact_data:
+            return data
+
+        # Same data may be shared by many plots, compact it only once.
+        with self._compact_lock:
+            if id(data) not in self._compacted:
+                self._compacted[id(data)] = (data, self.compactor(data))
+
+            return self._compacted[id(data)][1]
+
+    def _draw(self, ax, plt_type, prepared, plt_args):
+        logger.info(f'Plotting {plt_type.name}...')
+
+        if hasattr(plt_type, 'draw'):
+            plt_type.draw(ax, prepared, **plt_args)
         else:
-            print(f'Plotting {plt_type.name}...')
-            plt_type(ax, plt_data, **plt_args)
+            plt_type(ax, prepared, **plt_args)
 
     def __getitem__(self, ax):
         return self.plots[ax]
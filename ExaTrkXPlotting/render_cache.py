@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed cache of rendered figures.
+
+A render key is a hash over everything that decides how a figure look like:
+input data (or file fingerprints for paths), resolved plot arguments,
+plot function identity and version, and figure layout.
+If output of a figure already exist with same key, render can be skipped.
+
+Cache metadata is kept as one small JSON file per output inside store directory.
+Each file is replaced atomically, so worker processes can share a store without lock.
+Use command below to prune stale entries:
+
+    python -m ExaTrkXPlotting.render_cache prune --store .exatrkx_cache
+"""
+
+from typing import Union, Dict, Any, AnyStr
+from os import PathLike
+from pathlib import Path
+from time import time
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class RenderCache:
+    """
+    Content-addressed render cache.
+    """
+    ENTRIES_NAME = 'entries'
+
+    def __init__(self, store: Union[PathLike, AnyStr] = '.exatrkx_cache'):
+        """
+        Define a render cache.
+
+        :param store:
+            Directory to keep cache metadata.
+        """
+        self.store = Path(store)
+
+    @property
+    def entries_path(self) -> Path:
+        return self.store / self.ENTRIES_NAME
+
+    def key(self, fig, plots, external_config, data, compactor=None) -> str:
+        """
+        Compute render key of a figure.
+
+        :param fig:
+            matplotlib Figure object.
+        :param plots:
+            Plot configurations of each axes, same as Plotter.plots.
+        :param external_config:
+            Parsed external configuration.
+        :param data:
+            Data pass to all plotting function if no data assign in configuration.
+        :param compactor:
+            Compactor apply to data before prepare step, None if data is not compacted.
+        :return:
+            Hex digest of render key.
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        memo = {}
+
+        # Figure layout.
+        _update(hasher, 'figure', tuple(fig.get_size_inches()), fig.dpi)
+
+        # Compaction change data seen by plots.
+        _update(hasher, 'compact', None if compactor is None else (
+            type(compactor).__name__,
+            compactor.atol,
+            compactor.rtol,
+            sorted(compactor.categorical),
+            sorted(compactor.exclude)
+        ))
+
+        axes = fig.get_axes()
+        for ax, plt_config in plots.items():
+            _update(
+                hasher, 'axes',
+                axes.index(ax) if ax in axes else -1,
+                tuple(ax.get_position().bounds)
+            )
+
+            plt_configs = plt_config if isinstance(plt_config, list) else [plt_config]
+            for subplot_config in plt_configs:
+                try:
+                    plt_type, plt_data, plt_args = subplot_config.parse(
+                        external_config, data
+                    )
+                except RuntimeError:
+                    _update(hasher, 'invalid')
+                    continue
+
+                _update(hasher, 'plot', plot_identity(plt_type))
+                _update(hasher, 'data', _digest(plt_data, memo))
+                _update(hasher, 'args', _digest(plt_args, memo))
+
+        return hasher.hexdigest()
+
+    def hit(self, key: str, save: Union[PathLike, AnyStr]) -> bool:
+        """
+        Check whether output with given key already exist.
+
+        :param key: Render key.
+        :param save: Figure save location.
+        :return: True if render can be skipped.
+        """
+        save = Path(save).absolute()
+        entry = self._load_entry(self._entry_path(save))
+
+        if entry is None or entry['key'] != key:
+            return False
+
+        return _file_state(save) == entry.get('state')
+
+    def record(self, key: str, save: Union[PathLike, AnyStr]):
+        """
+        Record rendered output.
+
+        :param key: Render key.
+        :param save: Figure save location.
+        """
+        save = Path(save).absolute()
+
+        self._save_entry(self._entry_path(save), {
+            'save': str(save),
+            'key': key,
+            'state': _file_state(save),
+            'time': time()
+        })
+
+    def prune(self, max_age: float = None, remove_outputs: bool = False) -> int:
+        """
+        Remove stale entries from cache.
+
+        Entry is stale if output no longer exist, output is modified outside of cache,
+        or entry is older than max_age.
+
+        :param max_age:
+            Maximum age of entry in seconds. None to keep all valid entries.
+        :param remove_outputs:
+            Also delete output files of entries removed by max_age.
+        :return:
+            Number of removed entries.
+        """
+        now = time()
+        removed = 0
+
+        for entry_path in self.entries_path.glob('*.json'):
+            entry = self._load_entry(entry_path)
+
+            if entry is not None:
+                save = Path(entry['save'])
+                if _file_state(save) == entry.get('state'):
+                    if max_age is None or now - entry['time'] <= max_age:
+                        continue
+
+                    if remove_outputs:
+                        os.remove(save)
+
+            # Another process may prune same entry.
+            try:
+                os.remove(entry_path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def _entry_path(self, save: Path) -> Path:
+        name = hashlib.blake2b(str(save).encode(), digest_size=16).hexdigest()
+        return self.entries_path / f'{name}.json'
+
+    @staticmethod
+    def _load_entry(entry_path: Path) -> Union[Dict[str, Any], None]:
+        try:
+            with open(entry_path) as fp:
+                return json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_entry(self, entry_path: Path, entry: Dict[str, Any]):
+        self.entries_path.mkdir(parents=True, exist_ok=True)
+
+        # Write to temporary file first so entry never get corrupted.
+        tmp_path = entry_path.with_suffix(
+            f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+        with open(tmp_path, 'w') as fp:
+            json.dump(entry, fp, indent=2)
+        os.replace(tmp_path, entry_path)
+
+
+def plot_identity(plt_type) -> tuple:
+    """
+    Identity of a plot, include name, version and code of plotting functions.
+
+    :param plt_type: Plot type ID or plotting object.
+    :return: Tuple identify the plot.
+    """
+    if isinstance(plt_type, str):
+        # Avoid circular import.
+        from .plot_manager import plot_manager
+
+        plt_type = plot_manager.plot(plt_type) or plt_type
+
+    if isinstance(plt_type, str):
+        return 'unknown', plt_type
+
+    prepare_func = getattr(plt_type, 'prepare_func', None)
+
+    return (
+        plt_type.name,
+        getattr(plt_type, 'version', None),
+        _code_identity(getattr(plt_type, 'plot_func', plt_type)),
+        None if prepare_func is None else _code_identity(prepare_func)
+    )
+
+
+def _code_identity(func) -> tuple:
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return getattr(func, '__module__', None), getattr(func, '__qualname__', repr(func))
+
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_code(hasher, code)
+
+    return func.__module__, func.__qualname__, hasher.hexdigest()
+
+
+def _update_code(hasher, code):
+    """
+    Hash bytecode and constants of code object.
+    Nested code objects (lambda, comprehension, inner function) are hashed recursively,
+    their repr contain memory address and change between processes.
+    """
+    hasher.update(code.co_code)
+    _update_constant(hasher, code.co_consts)
+
+
+def _update_constant(hasher, value):
+    if hasattr(value, 'co_code'):
+        _update(hasher, 'code', value.co_name)
+        _update_code(hasher, value)
+    elif isinstance(value, (tuple, frozenset)):
+        items = value if isinstance(value, tuple) else sorted(value, key=repr)
+        _update(hasher, type(value).__name__, len(items))
+        for item in items:
+            _update_constant(hasher, item)
+    else:
+        _update(hasher, value)
+
+
+def _file_state(path: Path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _update(hasher, *values):
+    hasher.update(repr(values).encode())
+
+
+def _digest(obj, memo: Dict[int, tuple]) -> str:
+    """
+    Content digest of data. Same object is only hashed once.
+    Memo keep object alive, so id of a freed temporary is never reused for another object.
+    """
+    entry = memo.get(id(obj))
+    if entry is not None and entry[0] is obj:
+        return entry[1]
+
+    hasher = hashlib.blake2b(digest_size=20)
+
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        _update(hasher, type(obj).__name__, obj)
+    elif isinstance(obj, PathLike):
+        # File fingerprint instead of file content.
+        path = Path(obj).absolute()
+        _update(hasher, 'path', str(path), _file_state(path))
+    elif isinstance(obj, np.ndarray):
+        _update(hasher, 'ndarray', obj.dtype.str, obj.shape)
+        if obj.dtype.hasobject:
+            hasher.update(pickle.dumps(obj.tolist()))
+        else:
+            hasher.update(memoryview(np.ascontiguousarray(obj)).cast('B'))
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        if isinstance(obj, pd.DataFrame):
+            columns, dtypes = obj.columns, obj.dtypes
+        else:
+            columns, dtypes = [obj.name], [obj.dtype]
+        _update(
+            hasher, type(obj).__name__,
+            list(map(str, columns)), list(map(str, dtypes))
+        )
+        hasher.update(memoryview(
+            pd.util.hash_pandas_object(obj, index=True).to_numpy()
+        ).cast('B'))
+    elif isinstance(obj, dict):
+        _update(hasher, 'dict')
+        for key in sorted(obj, key=str):
+            _update(hasher, str(key), _digest(obj[key], memo))
+    elif isinstance(obj, (list, tuple)):
+        _update(hasher, type(obj).__name__)
+        for item in obj:
+            _update(hasher, _digest(item, memo))
+    elif callable(obj):
+        _update(hasher, 'callable', _code_identity(obj))
+    else:
+        try:
+            hasher.update(pickle.dumps(obj, protocol=4))
+        except Exception:
+            # Unable to identify content, never match.
+            _update(hasher, 'unhashable', id(obj), time())
+
+    digest = hasher.hexdigest()
+    memo[id(obj)] = obj, digest
+
+    return digest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m ExaTrkXPlotting.render_cache',
+        description='Manage render cache.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prune_parser = subparsers.add_parser('prune', help='Remove stale cache entries.')
+    prune_parser.add_argument(
+        '--store', default='.exatrkx_cache',
+        help='Cache store directory.'
+    )
+    prune_parser.add_argument(
+        '--max-age', type=float, default=None,
+        help='Maximum age of entry in days.'
+    )
+    prune_parser.add_argument(
+        '--remove-outputs', action='store_true',
+        help='Also delete outputs of expired entries.'
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'prune':
+        removed = RenderCache(args.store).prune(
+            max_age=None if args.max_age is None else args.max_age * 86400.0,
+            remove_outputs=args.remove_outputs
+        )
+        print(f'Pruned {removed} cache entries.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory-bounded rendering for long batch runs.
+
+RenderSession own figure creation, reuse figure and canvas objects of same layout,
+and release artists explicitly after each render.
+Figures are plain Figure with Agg canvas and never touch pyplot,
+so one session per thread can render concurrently in one process.
+Use run_jobs to run many render jobs in worker processes,
+which are recycled when they exceed resident memory ceiling.
+"""
+
+from typing import Union, Dict, Any, AnyStr, Callable, List, NamedTuple, Optional
+from os import PathLike
+from time import time
+import gc
+import logging
+import os
+import queue
+import multiprocessing
+import traceback
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .plotter import Plotter
+from .render_cache import RenderCache
+from .shared_data import attach
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+logger = logging.getLogger(__name__)
+
+# Keyword arguments belong to figure instead of subplots.
+_FIGURE_KWARGS = {
+    'figsize', 'dpi', 'facecolor', 'edgecolor', 'frameon',
+    'tight_layout', 'constrained_layout', 'layout'
+}
+
+
+class RenderReport(NamedTuple):
+    """
+    Resource usage of a render job.
+    """
+    save: Optional[str]
+    duration: float
+    peak_rss: int
+    rss: int
+    error: Optional[str] = None
+    result: Any = None
+
+
+class RenderSession:
+    """
+    Figure factory and renderer with bounded memory.
+    """
+    def __init__(self, rss_limit: float = None, cache: RenderCache = None):
+        """
+        Define a render session.
+
+        :param rss_limit:
+            Resident memory ceiling in bytes. None to disable.
+        :param cache:
+            Render cache pass to Plotter.plot.
+        """
+        self.rss_limit = rss_limit
+        self.cache = cache
+        self.reports: List[RenderReport] = []
+
+        self._figures: Dict[Any, Figure] = {}
+
+    def subplots(self, nrows: int = 1, ncols: int = 1, **kwargs):
+        """
+        Same as matplotlib.pyplot.subplots, but figure is not managed by pyplot
+        and is reused if a figure with same layout is created before.
+
+        :return: Figure and axes.
+        """
+        fig_kwargs = {k: v for k, v in kwargs.items() if k in _FIGURE_KWARGS}
+        subplot_kwargs = {k: v for k, v in kwargs.items() if k not in _FIGURE_KWARGS}
+
+        layout = (nrows, ncols, repr(sorted(fig_kwargs.items())))
+
+        fig = self._figures.get(layout)
+        if fig is None:
+            fig, axes = subplots(nrows, ncols, **kwargs)
+            self._figures[layout] = fig
+            return fig, axes
+
+        fig.clear()
+        axes = fig.subplots(nrows, ncols, **subplot_kwargs)
+
+        return fig, axes
+
+    def render(
+        self,
+        fig: Figure,
+        plots: Any,
+        save: Union[PathLike, AnyStr],
+        data: Any = None,
+        config: Any = None
+    ) -> RenderReport:
+        """
+        Render figure to file then release all artists.
+
+        :param fig: Figure created by subplots.
+        :param plots: Configurations define how to plot each axes.
+        :param save: Figure save location.
+        :param data: Data pass to all plotting function.
+        :param config: External configuration.
+        :return: Resource usage of this render.
+        """
+        t_start = time()
+        _reset_peak_rss()
+
+        try:
+            Plotter(fig, plots, data=data, config=config).plot(
+                save=save, close=False, cache=self.cache
+            )
+        finally:
+            self.release(fig)
+
+        report = RenderReport(
+            save=str(save),
+            duration=time() - t_start,
+            peak_rss=peak_rss(),
+            rss=current_rss()
+        )
+        self.reports.append(report)
+
+        return report
+
+    def release(self, fig: Figure):
+        """
+        Drop large artist arrays of figure and clear it.
+
+        :param fig: Figure to release.
+        """
+        for ax in fig.get_axes():
+            for collection in ax.collections:
+                if hasattr(collection, 'set_segments'):
+                    collection.set_segments([])
+                if hasattr(collection, 'set_offsets'):
+                    collection.set_offsets(np.empty((0, 2)))
+                collection.set_array(None)
+            for line in ax.lines:
+                line.set_data([], [])
+            for image in ax.images:
+                image.set_data(np.empty((0, 0)))
+
+        fig.clear()
+        gc.collect()
+
+    def close(self):
+        """
+        Drop all figures own by this session.
+        """
+        for fig in self._figures.values():
+            fig.clear()
+        self._figures.clear()
+        gc.collect()
+
+    def exceeded(self) -> bool:
+        """
+        :return: Whether resident memory exceed ceiling.
+        """
+        return self.rss_limit is not None and current_rss() > self.rss_limit
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def subplots(nrows: int = 1, ncols: int = 1, **kwargs):
+    """
+    Same as matplotlib.pyplot.subplots, but figure is a plain Figure with Agg canvas.
+    No pyplot global state is touched, so it is safe to call from any thread.
+
+    :return: Figure and axes.
+    """
+    fig_kwargs = {k: v for k, v in kwargs.items() if k in _FIGURE_KWARGS}
+    subplot_kwargs = {k: v for k, v in kwargs.items() if k not in _FIGURE_KWARGS}
+
+    fig = Figure(**fig_kwargs)
+    FigureCanvasAgg(fig)
+
+    return fig, fig.subplots(nrows, ncols, **subplot_kwargs)
+
+
+def current_rss() -> int:
+    """
+    :return: Current resident memory of this process in bytes.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """
+    :return: Peak resident memory of this process in bytes, since last reset if supported.
+    """
+    try:
+        with open('/proc/self/status') as fp:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux report in KB while macOS report in bytes.
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+
+def _reset_peak_rss():
+    # Only Linux support resetting peak resident memory.
+    try:
+        with open('/proc/self/clear_refs', 'w') as fp:
+            fp.write('5')
+    except OSError:
+        pass
+
+
+def _worker(tasks, results, rss_limit, cache, shared):
+    session = RenderSession(rss_limit=rss_limit, cache=cache)
+    pid = os.getpid()
+
+    if shared is not None:
+        attach(shared)
+
+    while True:
+        # Parent assign next job on this, so it always know which job a worker hold.
+        results.put(('ready', pid, None, None))
+
+        task = tasks.get()
+        if task is None:
+            break
+
+        index, job = task
+
+        t_start = time()
+        _reset_peak_rss()
+
+        result, error = None, None
+        try:
+            result = job(session)
+        except Exception:
+            error = traceback.format_exc()
+
+        gc.collect()
+        results.put(('done', pid, index, RenderReport(
+            save=getattr(result, 'save', None),
+            duration=time() - t_start,
+            peak_rss=peak_rss(),
+            rss=current_rss(),
+            error=error,
+            result=result
+        )))
+
+        if session.exceeded():
+            # Exit and let parent start a fresh worker.
+            results.put(('recycle', pid, None, None))
+            break
+
+    session.close()
+
+
+def run_jobs(
+    jobs: List[Callable[[RenderSession], Any]],
+    rss_limit: float = None,
+    processes: int = 1,
+    cache: RenderCache = None,
+    shared: Dict[str, Any] = None
+) -> List[RenderReport]:
+    """
+    Run render jobs in worker processes.
+    Worker exceed rss_limit after a job is replaced by a new process.
+    Job of a worker die without notice, e.g. killed by OOM killer, is reported as error.
+
+    :param jobs:
+        Picklable callables take a RenderSession as argument, e.g.
+        functools.partial of a module level function.
+    :param rss_limit:
+        Resident memory ceiling of each worker in bytes.
+    :param processes:
+        Number of worker processes.
+    :param cache:
+        Render cache shared by workers.
+    :param shared:
+        Handles of SharedDataStore to attach in each worker,
+        so jobs can refer to shared data with SharedRef.
+    :return:
+        Report of each job, in order of jobs.
+    """
+    context = multiprocessing.get_context()
+    results = context.Queue()
+
+    # Each worker has its own task queue, and job is assigned by parent,
+    # so a job is never lost between a worker take it and report it.
+    workers = {}
+    task_queues = {}
+
+    def start_worker():
+        tasks = context.Queue()
+        process = context.Process(
+            target=_worker, args=(tasks, results, rss_limit, cache, shared), daemon=True
+        )
+        process.start()
+        workers[process.pid] = process
+        task_queues[process.pid] = tasks
+
+    for _ in range(min(processes, len(jobs))):
+        start_worker()
+
+    pending = list(range(len(jobs)))[::-1]
+    running = {}
+    reports: List[Optional[RenderReport]] = [None] * len(jobs)
+    remaining = len(jobs)
+
+    def handle(message, pid, index, report):
+        nonlocal remaining
+
+        if message == 'ready':
+            if pid not in workers:
+                # Worker already collected as dead.
+                return
+
+            if pending:
+                index = pending.pop()
+                running[pid] = index
+                task_queues[pid].put((index, jobs[index]))
+            else:
+                task_queues[pid].put(None)
+        elif message == 'done':
+            running.pop(pid, None)
+            reports[index] = report
+            remaining -= 1
+
+            logger.info(
+                f'Job {index} complete in {report.duration:.4f} second, '
+                f'peak memory {report.peak_rss / 2**20:.1f} MB.'
+            )
+        elif message == 'recycle':
+            logger.info(f'Worker {pid} exceed memory limit, recycle.')
+            # May already be collected if it exit before message is read.
+            process = workers.pop(pid, None)
+            if process is not None:
+                process.join()
+                task_queues.pop(pid)
+
+            if pending:
+                start_worker()
+
+    while remaining > 0:
+        try:
+            handle(*results.get(timeout=1.0))
+            continue
+        except queue.Empty:
+            pass
+
+        # Check for worker killed without notice, e.g. by OOM killer.
+        dead = [pid for pid, process in workers.items() if not process.is_alive()]
+        if not dead:
+            continue
+
+        # Messages a worker send before exit are already in queue, handle them first.
+        while True:
+            try:
+                handle(*results.get_nowait())
+            except queue.Empty:
+                break
+
+        for pid in dead:
+            process = workers.pop(pid, None)
+            if process is None:
+                continue
+
+            process.join()
+            task_queues.pop(pid)
+
+            if pid in running:
+                reports[running.pop(pid)] = RenderReport(
+                    save=None, duration=0.0, peak_rss=0, rss=0,
+                    error=f'Worker exit with code {process.exitcode}.'
+                )
+                remaining -= 1
+
+            # Worker exit normally after its sentinel is not replaced.
+            if pending:
+                start_worker()
+
+    for pid, process in workers.items():
+        task_queues[pid].put(None)
+    for process in workers.values():
+        process.join()
+
+    return reports
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Warm local render server.
+
+Start-up of a Python process with matplotlib, pandas and all plots imported
+usually cost much more than drawing a figure.
+Render server keep one process alive with plots preloaded,
+and render figures requested over HTTP by a small pool of worker threads.
+Figures never touch pyplot, see Plotter.
+
+Start server:
+
+    python -m ExaTrkXPlotting.server --port 8765 --workers 4
+
+Endpoints:
+    - POST /render: Render a figure, response with image bytes.
+    - GET /metrics: Queue and timing metrics in JSON.
+    - GET /plots: Names of registered plots in JSON.
+
+Render request is a JSON object:
+
+    {
+        "figure": {"nrows": 1, "ncols": 2, "figsize": [10, 5]},
+        "plots": [
+            {"plot": "exatrkx.hits.2d", "args": {"hit_filter": null}},
+            [{"plot": "exatrkx.hit_pairs.2d"}, {"plot": "exatrkx.hits.2d"}]
+        ],
+        "data": {"hits": "/data/event0/hits.csv", "pairs": "/data/event0/pairs.npz"},
+        "format": "png"
+    }
+
+Each entry of plots is configuration of one axes in order,
+or a list of configurations to overlap on same axes.
+Entry accept plot, data, args and config as PlotConfig does.
+In data, string is a file path loaded by server (csv, parquet, npy or npz),
+and {"$shared": name} refer to data of a SharedDataStore,
+whose handles are passed in "shared" field of request.
+Loaded files are cached until they are modified.
+
+Server only listen on localhost by default, and read any file it has access to.
+"""
+
+from typing import Any, Dict, List, Optional, Union, AnyStr
+from os import PathLike
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter
+import argparse
+import importlib
+import io
+import json
+import logging
+import pkgutil
+import queue
+import threading
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from .plot_config import PlotConfig
+from .plot_manager import plot_manager
+from .plotter import Plotter, logger as plotter_logger
+from .render_session import RenderSession
+from .shared_data import SharedRef, attach, resolve
+
+
+logger = logging.getLogger(__name__)
+
+
+_CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf'
+}
+
+
+class DataLoader:
+    """
+    Load data files referred by render requests, with LRU cache.
+    """
+    def __init__(self, capacity: int = 32):
+        """
+        Define a data loader.
+
+        :param capacity:
+            Maximum number of loaded files to keep.
+        """
+        self.capacity = capacity
+
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path: Union[PathLike, AnyStr]) -> Any:
+        """
+        Load a file, or take it from cache if file is not modified since last load.
+
+        :param path: File path. Format is decided by suffix.
+        :return: DataFrame for csv and parquet, array for npy, dict of arrays for npz.
+        """
+        path = Path(path).absolute()
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        # Load outside of lock so other requests are not blocked.
+        value = _load_file(path)
+
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+        return value
+
+    def resolve(self, spec):
+        """
+        Replace file paths and shared references in data spec with data.
+
+        :param spec: Data spec of render request.
+        :return: Data pass to Plotter.
+        """
+        if isinstance(spec, str):
+            return self.load(spec)
+
+        if isinstance(spec, dict):
+            if set(spec) == {'$shared'}:
+                return resolve(SharedRef(spec['$shared']))
+            return {key: self.resolve(value) for key, value in spec.items()}
+
+        if isinstance(spec, list):
+            return [self.resolve(value) for value in spec]
+
+        return spec
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def _load_file(path: Path):
+    suffix = path.suffix.lower()
+
+    if suffix == '.csv':
+        return pd.read_csv(path)
+    if suffix in ('.parquet', '.pq'):
+        return pd.read_parquet(path)
+    if suffix == '.npy':
+        return np.load(path, mmap_mode='r', allow_pickle=False)
+    if suffix == '.npz':
+        with np.load(path, allow_pickle=False) as fp:
+            return {key: fp[key] for key in fp.files}
+
+    raise ValueError(f'Unsupported data file: {path}')
+
+
+class RenderMetrics:
+    """
+    Counters and timing of recent requests.
+    """
+    def __init__(self, window: int = 1024):
+        """
+        :param window: Number of recent requests to compute timing statistics.
+        """
+        self.counters = {
+            'requests': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timeout': 0
+        }
+        self.timings = {
+            'queue': deque(maxlen=window),
+            'load': deque(maxlen=window),
+            'render': deque(maxlen=window),
+            'total': deque(maxlen=window)
+        }
+        self._lock = threading.Lock()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def record(self, **timings: float):
+        """
+        Record timing of a completed request, in seconds.
+        """
+        with self._lock:
+            for name, value in timings.items():
+                self.timings[name].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: Counters and timing statistics in milliseconds.
+        """
+        with self._lock:
+            result = dict(self.counters)
+            timings = {name: np.array(values) for name, values in self.timings.items()}
+
+        for name, values in timings.items():
+            if len(values) == 0:
+                continue
+
+            p50, p95 = np.percentile(values, [50, 95]) * 1e3
+            result[f'{name}_ms'] = {
+                'mean': float(values.mean() * 1e3),
+                'p50': float(p50),
+                'p95': float(p95),
+                'max': float(values.max() * 1e3)
+            }
+
+        return result
+
+
+class _Job:
+    def __init__(self, request: Dict[str, Any]):
+        self.request = request
+        self.future = Future()
+        self.t_submit = perf_counter()
+
+
+class RenderServer:
+    """
+    HTTP render server with worker pool and bounded request queue.
+    """
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        workers: int = 2,
+        queue_size: int = 64,
+        timeout: float = 60.0,
+        preload: List[str] = None,
+        loader: DataLoader = None,
+        verbose: bool = False
+    ):
+        """
+        Define a render server.
+
+        :param host:
+            Address to listen.
+        :param port:
+            Port to listen, 0 to pick a free port.
+        :param workers:
+            Number of render threads.
+        :param queue_size:
+            Maximum number of waiting requests. Request beyond it is rejected with 503.
+        :param timeout:
+            Seconds a request wait for its figure before 504.
+        :param preload:
+            Modules to import before serving, which register plots.
+            All modules of ExaTrkXPlots if None.
+        :param loader:
+            Data loader. New DataLoader if None.
+        :param verbose:
+            Whether log each request and plot.
+            Otherwise progress messages of render threads are dropped, warnings are kept.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.verbose = verbose
+
+        self.loader = loader or DataLoader()
+        self.metrics = RenderMetrics()
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+
+        _preload(preload)
+
+        self._httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.render_server = self
+
+        self._log_filter = None if verbose else _QuietWorkers()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'RenderServer':
+        """
+        Start workers and serve in background thread.
+
+        :return: This server.
+        """
+        self._start_workers()
+
+        thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+        return self
+
+    def serve_forever(self):
+        """
+        Start workers and serve in calling thread until interrupted.
+        """
+        self._start_workers()
+
+        print(f'Render server listening on {self.url} with {self.workers} workers.')
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stop serving and wait for workers to finish current jobs.
+        """
+        if any(thread.is_alive() for thread in self._threads):
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+        if self._log_filter is not None:
+            plotter_logger.removeFilter(self._log_filter)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, request: Dict[str, Any]) -> Future:
+        """
+        Queue a render request.
+
+        :param request: Render request, see module document.
+        :return: Future of (image bytes, content type, timings).
+        :raise queue.Full: If queue is full.
+        """
+        job = _Job(request)
+        self._queue.put_nowait(job)
+
+        return job.future
+
+    def _start_workers(self):
+        if self._log_filter is not None:
+            # Plotter draw and log in calling thread, which is render thread here.
+            plotter_logger.addFilter(self._log_filter)
+
+        for idx in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f'render-worker-{idx}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        session = RenderSession()
+        _warm_up(session)
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                job.future.set_result(self._render(session, job))
+            except Exception as error:
+                job.future.set_exception(error)
+
+        session.close()
+
+    def _render(self, session: RenderSession, job: _Job):
+        t_start = perf_counter()
+        request = job.request
+
+        if 'shared' in request:
+            attach(request['shared'])
+
+        data = self.loader.resolve(request.get('data'))
+        t_load = perf_counter()
+
+        fig, axes = session.subplots(**request.get('figure', {}))
+        try:
+            axes = np.atleast_1d(axes).ravel()
+            plot_configs = request.get('plots', [])
+            if len(plot_configs) > len(axes):
+                raise ValueError(
+                    f'{len(plot_configs)} plots are requested but figure only has {len(axes)} axes.'
+                )
+
+            plots = {
+                ax: self._plot_config(plot_config)
+                for ax, plot_config in zip(axes, plot_configs)
+            }
+
+            Plotter(fig, plots, data=data, config=request.get('config')).plot(
+                close=False, workers=1
+            )
+
+            image_format = request.get('format', 'png')
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=image_format)
+        finally:
+            # Drop artists now, figure object is reused by next request of same layout.
+            fig.clear()
+
+        t_end = perf_counter()
+        timings = {
+            'queue': t_start - job.t_submit,
+            'load': t_load - t_start,
+            'render': t_end - t_load,
+            'total': t_end - job.t_submit
+        }
+
+        return buffer.getvalue(), _CONTENT_TYPES.get(image_format, 'application/octet-stream'), timings
+
+    def _plot_config(self, plot_config):
+        if isinstance(plot_config, list):
+            return [self._plot_config(subplot_config) for subplot_config in plot_config]
+
+        if isinstance(plot_config, str):
+            return PlotConfig(plot_config)
+
+        return PlotConfig(
+            plot=plot_config.get('plot'),
+            data=self.loader.resolve(plot_config.get('data')),
+            config=plot_config.get('config'),
+            args=plot_config.get('args')
+        )
+
+
+class _QuietWorkers(logging.Filter):
+    """
+    Drop progress messages logged by render threads.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or not record.threadName.startswith('render-worker-')
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'ExaTrkXRenderServer'
+
+    def do_GET(self):
+        render_server = self.server.render_server
+
+        if self.path == '/metrics':
+            metrics = render_server.metrics.snapshot()
+            metrics['queue_depth'] = render_server._queue.qsize()
+            metrics['workers'] = render_server.workers
+            metrics['data_cache'] = {
+                'hits': render_server.loader.hits,
+                'misses': render_server.loader.misses
+            }
+            self._send_json(200, metrics)
+        elif self.path == '/plots':
+            self._send_json(200, sorted(plot_manager.plots()))
+        else:
+            self._send_json(404, {'error': f'Unknown path {self.path}.'})
+
+    def do_POST(self):
+        render_server = self.server.render_server
+
+        if self.path != '/render':
+            self._send_json(404, {'error': f'Unknown path {self.path}.'})
+            return
+
+        render_server.metrics.count('requests')
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError('Render request must be a JSON object.')
+        except ValueError as error:
+            render_server.metrics.count('failed')
+            self._send_json(400, {'error': str(error)})
+            return
+
+        try:
+            future = render_server.submit(request)
+        except queue.Full:
+            render_server.metrics.count('rejected')
+            self._send_json(503, {'error': 'Render queue is full.'})
+            return
+
+        try:
+            image, content_type, timings = future.result(timeout=render_server.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            render_server.metrics.count('timeout')
+            self._send_json(504, {'error': 'Render timeout.'})
+            return
+        except (RuntimeError, ValueError, TypeError, KeyError, OSError) as error:
+            # Invalid plot, arguments or data.
+            render_server.metrics.count('failed')
+            self._send_json(400, {'error': f'{type(error).__name__}: {error}'})
+            return
+        except Exception as error:
+            render_server.metrics.count('failed')
+            self._send_json(500, {'error': f'{type(error).__name__}: {error}'})
+            return
+
+        render_server.metrics.count('completed')
+        render_server.metrics.record(**timings)
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(image)))
+        for name, value in timings.items():
+            self.send_header(f'X-{name.capitalize()}-Time', f'{value:.6f}')
+        self.end_headers()
+        self.wfile.write(image)
+
+    def _send_json(self, status: int, body):
+        content = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        if self.server.render_server.verbose:
+            super().log_message(format, *args)
+
+
+def _preload(modules: Optional[List[str]]):
+    if modules is not None:
+        for module in modules:
+            importlib.import_module(module)
+        return
+
+    import ExaTrkXPlots
+
+    for module in pkgutil.iter_modules(ExaTrkXPlots.__path__):
+        try:
+            importlib.import_module(f'ExaTrkXPlots.{module.name}')
+        except ImportError as error:
+            # Plots with missing optional dependency are not available.
+            logger.warning(f'Skip preload of ExaTrkXPlots.{module.name}: {error}')
+
+
+def _warm_up(session: RenderSession):
+    # First draw of a thread load fonts and build caches, pay it before first request.
+    fig, ax = session.subplots()
+    ax.plot([0, 1], [0, 1], label='warm up')
+    ax.set(title='warm up', xlabel='x', ylabel='y')
+    ax.legend()
+    fig.savefig(io.BytesIO(), format='png')
+    session.release(fig)
+
+
+def render_remote(request: Dict[str, Any], url: str = 'http://127.0.0.1:8765', timeout: float = 60.0) -> bytes:
+    """
+    Request a figure from render server.
+
+    :param request: Render request, see module document.
+    :param url: Server URL.
+    :param timeout: Seconds to wait for response.
+    :return: Image bytes.
+    """
+    http_request = urllib.request.Request(
+        f'{url}/render',
+        data=json.dumps(request).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(http_request, timeout=timeout) as response:
+        return response.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m ExaTrkXPlotting.server',
+        description='Serve figure render requests on localhost.'
+    )
+    parser.add_argument(
+        '--host', default='127.0.0.1',
+        help='Address to listen.'
+    )
+    parser.add_argument(
+        '--port', type=int, default=8765,
+        help='Port to listen.'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=2,
+        help='Number of render threads.'
+    )
+    parser.add_argument(
+        '--queue-size', type=int, default=64,
+        help='Maximum number of waiting requests.'
+    )
+    parser.add_argument(
+        '--timeout', type=float, default=60.0,
+        help='Seconds a request wait for its figure.'
+    )
+    parser.add_argument(
+        '--cache-size', type=int, default=32,
+        help='Number of loaded data files to keep.'
+    )
+    parser.add_argument(
+        '--preload', nargs='*', default=None,
+        help='Modules to import to register plots. All ExaTrkXPlots modules by default.'
+    )
+    parser.add_argument(
+        '--verbose', action='store_true',
+        help='Log each request.'
+    )
+
+    args = parser.parse_args()
+
+    RenderServer(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        timeout=args.timeout,
+        preload=args.preload,
+        loader=DataLoader(args.cache_size),
+        verbose=args.verbose
+    ).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared-memory data store for parallel render workers.
+
+Owner process publish arrays and table columns once into OS shared memory,
+then pass picklable handles to workers.
+Workers attach handles and get zero-copy read-only views,
+so many workers on one node use one copy of data.
+
+Tables (pandas, polars, pyarrow or structured arrays) are shared column by column,
+and attached as dict of column views, which is supported by ExaTrkXPlots.columns.
+Categorical columns share their codes, categories are small and go with handle,
+and are attached as pandas categorical.
+Object columns, e.g. Python strings, are shared the same way as codes of distinct values,
+and rebuilt as object array in each worker.
+
+In plot configuration, refer to shared data with SharedRef:
+
+    store = SharedDataStore()
+    store.publish('event', {'hits': hits, 'edges': edges})
+    handles = store.handles()
+
+    # In worker.
+    attach(handles)
+    PlotConfig('exatrkx.hits.2d', data=SharedRef('event'))
+"""
+
+from typing import Any, Dict
+from multiprocessing import shared_memory, resource_tracker
+import secrets
+import sys
+
+import numpy as np
+
+
+# Values attached in this process, by name.
+_attached: Dict[str, Any] = {}
+# Shared memory blocks attached in this process, by block name.
+_blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedRef:
+    """
+    Reference to shared data by name. Use as data of PlotConfig.
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f'SharedRef({self.name!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, SharedRef) and other.name == self.name
+
+    def __hash__(self):
+        return hash((SharedRef, self.name))
+
+
+class SharedDataStore:
+    """
+    Owner of shared data. Shared memory is released when store is closed.
+    """
+    def __init__(self, prefix: str = None):
+        """
+        Define a shared data store.
+
+        :param prefix:
+            Prefix of shared memory block names. Random if None.
+        """
+        self.prefix = prefix or f'exatrkx_{secrets.token_hex(4)}'
+
+        self._handles: Dict[str, Any] = {}
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+    def publish(self, name: str, value) -> SharedRef:
+        """
+        Copy value into shared memory.
+
+        :param name:
+            Name to refer the value.
+        :param value:
+            Array, table (pandas, polars, pyarrow or structured array),
+            or dict of them (nested dict is allowed).
+        :return:
+            Reference to the value.
+        """
+        if name in self._handles:
+            raise KeyError(f'Shared data {name} already exist.')
+
+        self._handles[name] = self._publish(value)
+
+        # Owner can also resolve the reference.
+        _attached[name] = _attach(self._handles[name])
+
+        return SharedRef(name)
+
+    def handles(self) -> Dict[str, Any]:
+        """
+        :return: Picklable handles of all published data. Pass to attach in workers.
+        """
+        return dict(self._handles)
+
+    def close(self):
+        """
+        Release all shared memory of this store.
+        Views in other processes stay valid until they exit.
+        """
+        for name in self._handles:
+            _attached.pop(name, None)
+        self._handles.clear()
+
+        for block_name, block in self._blocks.items():
+            _blocks.pop(block_name, None)
+            try:
+                block.close()
+            except BufferError:
+                # View still alive in this process, memory is freed when it is dropped.
+                pass
+            if sys.version_info < (3, 13):
+                # Worker sharing resource tracker of this process drop registration on attach.
+                resource_tracker.register(block._name, 'shared_memory')
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _publish(self, value):
+        if isinstance(value, dict):
+            return 'dict', {key: self._publish(item) for key, item in value.items()}
+
+        if isinstance(value, np.ndarray):
+            if value.dtype.names is None:
+                return self._publish_array(value)
+            names = value.dtype.names
+        elif hasattr(value, 'column_names'):
+            # pyarrow.
+            names = value.column_names
+        elif hasattr(value, 'columns'):
+            # pandas and polars.
+            names = list(value.columns)
+        else:
+            return self._publish_array(value)
+
+        # Table, share each column.
+        return 'table', {
+            str(name): self._publish_array(value[name]) for name in names
+        }
+
+    def _publish_array(self, array):
+        if getattr(getattr(array, 'dtype', None), 'name', None) == 'category':
+            # pandas categorical, share codes only.
+            categorical = getattr(array, 'array', array)
+            return 'categorical', (
+                self._publish_array(categorical.codes),
+                np.asarray(categorical.categories),
+                categorical.ordered
+            )
+
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            try:
+                values, codes = np.unique(array.ravel(), return_inverse=True)
+            except TypeError:
+                raise TypeError(f'Array of {array.dtype} dtype cannot be shared, values are not sortable.')
+
+            codes = codes.reshape(array.shape).astype(np.min_scalar_type(max(len(values) - 1, 0)))
+            return 'object', (self._publish_array(codes), values)
+
+        block_name = f'{self.prefix}_{len(self._blocks)}'
+        # Zero size block is not allowed.
+        block = shared_memory.SharedMemory(
+            name=block_name, create=True, size=max(array.nbytes, 1)
+        )
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+
+        self._blocks[block_name] = block
+        _blocks[block_name] = block
+
+        return 'array', (block_name, array.dtype.str, array.shape)
+
+
+def _open_block(block_name: str) -> shared_memory.SharedMemory:
+    """
+    Open existing block without tracking it,
+    otherwise resource tracker of attaching process may unlink it on exit.
+    Only owner should unlink block.
+
+    Before Python 3.13 opening always register block, so drop registration right after.
+    Workers started by multiprocessing share resource tracker of owner,
+    owner register block again before unlink.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=block_name, track=False)
+
+    block = shared_memory.SharedMemory(name=block_name)
+    resource_tracker.unregister(block._name, 'shared_memory')
+
+    return block
+
+
+def _attach(handle):
+    kind, spec = handle
+
+    if kind in ('dict', 'table'):
+        return {key: _attach(item) for key, item in spec.items()}
+
+    if kind == 'categorical':
+        import pandas as pd
+
+        codes, categories, ordered = spec
+        return pd.Categorical.from_codes(_attach(codes), categories=categories, ordered=ordered)
+
+    if kind == 'object':
+        codes, values = spec
+        return values[_attach(codes)]
+
+    block_name, dtype, shape = spec
+
+    block = _blocks.get(block_name)
+    if block is None:
+        block = _open_block(block_name)
+        _blocks[block_name] = block
+
+    view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    view.flags.writeable = False
+
+    return view
+
+
+def attach(handles: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Attach shared data in this process. Attach same handles again is cheap.
+
+    :param handles: Handles return by SharedDataStore.handles.
+    :return: Dict of read-only views by name. Tables become dict of column views.
+    """
+    for name, handle in handles.items():
+        _attached[name] = _attach(handle)
+
+    return {name: _attached[name] for name in handles}
+
+
+def resolve(data):
+    """
+    Replace SharedRef in data with attached views.
+
+    :param data: Data, SharedRef, or dict or list contain SharedRef.
+    :return: Resolved data.
+    """
+    if isinstance(data, SharedRef):
+        if data.name not in _attached:
+            raise RuntimeError(f'Shared data {data.name} is not attached in this process.')
+        return _attached[data.name]
+
+    if isinstance(data, dict):
+        if any(isinstance(item, (SharedRef, dict, list)) for item in data.values()):
+            return {key: resolve(item) for key, item in data.items()}
+        return data
+
+    if isinstance(data, list):
+        if any(isinstance(item, (SharedRef, dict, list)) for item in data):
+            return [resolve(item) for item in data]
+        return data
+
+    return data
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from matplotlib import pyplot as plt
+
+# Plotter.
+from ExaTrkXPlotting import Plotter, PlotConfig
+
+# Include sweep plots.
+from ExaTrkXPlots.sweep import sweep_checkpoints
+
+if __name__ == '__main__':
+    fig, ax = plt.subplots(1, 2, figsize=(12, 5), tight_layout=True)
+
+    # Reduce all checkpoints once and share result between plots.
+    sweep = sweep_checkpoints(
+        'data/model_output/*.npz',
+        cuts=[0.3, 0.5, 0.7],
+        processes=4
+    )
+
+    Plotter(
+        fig, {
+            ax[0]: PlotConfig(
+                plot='exatrkx.performance.sweep.trend'
+            ),
+            ax[1]: PlotConfig(
+                plot='exatrkx.performance.sweep.roc',
+                args={
+                    'every': 5
+                }
+            )
+        },
+        data={
+            'sweep': sweep
+        }
+    ).plot()
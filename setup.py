@@ -12,6 +12,7 @@ setup(
     install_requires=[
         'PyYAML',
         'numpy',
+        'scipy',
         'pandas',
         'scikit-learn',
         'matplotlib',